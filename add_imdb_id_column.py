@@ -2,8 +2,9 @@
 Add imdb_id column to Episodes table
 """
 import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 try:
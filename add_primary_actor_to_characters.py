@@ -4,12 +4,14 @@ Populate it using Memory Alpha's regular cast page.
 """
 
 import sqlite3
-import requests
 from bs4 import BeautifulSoup
 import re
+from http_cache import cached_get
+from db_connection import connect
+from effective_actor import ensure_effective_actor_mapping
 
 def add_primary_actor_column():
-    conn = sqlite3.connect('startrek.db')
+    conn = connect()
     cursor = conn.cursor()
     
     try:
@@ -29,6 +31,10 @@ def add_primary_actor_column():
         
         conn.commit()
         
+        # The analysis scripts read actors through Character_Effective_Actor; its
+        # triggers keep it in step with the primary actors assigned below
+        ensure_effective_actor_mapping(conn)
+        
         # Step 2: Scrape Memory Alpha regular cast page
         print("\nScraping Memory Alpha regular cast page...")
         url = "https://memory-alpha.fandom.com/wiki/Regular_cast"
@@ -37,7 +43,7 @@ def add_primary_actor_column():
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers)
+        response = cached_get(url, headers=headers)
         response.raise_for_status()
         soup = BeautifulSoup(response.content, 'html.parser')
         
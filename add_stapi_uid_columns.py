@@ -0,0 +1,104 @@
+"""
+Add stapi_uid columns (with unique indexes) to the STAPI-sourced entity tables
+and backfill them from the persisted UID index by name.
+
+Rows whose name matches more than one STAPI entity (or more than one row)
+are left NULL. The next populate run adopts them by name before upserting
+(see the *_ADOPT statements in bulk_ingest.py), so it doesn't insert
+duplicates of them.
+"""
+import sqlite3
+
+from db_connection import connect
+from uid_index import UIDIndex
+
+# table -> (primary key, STAPI entity type, SQL expression for the STAPI name)
+UID_TABLES = {
+    'Characters': ('character_id', 'character', 'name'),
+    'Actors': ('actor_id', 'performer', "first_name || ' ' || last_name"),
+    'Ships': ('ship_id', 'spacecraft', 'name'),
+    'Organizations': ('organization_id', 'organization', 'name'),
+    'Episodes': ('episode_id', 'episode', 'title'),
+}
+
+
+def add_stapi_uid_columns(conn):
+    """Add the stapi_uid column and its unique index to every entity table"""
+    cursor = conn.cursor()
+
+    for table in UID_TABLES:
+        try:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN stapi_uid VARCHAR(20)")
+            print(f"✓ Added 'stapi_uid' column to {table}")
+        except sqlite3.OperationalError as e:
+            if 'duplicate column name' in str(e).lower():
+                print(f"'stapi_uid' column already exists on {table}")
+            else:
+                raise
+
+        cursor.execute(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_{table.lower()}_stapi_uid
+            ON {table}(stapi_uid)
+        """)
+
+    conn.commit()
+
+
+def backfill_stapi_uids(conn, index):
+    """Fill stapi_uid for rows whose name maps to exactly one STAPI uid"""
+    cursor = conn.cursor()
+
+    for table, (id_column, entity_type, name_expr) in UID_TABLES.items():
+        index.build(entity_type)
+
+        # Names that identify exactly one STAPI entity
+        cursor.execute("""
+            SELECT name, MIN(uid) FROM STAPI_UID_Index
+            WHERE entity_type = ?
+            GROUP BY name
+            HAVING COUNT(*) = 1
+        """, (entity_type,))
+        unique_uids = dict(cursor.fetchall())
+
+        cursor.execute(f"SELECT stapi_uid FROM {table} WHERE stapi_uid IS NOT NULL")
+        used = {row[0] for row in cursor.fetchall()}
+
+        # Names that identify exactly one row in our table
+        cursor.execute(f"""
+            SELECT MIN({id_column}), {name_expr} AS stapi_name, COUNT(*)
+            FROM {table}
+            WHERE stapi_uid IS NULL
+            GROUP BY stapi_name
+        """)
+
+        updates = []
+        for row_id, name, row_count in cursor.fetchall():
+            uid = unique_uids.get(name)
+            if row_count == 1 and uid and uid not in used:
+                updates.append((uid, row_id))
+                used.add(uid)
+
+        cursor.executemany(f"UPDATE {table} SET stapi_uid = ? WHERE {id_column} = ?", updates)
+
+        cursor.execute(f"SELECT COUNT(*), COUNT(stapi_uid) FROM {table}")
+        total, with_uid = cursor.fetchone()
+        print(f"  {table:15} {with_uid:6}/{total} rows have a stapi_uid")
+
+    conn.commit()
+
+
+if __name__ == '__main__':
+    conn = connect()
+
+    print("="*70)
+    print("ADDING STAPI UID COLUMNS")
+    print("="*70)
+
+    add_stapi_uid_columns(conn)
+
+    print("\nBackfilling from the STAPI UID index...")
+    index = UIDIndex(conn)
+    backfill_stapi_uids(conn, index)
+
+    index.client.close()
+    conn.close()
@@ -0,0 +1,147 @@
+"""
+Typed loaders for the analysis scripts
+Appearance rows are fetched as int32 ids only, optionally streamed in chunks,
+and names are attached afterwards from small dimension tables as pandas
+categories, so a name is stored once rather than once per appearance.
+Episode descriptions are only read when asked for.
+
+Usage:
+    from analysis_data import load_appearances
+
+    character_df = load_appearances(conn, chunksize=100000)
+"""
+
+import numpy as np
+import pandas as pd
+
+from effective_actor import has_effective_actor_mapping
+
+EPISODE_DTYPES = {
+    'episode_id': 'int32',
+    'series_id': 'int32',
+    'season': 'Int16',          # Nullable ints, so reports write 1 rather than 1.0
+    'episode_number': 'Int16',
+    'imdb_rating': 'float64',  # Kept at full precision: reports round vote-weighted averages of it
+    'imdb_votes': 'float64',
+}
+
+
+def read_frame(conn, query, dtypes, params=(), chunksize=None):
+    """
+    read_sql_query with `dtypes` applied
+
+    With `chunksize`, rows are streamed and converted chunk by chunk, so the
+    untyped (object) rows never exist all at once.
+    """
+    if chunksize is None:
+        return pd.read_sql_query(query, conn, params=params).astype(dtypes)
+
+    chunks = [chunk.astype(dtypes)
+              for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize)]
+    if not chunks:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+    # Chunks can end up with different categories; re-apply the dtypes after concatenating
+    return pd.concat(chunks, ignore_index=True).astype(dtypes)
+
+
+def attach(facts, key, dimension, columns):
+    """
+    Add dimension columns to a fact frame as categoricals
+
+    `dimension` is indexed by `key`; rows are matched by position, so no
+    per-row strings are built. Facts without a dimension row get NaN.
+    """
+    positions = dimension.index.get_indexer(facts[key])
+    for column in columns:
+        values = dimension[column].astype('category')
+        codes = values.cat.codes.to_numpy()
+        fact_codes = np.where(positions >= 0, codes[positions], -1) if len(codes) else np.full(len(facts), -1)
+        facts[column] = pd.Categorical.from_codes(fact_codes, values.cat.categories)
+    return facts
+
+
+def character_dimension(conn):
+    """Characters indexed by character_id, with name and species name"""
+    return pd.read_sql_query("""
+        SELECT c.character_id, c.name AS character_name, sp.name AS species_name
+        FROM Characters c
+        LEFT JOIN Species sp ON c.species_id = sp.species_id
+    """, conn, index_col='character_id')
+
+
+def actor_dimension(conn):
+    """Actors indexed by actor_id, with their full name"""
+    return pd.read_sql_query("""
+        SELECT actor_id, first_name || ' ' || last_name AS actor_name
+        FROM Actors
+    """, conn, index_col='actor_id')
+
+
+def episode_series(conn):
+    """Series abbreviation for every episode, indexed by episode_id"""
+    return pd.read_sql_query("""
+        SELECT e.episode_id, s.abbreviation AS series_code
+        FROM Episodes e
+        JOIN Series s ON e.series_id = s.series_id
+    """, conn, index_col='episode_id')
+
+
+def load_appearances(conn, with_series=False, chunksize=None):
+    """
+    Character appearances: episode_id, character_id (int32) plus
+    character_name and species_name (category), and series_code if asked for
+    """
+    facts = read_frame(conn, """
+        SELECT episode_id, character_id FROM Character_Episodes
+    """, {'episode_id': 'int32', 'character_id': 'int32'}, chunksize=chunksize)
+
+    characters = character_dimension(conn)
+    facts = facts[facts['character_id'].isin(characters.index)].reset_index(drop=True)
+    attach(facts, 'character_id', characters, ['character_name', 'species_name'])
+
+    if with_series:
+        series = episode_series(conn)
+        facts = facts[facts['episode_id'].isin(series.index)].reset_index(drop=True)
+        attach(facts, 'episode_id', series, ['series_code'])
+    return facts
+
+
+def load_actor_appearances(conn, with_role_series=False, chunksize=None):
+    """
+    Actor appearances, crediting the primary actor where one is set:
+    episode_id, actor_id, character_id (int32) plus actor_name and
+    character_name (category). with_role_series adds the series recorded on
+    the Character_Actors role as series_code.
+
+    Roles come from the Character_Effective_Actor mapping. It is only read here;
+    raises RuntimeError if the database doesn't have it yet (run effective_actor.py).
+    """
+    if not has_effective_actor_mapping(conn):
+        raise RuntimeError("Character_Effective_Actor is missing; "
+                           "run `python effective_actor.py` to create the mapping first")
+
+    role_series = ", ea.series AS series_code" if with_role_series else ""
+    dtypes = {'episode_id': 'int32', 'actor_id': 'int32', 'character_id': 'int32'}
+    if with_role_series:
+        dtypes['series_code'] = 'category'
+
+    facts = read_frame(conn, f"""
+        SELECT DISTINCT ce.episode_id, ea.actor_id, ea.character_id{role_series}
+        FROM Character_Effective_Actor ea
+        JOIN Character_Episodes ce ON ea.character_id = ce.character_id
+        JOIN Episodes e ON ce.episode_id = e.episode_id
+    """, dtypes, chunksize=chunksize)
+
+    attach(facts, 'actor_id', actor_dimension(conn), ['actor_name'])
+    attach(facts, 'character_id', character_dimension(conn), ['character_name'])
+    return facts
+
+
+def load_descriptions(conn, episode_ids=None):
+    """Episode descriptions indexed by episode_id (all episodes, or just `episode_ids`)"""
+    descriptions = pd.read_sql_query("""
+        SELECT episode_id, description FROM Episodes
+    """, conn, index_col='episode_id')['description']
+    if episode_ids is not None:
+        descriptions = descriptions.reindex(episode_ids)
+    return descriptions
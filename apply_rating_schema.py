@@ -2,10 +2,10 @@
 Apply schema changes to add IMDB rating columns to Episodes table
 """
 
-import sqlite3
+from db_connection import connect
 
 def apply_rating_schema():
-    conn = sqlite3.connect('startrek.db')
+    conn = connect()
     cursor = conn.cursor()
     
     print("Adding IMDB rating columns to Episodes table...")
@@ -0,0 +1,304 @@
+"""
+Batched ingest of STAPI search results
+Lookup tables are loaded into dicts once, rows are built in memory and each
+entity type is written with executemany inside a single transaction.
+"""
+
+import sqlite3
+
+from character_details import split_performer_name
+
+# Rows that predate the stapi_uid column (or that add_stapi_uid_columns.py
+# couldn't match) have a NULL uid, which ON CONFLICT(stapi_uid) never matches.
+# Before each upsert, such a row with the same name is adopted: the lowest id
+# among them gets the uid, so the upsert updates it instead of inserting a
+# duplicate. Same-named entities are adopted one per incoming uid.
+ADOPT = """
+    UPDATE {table} SET stapi_uid = ?1
+    WHERE {id_column} = (
+        SELECT MIN({id_column}) FROM {table}
+        WHERE stapi_uid IS NULL AND {match}
+    )
+    AND NOT EXISTS (SELECT 1 FROM {table} WHERE stapi_uid = ?1)
+"""
+
+ACTOR_ADOPT = ADOPT.format(table='Actors', id_column='actor_id',
+                           match="first_name = ?2 AND last_name = ?3")
+CHARACTER_ADOPT = ADOPT.format(table='Characters', id_column='character_id', match="name = ?2")
+SHIP_ADOPT = ADOPT.format(table='Ships', id_column='ship_id', match="name = ?2")
+EPISODE_ADOPT = ADOPT.format(table='Episodes', id_column='episode_id',
+                             match="series_id = ?2 AND title = ?3")
+
+SPECIES_INSERT = """
+    INSERT OR IGNORE INTO Species (name, homeworld, classification, warp_capable)
+    VALUES (?, ?, ?, ?)
+"""
+
+ACTOR_UPSERT = """
+    INSERT INTO Actors (stapi_uid, first_name, last_name, birth_date)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(stapi_uid) DO UPDATE SET
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        birth_date = COALESCE(excluded.birth_date, birth_date),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+CHARACTER_UPSERT = """
+    INSERT INTO Characters (stapi_uid, name, species_id, gender)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(stapi_uid) DO UPDATE SET
+        name = excluded.name,
+        species_id = COALESCE(excluded.species_id, species_id),
+        gender = COALESCE(excluded.gender, gender),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+SHIP_UPSERT = """
+    INSERT INTO Ships (stapi_uid, name, registry, class, organization_id, status)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(stapi_uid) DO UPDATE SET
+        name = excluded.name,
+        registry = COALESCE(excluded.registry, registry),
+        class = COALESCE(excluded.class, class),
+        status = COALESCE(excluded.status, status),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+SERIES_INSERT = """
+    INSERT OR IGNORE INTO Series
+    (name, abbreviation, start_year, end_year, num_seasons, num_episodes)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+EPISODE_UPSERT = """
+    INSERT INTO Episodes
+    (stapi_uid, series_id, title, season, episode_number, air_date)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(stapi_uid) DO UPDATE SET
+        series_id = COALESCE(excluded.series_id, series_id),
+        title = excluded.title,
+        season = COALESCE(excluded.season, season),
+        episode_number = COALESCE(excluded.episode_number, episode_number),
+        air_date = COALESCE(excluded.air_date, air_date),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# Organization names are unique, so the name alone identifies the row to adopt
+ORGANIZATION_ADOPT = """
+    UPDATE Organizations SET stapi_uid = ?
+    WHERE name = ? AND stapi_uid IS NULL
+"""
+
+ORGANIZATION_UPSERT = """
+    INSERT INTO Organizations (stapi_uid, name)
+    VALUES (?, ?)
+    ON CONFLICT(stapi_uid) DO UPDATE SET
+        name = excluded.name,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def load_lookup(cursor, table, key_column, id_column):
+    """Return a {key: id} dict for a whole table"""
+    cursor.execute(f"SELECT {key_column}, {id_column} FROM {table} WHERE {key_column} IS NOT NULL")
+    return dict(cursor.fetchall())
+
+
+def count_rows(cursor, table):
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def nested_name(item, field, key='name'):
+    """Name of a nested STAPI object (e.g. spacecraftClass), or None"""
+    value = item.get(field)
+    return value.get(key) if value else None
+
+
+def species_rows(species_list):
+    rows = []
+    for species in species_list:
+        if not species.get('name'):
+            continue
+        rows.append((species['name'], nested_name(species, 'homeworld'), species.get('type'),
+                     int(species.get('warpCapableSpecies', False))))
+    return rows
+
+
+def performer_rows(performers):
+    rows = []
+    for performer in performers:
+        if not performer.get('name') or not performer.get('uid'):
+            continue
+        first_name, last_name = split_performer_name(performer['name'])
+        rows.append((performer['uid'], first_name, last_name, performer.get('birthDate')))
+    return rows
+
+
+def character_rows(characters, species_ids):
+    rows = []
+    for character in characters:
+        if not character.get('name') or not character.get('uid'):
+            continue
+        species_id = None
+        if character.get('characterSpecies'):
+            species_id = species_ids.get(character['characterSpecies'][0].get('name'))
+        rows.append((character['uid'], character['name'], species_id, character.get('gender')))
+    return rows
+
+
+def spacecraft_rows(spacecraft_list, organization_id):
+    rows = []
+    for spacecraft in spacecraft_list:
+        if not spacecraft.get('name') or not spacecraft.get('uid'):
+            continue
+        rows.append((spacecraft['uid'], spacecraft['name'], spacecraft.get('registry'),
+                     nested_name(spacecraft, 'spacecraftClass'), organization_id,
+                     spacecraft.get('status')))
+    return rows
+
+
+def series_rows(series_list):
+    rows = []
+    for series in series_list:
+        if not series.get('title'):
+            continue
+        rows.append((series['title'], series.get('abbreviation'),
+                     series.get('productionStartYear'), series.get('productionEndYear'),
+                     series.get('seasonsCount'), series.get('episodesCount')))
+    return rows
+
+
+def episode_rows(episodes, series_ids):
+    """Episode rows; episodes whose series isn't in the database are skipped (series_id is NOT NULL)"""
+    rows = []
+    for episode in episodes:
+        if not episode.get('title') or not episode.get('uid'):
+            continue
+        series_id = series_ids.get(nested_name(episode, 'series', 'title'))
+        if series_id is None:
+            continue
+        rows.append((episode['uid'], series_id, episode['title'], episode.get('seasonNumber'),
+                     episode.get('episodeNumber'), episode.get('usAirDate')))
+    return rows
+
+
+def organization_rows(organizations):
+    return [(org['uid'], org['name']) for org in organizations
+            if org.get('name') and org.get('uid')]
+
+
+def adopt_rows(rows, key_length):
+    """(uid, name fields...) rows for an *_ADOPT statement, taken from upsert rows"""
+    return [row[:key_length] for row in rows]
+
+
+def actor_batches(rows):
+    return [(ACTOR_ADOPT, adopt_rows(rows, 3)), (ACTOR_UPSERT, rows)]
+
+
+def character_batches(rows):
+    return [(CHARACTER_ADOPT, adopt_rows(rows, 2)), (CHARACTER_UPSERT, rows)]
+
+
+def ship_batches(rows):
+    return [(SHIP_ADOPT, adopt_rows(rows, 2)), (SHIP_UPSERT, rows)]
+
+
+def episode_batches(rows):
+    return [(EPISODE_ADOPT, adopt_rows(rows, 3)), (EPISODE_UPSERT, rows)]
+
+
+def bulk_write(conn, batches):
+    """
+    Run (sql, rows) batches with executemany inside one transaction
+
+    If the batch fails (e.g. one row violates a constraint), it is rolled back
+    and replayed row by row so the bad rows are reported and the rest still land.
+
+    Returns:
+        Number of rows that failed
+    """
+    try:
+        with conn:
+            for sql, rows in batches:
+                conn.executemany(sql, rows)
+        return 0
+    except sqlite3.Error as e:
+        print(f"  Batch write failed ({e}), retrying row by row...")
+
+    failed = 0
+    with conn:
+        for sql, rows in batches:
+            for row in rows:
+                try:
+                    conn.execute(sql, row)
+                except sqlite3.Error as e:
+                    failed += 1
+                    print(f"  Error writing {row[:2]}: {e}")
+    return failed
+
+
+def ingest(conn, table, batches, label):
+    """Write the batches for one entity type and report how many rows were new"""
+    cursor = conn.cursor()
+    before = count_rows(cursor, table)
+    written = len(batches[-1][1])
+    failed = bulk_write(conn, batches)
+    inserted = count_rows(cursor, table) - before
+
+    print(f"Wrote {written - failed} {label} ({inserted} new, {failed} failed)")
+    return inserted
+
+
+# STAPI endpoint -> (table, label used in progress output)
+ENTITY_TABLES = {
+    'species': ('Species', 'species'),
+    'performer': ('Actors', 'actors'),
+    'character': ('Characters', 'characters'),
+    'spacecraft': ('Ships', 'spacecraft'),
+    'series': ('Series', 'series'),
+    'episode': ('Episodes', 'episodes'),
+    'organization': ('Organizations', 'organizations'),
+}
+
+
+def entity_batches(cursor, endpoint, items):
+    """
+    Build the (sql, rows) batches for one page (or list) of STAPI search results
+
+    Lookup tables the rows depend on (species, series, Starfleet) are loaded here,
+    once per call.
+    """
+    if endpoint == 'species':
+        return [(SPECIES_INSERT, species_rows(items))]
+
+    if endpoint == 'performer':
+        return actor_batches(performer_rows(items))
+
+    if endpoint == 'character':
+        species_ids = load_lookup(cursor, 'Species', 'name', 'species_id')
+        return character_batches(character_rows(items, species_ids))
+
+    if endpoint == 'spacecraft':
+        cursor.execute("SELECT organization_id FROM Organizations WHERE name = 'Starfleet'")
+        result = cursor.fetchone()
+        starfleet_id = result[0] if result else None
+        return ship_batches(spacecraft_rows(items, starfleet_id))
+
+    if endpoint == 'series':
+        return [(SERIES_INSERT, series_rows(items))]
+
+    if endpoint == 'episode':
+        series_ids = load_lookup(cursor, 'Series', 'name', 'series_id')
+        rows = episode_rows(items, series_ids)
+        if len(rows) < len(items):
+            print(f"  Skipping {len(items) - len(rows)} episodes without a uid or known series")
+        return episode_batches(rows)
+
+    if endpoint == 'organization':
+        rows = organization_rows(items)
+        return [(ORGANIZATION_ADOPT, rows), (ORGANIZATION_UPSERT, rows)]
+
+    raise ValueError(f"Unknown STAPI endpoint: {endpoint}")
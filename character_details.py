@@ -0,0 +1,396 @@
+"""
+Single-pass STAPI character detail stage
+Downloads each /character?uid= payload once and hands it to every consumer
+(performers, organizations, rank/title, attributes, per-series appearance stats)
+"""
+
+import sqlite3
+
+from fetch_engine import FetchEngine
+
+SERIES_TITLE_MAP = {
+    'Star Trek: Deep Space Nine': 'DS9',
+    'Star Trek: Discovery': 'DIS',
+    'Star Trek: Enterprise': 'ENT',
+    'Star Trek: The Next Generation': 'TNG',
+    'Star Trek: The Original Series': 'TOS',
+    'Star Trek: Voyager': 'VOY',
+    'Star Trek: The Animated Series': 'TAS'
+}
+
+PERFORMER_SERIES_FLAGS = {
+    'ds9Performer': 'DS9',
+    'disPerformer': 'DIS',
+    'entPerformer': 'ENT',
+    'filmPerformer': 'FILM',
+    'tasPerformer': 'TAS',
+    'tngPerformer': 'TNG',
+    'tosPerformer': 'TOS',
+    'voyPerformer': 'VOY'
+}
+
+
+def split_performer_name(name):
+    """Split a performer name into (first_name, last_name) the way Actors stores it"""
+    name_parts = name.split(maxsplit=1)
+    first_name = name_parts[0] if name_parts else ''
+    last_name = name_parts[1] if len(name_parts) > 1 else ''
+    return first_name, last_name
+
+
+def load_uid_map(cursor, table, id_column):
+    """Return a {stapi_uid: row id} dict for one entity table"""
+    cursor.execute(f"SELECT stapi_uid, {id_column} FROM {table} WHERE stapi_uid IS NOT NULL")
+    return dict(cursor.fetchall())
+
+
+def resolve_actor(cursor, actor_ids, performer):
+    """
+    Find the actor_id for a STAPI performer: by uid first, then by name for
+    actors that were added from other sources (e.g. IMDB crew pages)
+    """
+    actor_id = actor_ids.get(performer.get('uid'))
+    if actor_id or not performer.get('name'):
+        return actor_id
+
+    first_name, last_name = split_performer_name(performer['name'])
+    cursor.execute("""
+        SELECT actor_id FROM Actors
+        WHERE first_name = ? AND last_name = ? AND stapi_uid IS NULL
+    """, (first_name, last_name))
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+
+def extract_series_from_performer(performer):
+    """Extract series abbreviations from performer flags"""
+    return [abbreviation for flag, abbreviation in PERFORMER_SERIES_FLAGS.items()
+            if performer.get(flag) == True]
+
+
+def extract_series_from_episodes(episodes):
+    """Extract series abbreviation from episode data"""
+    if episodes and len(episodes) > 0:
+        series_title = episodes[0].get('series', {}).get('title', '')
+        return SERIES_TITLE_MAP.get(series_title, '')
+    return None
+
+
+def extract_rank_title(details):
+    """Separate military ranks from positions in a character's titles list"""
+    rank = None
+    title = None
+
+    for title_obj in details.get('titles', []) or []:
+        title_name = title_obj.get('name')
+        is_military_rank = title_obj.get('militaryRank', False) or title_obj.get('fleetRank', False)
+        is_position = title_obj.get('position', False)
+
+        if is_military_rank and not rank:
+            rank = title_name
+        elif is_position and not title:
+            title = title_name
+        elif not rank and not title:
+            # If unclear, put in title
+            title = title_name
+
+    return rank, title
+
+
+def appearance_range(episodes):
+    """Return (first_title, last_title, count) for a list of episodes, ordered by air date"""
+    if not episodes:
+        return None, None, 0
+
+    sorted_episodes = sorted(episodes, key=lambda e: e.get('usAirDate', '') or '')
+    return sorted_episodes[0].get('title'), sorted_episodes[-1].get('title'), len(episodes)
+
+
+class PerformerLinker:
+    """Link characters to the actors who played them (Character_Actors)"""
+
+    label = 'character-actor relationships'
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.count = 0
+        self.actor_ids = load_uid_map(cursor, 'Actors', 'actor_id')
+
+    def consume(self, char_id, details):
+        for performer in details.get('performers', []) or []:
+            actor_id = resolve_actor(self.cursor, self.actor_ids, performer)
+            if actor_id:
+                self.cursor.execute("""
+                    INSERT OR IGNORE INTO Character_Actors
+                    (character_id, actor_id)
+                    VALUES (?, ?)
+                """, (char_id, actor_id))
+
+                if self.cursor.rowcount > 0:
+                    self.count += 1
+
+
+class OrganizationLinker:
+    """Link characters to organizations (Character_Organizations)"""
+
+    label = 'character-organization relationships'
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.count = 0
+        self.organization_ids = load_uid_map(cursor, 'Organizations', 'organization_id')
+
+    def consume(self, char_id, details):
+        # Use 'organizations' field (not 'characterOrganizations')
+        for org in details.get('organizations', []) or []:
+            organization_id = self.organization_ids.get(org.get('uid'))
+            if organization_id:
+                # Character_Organizations has no unique key, so skip existing links
+                self.cursor.execute("""
+                    INSERT INTO Character_Organizations (character_id, organization_id)
+                    SELECT ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM Character_Organizations
+                        WHERE character_id = ? AND organization_id = ?
+                    )
+                """, (char_id, organization_id, char_id, organization_id))
+
+                if self.cursor.rowcount > 0:
+                    self.count += 1
+
+
+class RankTitleUpdater:
+    """Fill Characters.rank and Characters.title from STAPI titles"""
+
+    label = 'characters updated with rank/title'
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.count = 0
+
+    def consume(self, char_id, details):
+        rank, title = extract_rank_title(details)
+
+        if rank or title:
+            self.cursor.execute("""
+                UPDATE Characters
+                SET rank = ?, title = ?
+                WHERE character_id = ?
+            """, (rank, title, char_id))
+            self.count += 1
+
+
+class AttributeUpdater:
+    """Fill species, gender, birth/death years and occupation on Characters"""
+
+    label = 'characters updated with attributes'
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.count = 0
+
+        self.cursor.execute("SELECT species_id, name FROM Species")
+        self.species_map = {name.lower(): sid for sid, name in self.cursor.fetchall()}
+
+    def consume(self, char_id, details):
+        gender = details.get('gender')
+        birth_year = details.get('yearOfBirth')
+        death_year = details.get('yearOfDeath')
+
+        # Species and occupations are arrays; keep the first entry
+        species_id = None
+        char_species = details.get('characterSpecies', [])
+        if char_species:
+            species_id = self.species_map.get(char_species[0].get('name', '').lower())
+
+        occupation = None
+        occupations = details.get('occupations', [])
+        if occupations:
+            occupation = occupations[0].get('name')
+
+        self.cursor.execute("""
+            UPDATE Characters
+            SET gender = COALESCE(?, gender),
+                species_id = COALESCE(?, species_id),
+                birth_year = COALESCE(?, birth_year),
+                death_year = COALESCE(?, death_year),
+                occupation = COALESCE(?, occupation)
+            WHERE character_id = ?
+        """, (gender, species_id, birth_year, death_year, occupation, char_id))
+
+        if gender or species_id or birth_year or death_year or occupation:
+            self.count += 1
+
+
+class AppearanceStatsUpdater:
+    """Fill series, first/last appearance and episode counts on Character_Actors rows"""
+
+    label = 'Character_Actors rows updated with appearance stats'
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.count = 0
+        self.actor_ids = load_uid_map(cursor, 'Actors', 'actor_id')
+
+    def consume(self, char_id, details):
+        episodes = details.get('episodes', []) or []
+
+        for performer in details.get('performers', []) or []:
+            actor_id = resolve_actor(self.cursor, self.actor_ids, performer)
+            if not actor_id:
+                continue
+
+            # Series from performer flags, falling back to the character's episodes
+            series_list = extract_series_from_performer(performer)
+            if not series_list and episodes:
+                series_from_eps = extract_series_from_episodes(episodes)
+                if series_from_eps:
+                    series_list = [series_from_eps]
+
+            if series_list:
+                for series in series_list:
+                    series_episodes = [
+                        ep for ep in episodes
+                        if SERIES_TITLE_MAP.get(ep.get('series', {}).get('title', '')) == series
+                    ]
+                    self.update_series_row(char_id, actor_id, series, *appearance_range(series_episodes))
+            else:
+                # No series info, but update episode counts anyway
+                first_appearance, last_appearance, episodes_count = appearance_range(episodes)
+                self.cursor.execute("""
+                    UPDATE Character_Actors
+                    SET first_appearance = ?,
+                        last_appearance = ?,
+                        episodes_count = ?
+                    WHERE character_id = ? AND actor_id = ?
+                        AND (series IS NULL OR series = '')
+                """, (first_appearance, last_appearance, episodes_count, char_id, actor_id))
+
+                if self.cursor.rowcount > 0:
+                    self.count += 1
+
+    def update_series_row(self, char_id, actor_id, series, first_appearance, last_appearance, episodes_count):
+        """Update the row for this character/actor/series, filling a blank row or adding one if needed"""
+        self.cursor.execute("""
+            UPDATE Character_Actors
+            SET first_appearance = ?,
+                last_appearance = ?,
+                episodes_count = ?
+            WHERE character_id = ? AND actor_id = ? AND series = ?
+        """, (first_appearance, last_appearance, episodes_count, char_id, actor_id, series))
+
+        if self.cursor.rowcount > 0:
+            self.count += 1
+            return
+
+        # Fill a row without series data (first series to be added)
+        self.cursor.execute("""
+            SELECT character_actor_id FROM Character_Actors
+            WHERE character_id = ? AND actor_id = ?
+                AND (series IS NULL OR series = '')
+            LIMIT 1
+        """, (char_id, actor_id))
+
+        blank_row = self.cursor.fetchone()
+        if blank_row:
+            self.cursor.execute("""
+                UPDATE Character_Actors
+                SET series = ?,
+                    first_appearance = ?,
+                    last_appearance = ?,
+                    episodes_count = ?
+                WHERE character_actor_id = ?
+            """, (series, first_appearance, last_appearance, episodes_count, blank_row[0]))
+            self.count += 1
+            return
+
+        # Rows exist for other series only, so this is an additional series
+        self.cursor.execute("""
+            SELECT COUNT(*) FROM Character_Actors
+            WHERE character_id = ? AND actor_id = ?
+        """, (char_id, actor_id))
+
+        if self.cursor.fetchone()[0] > 0:
+            try:
+                self.cursor.execute("""
+                    INSERT INTO Character_Actors
+                    (character_id, actor_id, series, first_appearance, last_appearance, episodes_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (char_id, actor_id, series, first_appearance, last_appearance, episodes_count))
+                self.count += 1
+            except sqlite3.IntegrityError as e:
+                print(f"     ⚠ Could not insert actor {actor_id} in {series}: {e}")
+
+
+ALL_CONSUMERS = [PerformerLinker, OrganizationLinker, RankTitleUpdater,
+                 AttributeUpdater, AppearanceStatsUpdater]
+
+
+class CharacterDetailStage:
+    """Fetch every character's STAPI details once and dispatch them to all consumers"""
+
+    def __init__(self, conn, client=None, consumers=None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.client = client or FetchEngine()
+        consumer_classes = consumers if consumers is not None else ALL_CONSUMERS
+        self.consumers = [consumer_class(self.cursor) for consumer_class in consumer_classes]
+        self.failed = 0  # Characters whose payload couldn't be fetched or applied in the last run
+
+    def fetch_details(self, uid):
+        """Fetch one character payload"""
+        data = self.client.get_json('character', params={'uid': uid})
+        if data is None:
+            return None
+        return data.get('character', {})
+
+    def run(self, characters, commit_every=100):
+        """
+        Process (character_id, stapi_uid) rows
+
+        Each consumer runs on its own, so an error in one (e.g. a bad payload)
+        is logged and counted as a failed character without stopping the
+        others. Consumers with `records_progress` set (checkpoints) are skipped
+        for a character once another consumer failed on it, so it is retried.
+
+        Returns:
+            dict mapping consumer class name to the number of rows it changed
+        """
+        work = [(char_id, uid) for char_id, uid in characters if uid]
+        skipped = len(characters) - len(work)
+
+        print(f"Processing {len(work)} characters ({skipped} without a STAPI UID)...")
+
+        processed = 0
+        failed = 0
+
+        for (char_id, uid), details in self.client.imap(lambda item: self.fetch_details(item[1]), work):
+            processed += 1
+
+            if details:
+                errors = 0
+                for consumer in self.consumers:
+                    if errors and getattr(consumer, 'records_progress', False):
+                        continue
+                    try:
+                        consumer.consume(char_id, details)
+                    except Exception as e:
+                        errors += 1
+                        print(f"  Error in {type(consumer).__name__} for character {char_id}: {e}")
+                if errors:
+                    failed += 1
+            else:
+                failed += 1
+
+            if processed % commit_every == 0:
+                self.conn.commit()
+                print(f"  {processed}/{len(work)} processed")
+
+        self.conn.commit()
+        self.failed = failed
+
+        print(f"\nProcessed {processed - failed} character payloads ({failed} failed)")
+        for consumer in self.consumers:
+            print(f"  {consumer.count:6} {consumer.label}")
+
+        return {type(consumer).__name__: consumer.count for consumer in self.consumers}
@@ -1,9 +1,9 @@
 """
 Check which episodes don't have IMDB IDs
 """
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 # Get total episodes per series
@@ -1,7 +1,7 @@
-import requests
 import json
+from http_cache import cached_get
 
-r = requests.get('http://stapi.co/api/v1/rest/performer/search', 
+r = cached_get('http://stapi.co/api/v1/rest/performer/search', 
                  params={'pageNumber': 0, 'pageSize': 1})
 data = r.json()
 
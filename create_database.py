@@ -7,9 +7,9 @@ Usage:
     python create_database.py --sample     # Create database with sample data
 """
 
-import sqlite3
 import os
 import sys
+from db_connection import connect
 
 def create_database(db_path='startrek.db', include_sample_data=False):
     """
@@ -24,9 +24,14 @@ def create_database(db_path='startrek.db', include_sample_data=False):
         print(f"Removing existing database: {db_path}")
         os.remove(db_path)
     
+    # Leftover WAL files from the old database must go too
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    
     # Create new database connection
     print(f"Creating new database: {db_path}")
-    conn = sqlite3.connect(db_path)
+    conn = connect(db_path)
     cursor = conn.cursor()
     
     # Read and execute schema
@@ -77,7 +82,7 @@ def test_queries(db_path='startrek.db'):
     print("RUNNING TEST QUERIES")
     print("=" * 70)
     
-    conn = sqlite3.connect(db_path)
+    conn = connect(db_path)
     cursor = conn.cursor()
     
     # Test Query 1: All characters with their species
@@ -165,5 +170,6 @@ if __name__ == '__main__':
         print("Sample data: NOT included (empty database)")
     print("\nTo populate with real data, run:")
     print("  python populate_from_stapi.py  (quick, partial data)")
-    print("  python populate_full.py        (complete, takes 3-5 hours)")
+    print("  python populate_full.py        (complete, concurrent fetches)")
+    print("  python pipeline.py             (complete, resumable after a crash)")
     print("=" * 70)
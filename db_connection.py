@@ -0,0 +1,128 @@
+"""
+Shared SQLite connection factory for startrek.db
+Every script opens the database through connect() so they all run in WAL mode
+with the same tuned pragmas: readers (e.g. the analysis scripts) are not
+blocked while the populate scripts and IMDB scrapers write.
+
+Usage:
+    from db_connection import connect, bulk_load
+
+    conn = connect()
+    with bulk_load(conn, ['Characters', 'Actors']):
+        ...  # large inserts
+
+    python db_connection.py   # Rebuild indexes left dropped by an interrupted bulk load
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+DB_PATH = os.environ.get('STARTREK_DB_PATH', 'startrek.db')
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,   # Map up to 256 MB of the file
+    'cache_size': -64 * 1024,         # 64 MB page cache (negative = KiB)
+    'temp_store': 'MEMORY',
+}
+
+# Indexes dropped by bulk_load and not rebuilt yet; a killed load leaves its rows
+# here so the next bulk_load (or rebuild_deferred_indexes) can restore them
+DEFERRED_INDEXES_SQL = """
+    CREATE TABLE IF NOT EXISTS Deferred_Indexes (
+        name VARCHAR(100) PRIMARY KEY,
+        sql TEXT NOT NULL
+    )
+"""
+
+
+def connect(db_path=DB_PATH, timeout=30, **kwargs):
+    """
+    Open a connection with WAL journaling and the shared pragmas applied
+
+    Args:
+        db_path: Path to the database file (default: startrek.db)
+        timeout: Seconds to wait on a locked database before failing
+    """
+    conn = sqlite3.connect(db_path, timeout=timeout, **kwargs)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    return conn
+
+
+def secondary_indexes(conn, tables):
+    """
+    Return (name, sql) for the non-unique indexes on the given tables
+
+    Unique indexes are kept, since upserts and INSERT OR IGNORE rely on them.
+    """
+    indexes = []
+    for table in tables:
+        for _, name, unique, origin, *_ in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            if unique or origin != 'c':
+                continue
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?",
+                               (name,)).fetchone()
+            if row and row[0]:
+                indexes.append((name, row[0]))
+    return indexes
+
+
+def rebuild_deferred_indexes(conn):
+    """Recreate every index recorded in Deferred_Indexes; returns how many were rebuilt"""
+    conn.execute(DEFERRED_INDEXES_SQL)
+    pending = conn.execute("SELECT name, sql FROM Deferred_Indexes").fetchall()
+    if pending:
+        print(f"\nRebuilding {len(pending)} deferred indexes...")
+
+    for name, sql in pending:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                              (name,)).fetchone()
+        if not exists:
+            conn.execute(sql)
+        conn.execute("DELETE FROM Deferred_Indexes WHERE name = ?", (name,))
+        conn.commit()
+    return len(pending)
+
+
+@contextmanager
+def bulk_load(conn, tables=()):
+    """
+    Context for large ingests
+
+    Turns synchronous off, drops the secondary indexes on `tables` for the
+    duration of the load and rebuilds them afterwards, then runs ANALYZE so
+    the query planner sees the new row counts.
+
+    The dropped indexes are recorded in Deferred_Indexes in the same
+    transaction as the drops, so if the process is killed mid-load the next
+    bulk_load (or `python db_connection.py`) rebuilds them.
+    """
+    conn.commit()
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(DEFERRED_INDEXES_SQL)
+
+    deferred = secondary_indexes(conn, tables)
+    conn.executemany("INSERT OR REPLACE INTO Deferred_Indexes (name, sql) VALUES (?, ?)", deferred)
+    for name, _ in deferred:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        rebuild_deferred_indexes(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute(f"PRAGMA synchronous={PRAGMAS['synchronous']}")
+
+
+if __name__ == '__main__':
+    conn = connect()
+    rebuilt = rebuild_deferred_indexes(conn)
+    print(f"✓ Rebuilt {rebuilt} deferred indexes")
+    conn.close()
@@ -0,0 +1,140 @@
+"""
+Character_Effective_Actor mapping
+One row per (character, actor, series) credited for a character: the
+character's primary_actor_id when one is set, otherwise every Character_Actors
+role. Triggers on Characters and Character_Actors rebuild a character's rows
+whenever its roles change, so actor-episode facts are a single join on integer
+keys against Character_Episodes.
+
+Requires the primary_actor_id column (add_primary_actor_to_characters.py).
+
+Usage:
+    python effective_actor.py   # Create the table, triggers and indexes, then rebuild
+"""
+
+from db_connection import connect
+
+TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS Character_Effective_Actor (
+        character_id INTEGER NOT NULL,
+        actor_id INTEGER NOT NULL,
+        series VARCHAR(100), -- Series of the Character_Actors role; NULL for primary actors
+        FOREIGN KEY (character_id) REFERENCES Characters(character_id),
+        FOREIGN KEY (actor_id) REFERENCES Actors(actor_id)
+    );
+
+    -- Covering indexes: character -> actors, actor -> characters. Character -> episodes
+    -- is covered by the UNIQUE(character_id, episode_id) index on Character_Episodes.
+    CREATE INDEX IF NOT EXISTS idx_effective_actor_character
+    ON Character_Effective_Actor(character_id, actor_id, series);
+    CREATE INDEX IF NOT EXISTS idx_effective_actor_actor
+    ON Character_Effective_Actor(actor_id, character_id);
+    DROP INDEX IF EXISTS idx_character_episodes_character_episode;
+"""
+
+
+def resolve_sql(character_filter=""):
+    """Rows of the mapping, for every character or those matching `character_filter`"""
+    return f"""
+        SELECT character_id, primary_actor_id, NULL
+        FROM Characters
+        WHERE primary_actor_id IS NOT NULL {character_filter.format(column='character_id')}
+        UNION ALL
+        SELECT ca.character_id, ca.actor_id, ca.series
+        FROM Character_Actors ca
+        JOIN Characters c ON ca.character_id = c.character_id
+        WHERE c.primary_actor_id IS NULL {character_filter.format(column='ca.character_id')}
+    """
+
+
+def rebuild_character_sql(ref):
+    """Trigger statements replacing the mapping rows of character `ref` (e.g. NEW.character_id)"""
+    return f"""
+        DELETE FROM Character_Effective_Actor WHERE character_id = {ref};
+        INSERT INTO Character_Effective_Actor (character_id, actor_id, series)
+        {resolve_sql("AND {column} = " + ref)};
+    """
+
+
+TRIGGERS_SQL = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_effective_actor_character_insert
+    AFTER INSERT ON Characters
+    BEGIN
+        {rebuild_character_sql('NEW.character_id')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_effective_actor_character_update
+    AFTER UPDATE OF primary_actor_id ON Characters
+    BEGIN
+        {rebuild_character_sql('NEW.character_id')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_effective_actor_character_delete
+    AFTER DELETE ON Characters
+    BEGIN
+        DELETE FROM Character_Effective_Actor WHERE character_id = OLD.character_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_effective_actor_role_insert
+    AFTER INSERT ON Character_Actors
+    BEGIN
+        {rebuild_character_sql('NEW.character_id')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_effective_actor_role_delete
+    AFTER DELETE ON Character_Actors
+    BEGIN
+        {rebuild_character_sql('OLD.character_id')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_effective_actor_role_update
+    AFTER UPDATE OF character_id, actor_id, series ON Character_Actors
+    BEGIN
+        {rebuild_character_sql('OLD.character_id')}
+        {rebuild_character_sql('NEW.character_id')}
+    END;
+"""
+
+
+def install_effective_actor_mapping(conn):
+    """Create the mapping table, its indexes and triggers, and rebuild every row"""
+    cursor = conn.cursor()
+    cursor.executescript(TABLE_SQL)
+    cursor.executescript(TRIGGERS_SQL)
+
+    cursor.execute("DELETE FROM Character_Effective_Actor")
+    cursor.execute(f"""
+        INSERT INTO Character_Effective_Actor (character_id, actor_id, series)
+        {resolve_sql()}
+    """)
+    conn.commit()
+    return cursor.rowcount
+
+
+def has_effective_actor_mapping(conn):
+    """True if the mapping table exists (read-only check)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'Character_Effective_Actor'
+    """)
+    return cursor.fetchone() is not None
+
+
+def ensure_effective_actor_mapping(conn):
+    """Install the mapping if this database doesn't have it yet; the triggers keep it current after that"""
+    if not has_effective_actor_mapping(conn):
+        install_effective_actor_mapping(conn)
+
+
+if __name__ == '__main__':
+    conn = connect()
+
+    print("="*70)
+    print("CHARACTER EFFECTIVE ACTOR MAPPING")
+    print("="*70)
+
+    rows = install_effective_actor_mapping(conn)
+    print(f"✓ Mapped {rows} character/actor roles")
+
+    conn.close()
@@ -0,0 +1,209 @@
+"""
+Shared HTTP fetch engine for the populate scripts
+Rate-limited, concurrent fetching over a single pooled requests session
+
+Point STAPI_BASE_URL (or IMDB_BASE_URL) at a local fixture server (see
+fixture_server.py) to run the populate scripts against recorded responses
+instead of the live site.
+Responses go through the on-disk cache in http_cache.py unless use_cache=False.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import default_cache, CACHE_MODE
+
+STAPI_BASE_URL = os.environ.get('STAPI_BASE_URL', "http://stapi.co/api/v1/rest")
+IMDB_BASE_URL = os.environ.get('IMDB_BASE_URL', "https://www.imdb.com")
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second, bursting up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (used when the server answers 429)"""
+        with self.lock:
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+            self.updated = time.monotonic()
+
+
+def backoff_delay(attempt, base=0.5):
+    """Exponential backoff with full jitter, so retrying workers don't wake up together"""
+    return random.uniform(0, base * 2 ** attempt)
+
+
+class FetchEngine:
+    """Pooled HTTP session with per-host token-bucket rate limiters and bounded in-flight requests"""
+
+    def __init__(self, base_url=STAPI_BASE_URL, requests_per_second=10, max_in_flight=8,
+                 timeout=30, max_retries=3, headers=None, use_cache=True, host_rates=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+
+        # One bucket per host; host_rates overrides requests_per_second for specific hosts
+        self.requests_per_second = requests_per_second
+        self.host_rates = host_rates or {}
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+
+        # One session for every request so TCP connections are reused
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self.cache = default_cache() if use_cache and CACHE_MODE != 'off' else None
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0}
+        self.stats_lock = threading.Lock()
+
+    def close(self):
+        """Close the pooled session"""
+        self.session.close()
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def limiter_for(self, url):
+        """Token bucket for the host of `url`, created on first use"""
+        host = urlsplit(url).netloc
+        with self.limiters_lock:
+            if host not in self.limiters:
+                self.limiters[host] = TokenBucket(self.host_rates.get(host, self.requests_per_second))
+            return self.limiters[host]
+
+    def url_for(self, path):
+        """Build a full URL from a path relative to base_url (absolute URLs pass through)"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, params=None):
+        """
+        GET a URL through the response cache, hitting the network only when needed
+
+        Returns:
+            requests.Response, or None if every attempt failed
+        """
+        url = self.url_for(path)
+
+        if self.cache is None:
+            return self.send(url, params=params)
+
+        return self.cache.fetch(url, params=params,
+                                send=lambda target, headers: self.send(target, headers=headers))
+
+    def send(self, url, params=None, headers=None):
+        """
+        GET a URL over the network, retrying on connection errors, 429 and 5xx responses
+
+        Returns:
+            requests.Response, or None if every attempt failed
+        """
+        limiter = self.limiter_for(url)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self._count('retries')
+
+            limiter.acquire()
+            self._count('requests')
+
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                error = e
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else backoff_delay(attempt)
+                # Back every worker on this host off, not just this one
+                limiter.pause(delay)
+                continue
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                error = e
+                break
+
+            return response
+
+        self._count('errors')
+        print(f"    Error fetching {url} {params or ''}: {error}")
+        return None
+
+    def get_json(self, path, params=None):
+        """GET a URL and decode the JSON body, or return None on failure"""
+        response = self.get(path, params=params)
+        if response is None:
+            return None
+
+        try:
+            return response.json()
+        except ValueError as e:
+            self._count('errors')
+            print(f"    Invalid JSON from {response.url}: {e}")
+            return None
+
+    def imap(self, func, items):
+        """
+        Run func(item) concurrently with at most max_in_flight calls pending
+
+        Yields (item, result) pairs in completion order. Results are handed back
+        to the calling thread, so database writes can stay on a single connection.
+        """
+        items = iter(items)
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            pending = {}
+            for item in islice(items, self.max_in_flight * 2):
+                pending[executor.submit(func, item)] = item
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    item = pending.pop(future)
+                    yield item, future.result()
+
+                for item in islice(items, len(done)):
+                    pending[executor.submit(func, item)] = item
@@ -2,9 +2,9 @@
 Find ALL duplicates across ALL tables based on logical unique keys
 """
 
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
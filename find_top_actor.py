@@ -1,7 +1,7 @@
-import sqlite3
+from db_connection import connect
 
 # Connect to the database
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
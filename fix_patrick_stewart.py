@@ -2,10 +2,10 @@
 Fix Patrick Stewart's name - move "Sir" from first_name to a separate title
 """
 
-import sqlite3
+from db_connection import connect
 
 def fix_patrick_stewart():
-    conn = sqlite3.connect('startrek.db')
+    conn = connect()
     cursor = conn.cursor()
     
     # Find Patrick Stewart (first_name = "Sir", last_name = "Patrick Stewart")
@@ -1,8 +1,8 @@
-import sqlite3
 import time
+from db_connection import connect
 
 # Try to connect with timeout
-conn = sqlite3.connect('startrek.db', timeout=10)
+conn = connect(timeout=10)
 cursor = conn.cursor()
 
 # Find Spock
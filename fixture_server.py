@@ -0,0 +1,104 @@
+"""
+Local fixture server that replays recorded HTTP responses
+Lets the populate scripts run against canned STAPI data (or IMDB pages) instead
+of the live site
+
+Usage:
+    python fixture_server.py fixtures/stapi                          # Replay recorded responses
+    python fixture_server.py fixtures/stapi --record http://stapi.co/api/v1/rest
+                                                                     # Proxy to upstream and record
+    python fixture_server.py fixtures/stapi --port 8765
+
+Then run a populate script with:
+    STAPI_BASE_URL=http://localhost:8765 python populate_full.py
+
+IMDB pages work the same way:
+    python fixture_server.py fixtures/imdb --record https://www.imdb.com
+    IMDB_BASE_URL=http://localhost:8765 python populate_crew_from_fullcredits.py
+"""
+
+import hashlib
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+
+
+def fixture_key(path):
+    """Stable file name for a request path, independent of query parameter order"""
+    parts = urlsplit(path)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return hashlib.sha1(f"{parts.path}?{query}".encode('utf-8')).hexdigest() + '.json'
+
+
+def make_handler(fixture_dir, upstream=None):
+    """Build a request handler class bound to a fixture directory"""
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            fixture_path = os.path.join(fixture_dir, fixture_key(self.path))
+
+            if upstream and not os.path.exists(fixture_path):
+                # Forward the client's User-Agent; IMDB rejects the requests default
+                headers = {'User-Agent': self.headers.get('User-Agent', 'fixture-server')}
+                response = requests.get(upstream.rstrip('/') + self.path, headers=headers, timeout=30)
+                with open(fixture_path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'path': self.path,
+                        'status': response.status_code,
+                        'content_type': response.headers.get('Content-Type', 'application/json'),
+                        'body': response.text
+                    }, f)
+
+            if not os.path.exists(fixture_path):
+                self.send_error(404, f"No fixture recorded for {self.path}")
+                return
+
+            with open(fixture_path, 'r', encoding='utf-8') as f:
+                fixture = json.load(f)
+
+            body = fixture['body'].encode('utf-8')
+            self.send_response(fixture['status'])
+            self.send_header('Content-Type', fixture['content_type'])
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def serve(fixture_dir, port=8765, upstream=None):
+    """Serve fixtures from fixture_dir until interrupted"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    server = ThreadingHTTPServer(('localhost', port), make_handler(fixture_dir, upstream))
+
+    mode = f"recording from {upstream}" if upstream else "replay only"
+    print(f"Serving {fixture_dir} on http://localhost:{port} ({mode})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or '--help' in sys.argv or '-h' in sys.argv:
+        print(__doc__)
+        sys.exit(0)
+
+    port = 8765
+    upstream = None
+    if '--port' in sys.argv:
+        port = int(sys.argv[sys.argv.index('--port') + 1])
+    if '--record' in sys.argv:
+        upstream = sys.argv[sys.argv.index('--record') + 1]
+
+    serve(sys.argv[1], port=port, upstream=upstream)
@@ -0,0 +1,316 @@
+"""
+On-disk HTTP response cache shared by the STAPI and IMDB scripts
+Responses are stored in a local SQLite file keyed by URL + query parameters,
+with bodies stored once per content hash.
+
+Behaviour is controlled with environment variables:
+    HTTP_CACHE_PATH   cache file (default: http_cache.db)
+    HTTP_CACHE_MODE   normal  - serve fresh entries, revalidate stale ones (default)
+                      replay  - offline: only serve cached entries, never touch the network
+                      refresh - always revalidate with the server (ETag / Last-Modified)
+                      off     - bypass the cache completely
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_PATH = os.environ.get('HTTP_CACHE_PATH', 'http_cache.db')
+CACHE_MODE = os.environ.get('HTTP_CACHE_MODE', 'normal')
+
+# Time-to-live per source, in seconds
+DEFAULT_TTLS = {
+    'stapi': 30 * 24 * 3600,   # STAPI data changes rarely
+    'imdb': 24 * 3600,         # Ratings and votes move daily
+    'default': 24 * 3600
+}
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+SOURCE_HOSTS = {
+    'stapi.co': 'stapi',
+    'imdb.com': 'imdb',
+}
+
+
+def source_for_url(url):
+    """Map a URL to a cache source name used for TTL lookup"""
+    host = urlsplit(url).hostname or ''
+    for suffix, source in SOURCE_HOSTS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return source
+    return 'default'
+
+
+def canonical_url(url, params=None):
+    """Full request URL with query parameters in a stable order"""
+    if params:
+        params = sorted(params.items()) if isinstance(params, dict) else sorted(params)
+    return requests.Request('GET', url, params=params).prepare().url
+
+
+def build_response(url, status, headers, body):
+    """Rebuild a requests.Response from a cache row"""
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers = CaseInsensitiveDict(headers)
+    response.url = url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of GET responses with per-source TTLs and revalidation"""
+
+    def __init__(self, path=CACHE_PATH, ttls=None, max_bytes=DEFAULT_MAX_BYTES, mode=CACHE_MODE):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS bodies (
+                digest TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                source TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                digest TEXT NOT NULL REFERENCES bodies(digest),
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+        """)
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+
+    def close(self):
+        """Close the cache database"""
+        self.conn.close()
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def lookup(self, url):
+        """
+        Find a cached response for a canonical URL
+
+        Returns:
+            (response, is_fresh, validators) or None if nothing is cached
+        """
+        key = self.key_for(url)
+
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT r.status, r.headers, r.fetched_at, r.source, b.body
+                FROM responses r JOIN bodies b ON r.digest = b.digest
+                WHERE r.key = ?
+            """, (key,)).fetchone()
+
+            if row is None:
+                return None
+
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+
+        status, headers_json, fetched_at, source, body = row
+        headers = json.loads(headers_json)
+        is_fresh = time.time() - fetched_at < self.ttls.get(source, self.ttls['default'])
+
+        validators = {}
+        if headers.get('ETag'):
+            validators['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = headers['Last-Modified']
+
+        return build_response(url, status, headers, body), is_fresh, validators
+
+    def store(self, url, response):
+        """Save a successful response"""
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        headers = {name: response.headers[name]
+                   for name in ('Content-Type', 'ETag', 'Last-Modified')
+                   if name in response.headers}
+        now = time.time()
+
+        key = self.key_for(url)
+
+        with self.lock:
+            previous = self.conn.execute("SELECT digest FROM responses WHERE key = ?", (key,)).fetchone()
+
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO bodies (digest, body, size) VALUES (?, ?, ?)",
+                (digest, body, len(body))
+            )
+            if cursor.rowcount > 0:
+                self.total_bytes += len(body)
+
+            self.conn.execute("""
+                INSERT OR REPLACE INTO responses
+                (key, url, source, status, headers, digest, fetched_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, url, source_for_url(url), response.status_code,
+                  json.dumps(headers), digest, now, now))
+
+            # The replaced entry's body goes too, unless another response shares it
+            if previous is not None and previous[0] != digest:
+                self._drop_unreferenced_body(previous[0])
+
+            self.stats['stored'] += 1
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def mark_revalidated(self, url):
+        """Reset the TTL of an entry after a 304 Not Modified"""
+        with self.lock:
+            self.conn.execute("UPDATE responses SET fetched_at = ? WHERE key = ?",
+                              (time.time(), self.key_for(url)))
+            self.conn.commit()
+
+    def _drop_unreferenced_body(self, digest):
+        """Delete a body that no response points to any more (lock held)"""
+        row = self.conn.execute("""
+            SELECT size FROM bodies
+            WHERE digest = ? AND NOT EXISTS (SELECT 1 FROM responses WHERE digest = ?)
+        """, (digest, digest)).fetchone()
+        if row is not None:
+            self.conn.execute("DELETE FROM bodies WHERE digest = ?", (digest,))
+            self.total_bytes -= row[0]
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key FROM responses ORDER BY last_access").fetchall()
+
+        for start in range(0, len(rows), 100):
+            if self.total_bytes <= target:
+                break
+
+            batch = [row[0] for row in rows[start:start + 100]]
+            placeholders = ','.join('?' * len(batch))
+            self.conn.execute(f"DELETE FROM responses WHERE key IN ({placeholders})", batch)
+            self.stats['evicted'] += len(batch)
+
+            freed = self.conn.execute("""
+                SELECT COALESCE(SUM(size), 0) FROM bodies
+                WHERE digest NOT IN (SELECT digest FROM responses)
+            """).fetchone()[0]
+            self.conn.execute("DELETE FROM bodies WHERE digest NOT IN (SELECT digest FROM responses)")
+            self.total_bytes -= freed
+
+    def fetch(self, url, params=None, send=None):
+        """
+        GET through the cache
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            send: callable(url, headers) -> requests.Response, or None when the
+                  network request fails; defaults to send_request
+
+        Returns:
+            requests.Response, or None if nothing could be fetched or replayed
+        """
+        full_url = canonical_url(url, params)
+        if send is None:
+            send = send_request
+
+        if self.mode == 'off':
+            return send(full_url, {})
+
+        cached = self.lookup(full_url)
+
+        if self.mode == 'replay':
+            if cached is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            return cached[0]
+
+        if cached is not None and cached[1] and self.mode != 'refresh':
+            self.stats['hits'] += 1
+            return cached[0]
+
+        validators = cached[2] if cached is not None else {}
+        response = send(full_url, validators)
+
+        if response is None:
+            # Network failed: a stale copy is better than nothing
+            if cached is not None:
+                self.stats['hits'] += 1
+                return cached[0]
+            self.stats['misses'] += 1
+            return None
+
+        if response.status_code == 304 and cached is not None:
+            self.stats['revalidated'] += 1
+            self.mark_revalidated(full_url)
+            return cached[0]
+
+        self.stats['misses'] += 1
+        if response.status_code == 200:
+            self.store(full_url, response)
+        return response
+
+
+def send_request(url, headers, timeout=30):
+    """Plain GET for ResponseCache.fetch: None on a network error, so a stale entry can be served"""
+    try:
+        return requests.get(url, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        print(f"  Request failed for {url}: {e}")
+        return None
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache instance used by cached_get and FetchEngine"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
+
+
+def cached_get(url, params=None, headers=None, timeout=30):
+    """
+    Drop-in replacement for requests.get that goes through the shared cache
+
+    A network error falls back to a stale cached copy when there is one.
+    Raises requests.exceptions.ConnectionError when there is no response to
+    return (network error or replay mode with no entry), so existing
+    `except requests.exceptions.RequestException` blocks handle it.
+    """
+    def send(target, extra_headers):
+        return send_request(target, dict(headers or {}, **extra_headers), timeout=timeout)
+
+    if CACHE_MODE == 'off':
+        return requests.get(url, params=params, headers=headers, timeout=timeout)
+
+    response = default_cache().fetch(url, params=params, send=send)
+    if response is None:
+        reason = "HTTP_CACHE_MODE=replay" if CACHE_MODE == 'replay' else "request failed"
+        raise requests.exceptions.ConnectionError(f"{url} is not cached ({reason})")
+    return response
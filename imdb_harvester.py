@@ -0,0 +1,189 @@
+"""
+IMDB season harvester
+One crawler for the /title/{id}/episodes?season=N pages (parsed by
+imdb_parser), shared by the ratings, episode id and description scripts.
+Each season page is fetched once and gives every episode's rating, votes,
+IMDB id, description and air date, which are written to the matching
+Episodes rows in one batch.
+
+The canonical series -> IMDB id registry is stored in Series.imdb_id; the
+SERIES_IMDB_IDS below only seed series that don't have one yet.
+
+Usage:
+    python imdb_harvester.py              # Harvest every series with an IMDB id
+    python imdb_harvester.py TNG DS9      # Harvest only these series
+"""
+
+import random
+import sqlite3
+import sys
+import time
+
+from db_connection import connect
+from http_cache import cached_get
+from imdb_parser import parse_season_page
+
+# Seed values for Series.imdb_id
+SERIES_IMDB_IDS = {
+    'TOS': 'tt0060028',   # The Original Series
+    'TAS': 'tt0069637',   # The Animated Series
+    'TNG': 'tt0092455',   # The Next Generation
+    'DS9': 'tt0106145',   # Deep Space Nine
+    'VOY': 'tt0112178',   # Voyager
+    'ENT': 'tt0244365',   # Enterprise
+    'DIS': 'tt5171438',   # Discovery
+    'PIC': 'tt8806524',   # Picard
+    'LD': 'tt9184820',    # Lower Decks
+    'PRO': 'tt9795876',   # Prodigy
+    'SNW': 'tt12327578',  # Strange New Worlds
+}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Episodes columns the harvester writes, beyond the rating columns in schema.sql
+EPISODE_COLUMNS = {'description': 'TEXT', 'imdb_id': 'VARCHAR(20)'}
+
+
+def add_column(cursor, table, column, column_type):
+    try:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        print(f"✓ Added '{column}' column to {table}")
+    except sqlite3.OperationalError as e:
+        if 'duplicate column name' not in str(e).lower():
+            raise
+
+
+def ensure_harvest_columns(conn):
+    """Add Series.imdb_id and the Episodes columns if missing, and seed the series registry"""
+    cursor = conn.cursor()
+    add_column(cursor, 'Series', 'imdb_id', 'VARCHAR(20)')
+    for column, column_type in EPISODE_COLUMNS.items():
+        add_column(cursor, 'Episodes', column, column_type)
+
+    cursor.executemany("""
+        UPDATE Series SET imdb_id = ?
+        WHERE abbreviation = ? AND imdb_id IS NULL
+    """, [(imdb_id, abbr) for abbr, imdb_id in SERIES_IMDB_IDS.items()])
+    conn.commit()
+
+
+def series_registry(conn, abbreviations=None):
+    """(series_id, abbreviation, imdb_id) for every series with an IMDB id, optionally filtered"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT series_id, abbreviation, imdb_id FROM Series
+        WHERE imdb_id IS NOT NULL
+        ORDER BY start_year, series_id
+    """)
+    rows = cursor.fetchall()
+    if abbreviations:
+        rows = [row for row in rows if row[1] in abbreviations]
+    return rows
+
+
+def harvest_season(series_imdb_id, season):
+    """
+    Download and parse one IMDB season page
+
+    Args:
+        series_imdb_id: IMDB ID for the series (e.g., 'tt0092455' for TNG)
+        season: Season number
+
+    Returns:
+        dict: episode number -> {'title', 'description', 'rating', 'votes',
+        'imdb_id', 'air_date'} (empty if the page couldn't be fetched)
+    """
+    url = f"https://www.imdb.com/title/{series_imdb_id}/episodes?season={season}"
+
+    try:
+        response = cached_get(url, headers=HEADERS, timeout=15)
+        if not getattr(response, 'from_cache', False):
+            time.sleep(random.uniform(1, 2))  # Rate limiting, only when IMDB was actually hit
+        response.raise_for_status()
+    except Exception as e:
+        print(f"  Error fetching season {season}: {e}")
+        return {}
+
+    return parse_season_page(response.text)
+
+
+def update_season(cursor, series_id, season, episodes):
+    """
+    Write one season's harvested fields to Episodes in a single executemany
+
+    Fields the page didn't have leave the stored value alone, and an existing
+    air_date (from STAPI) is kept. Returns the number of rows updated.
+    """
+    rows = [(ep['description'], ep['rating'], ep['votes'], ep['imdb_id'], ep['air_date'],
+             series_id, season, ep_num)
+            for ep_num, ep in episodes.items()]
+
+    before = cursor.connection.total_changes
+    cursor.executemany("""
+        UPDATE Episodes
+        SET description = COALESCE(?, description),
+            imdb_rating = COALESCE(?, imdb_rating),
+            imdb_votes = COALESCE(?, imdb_votes),
+            imdb_id = COALESCE(?, imdb_id),
+            air_date = COALESCE(air_date, ?)
+        WHERE series_id = ? AND season = ? AND episode_number = ?
+    """, rows)
+    return cursor.connection.total_changes - before
+
+
+def harvest_series(conn, series_id, abbreviation, series_imdb_id):
+    """Harvest every season of one series that has episodes in the database"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT DISTINCT season FROM Episodes
+        WHERE series_id = ? AND season IS NOT NULL
+        ORDER BY season
+    """, (series_id,))
+    seasons = [row[0] for row in cursor.fetchall()]
+
+    print(f"\n{abbreviation} ({series_imdb_id}): {len(seasons)} seasons")
+
+    found = updated = 0
+    for season in seasons:
+        episodes = harvest_season(series_imdb_id, season)
+        season_updated = update_season(cursor, series_id, season, episodes)
+        conn.commit()
+
+        found += len(episodes)
+        updated += season_updated
+        print(f"  Season {season}: {len(episodes)} episodes on IMDB, {season_updated} updated")
+
+    return found, updated
+
+
+def harvest_all(conn=None, abbreviations=None):
+    """Harvest every registered series (or just `abbreviations`) in one crawl"""
+    own_connection = conn is None
+    if own_connection:
+        conn = connect()
+
+    ensure_harvest_columns(conn)
+
+    total_found = total_updated = 0
+    for series_id, abbreviation, series_imdb_id in series_registry(conn, abbreviations):
+        found, updated = harvest_series(conn, series_id, abbreviation, series_imdb_id)
+        total_found += found
+        total_updated += updated
+
+    if own_connection:
+        conn.close()
+
+    print("\n" + "="*70)
+    print(f"IMDB: {total_found} episodes found, {total_updated} database rows updated")
+    print("="*70)
+    return total_found, total_updated
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("HARVESTING IMDB SEASON PAGES")
+    print("="*70)
+
+    harvest_all(abbreviations=sys.argv[1:] or None)
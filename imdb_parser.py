@@ -0,0 +1,471 @@
+"""
+IMDB page parsing
+Targeted extraction for the season, title and credits pages. With lxml
+installed, pages are parsed by libxml2 and queried with precompiled XPath
+expressions; otherwise BeautifulSoup only builds the episode-list or credits
+region of the page (SoupStrainer), not the whole document.
+
+Both backends return the same plain data, so callers don't care which one ran.
+When a page embeds its data as JSON (__NEXT_DATA__ / JSON-LD), that is read
+instead and the DOM isn't parsed at all.
+
+Usage:
+    from imdb_parser import parse_season_page, parse_episode_crew
+
+    episodes = parse_season_page(response.text)
+    crew = parse_episode_crew(response.text)
+"""
+
+import json
+import re
+from datetime import datetime
+from html import unescape
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+# Embedded payloads, found without building a tree
+NEXT_DATA_RE = re.compile(r'<script[^>]*\bid="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+JSON_LD_RE = re.compile(r'<script[^>]*\btype="application/ld\+json"[^>]*>(.*?)</script>', re.DOTALL)
+
+EPISODE_NUMBER_RE = re.compile(r'S\d+\.E(\d+)')
+TITLE_ID_RE = re.compile(r'/title/(tt\d+)')
+
+# Season-page item classes, in order of preference (current layout, then the old one)
+SEASON_ITEM_CLASSES = [('article', 'episode-item-wrapper'), ('div', 'list_item')]
+
+
+def embedded_json(pattern, html):
+    """The first script payload matching `pattern`, decoded, or None"""
+    match = pattern.search(html) if html else None
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def next_data(html):
+    """IMDB's embedded __NEXT_DATA__ JSON as a dict, or None if the page has none"""
+    data = embedded_json(NEXT_DATA_RE, html)
+    return data if isinstance(data, dict) else None
+
+
+def json_ld(html):
+    """The page's schema.org JSON-LD object (TVEpisode, TVSeries...), or None"""
+    data = embedded_json(JSON_LD_RE, html)
+    if isinstance(data, list):
+        data = next((item for item in data if isinstance(item, dict)), None)
+    return data if isinstance(data, dict) else None
+
+
+def parse_vote_count(text):
+    """Vote count from text like '(1,234)', '(1.2K)' or '2M'; None if unparseable"""
+    text = text.strip().strip('()').replace(',', '').upper()
+    multiplier = 1
+    if text.endswith('K'):
+        multiplier, text = 1000, text[:-1]
+    elif text.endswith('M'):
+        multiplier, text = 1000000, text[:-1]
+    try:
+        return int(round(float(text) * multiplier))
+    except ValueError:
+        return None
+
+
+def parse_air_date(text):
+    """ISO date from IMDB's 'Mon, Sep 28, 1987' style dates; None if it isn't one"""
+    for fmt in ('%a, %b %d, %Y', '%b %d, %Y', '%d %b. %Y', '%d %b %Y'):
+        try:
+            return datetime.strptime(text.strip(), fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def squash(text):
+    """Collapse runs of whitespace, as left between inline tags"""
+    return ' '.join(text.split()) if text else None
+
+
+def season_episode(raw):
+    """
+    Episode number and fields from the raw strings of one season-page item
+
+    `raw` has 'heading', 'plot', 'href', 'rating', 'votes' (text or None) and
+    'dates' (candidate air-date texts), as produced by either backend.
+    """
+    heading = raw['heading']
+    if heading is None:
+        return None, {}
+
+    # "S1.E1 ∙ Episode Title" (or a bare number in the older markup)
+    match = EPISODE_NUMBER_RE.search(heading) or re.fullmatch(r'\s*(\d+)\s*', heading)
+    if not match:
+        return None, {}
+
+    episode = {'title': None, 'description': squash(raw['plot']), 'rating': None, 'votes': None,
+               'imdb_id': None, 'air_date': None}
+
+    if '∙' in heading:
+        episode['title'] = heading.split('∙', 1)[1].strip()
+
+    if raw['href']:
+        id_match = TITLE_ID_RE.search(raw['href'])
+        episode['imdb_id'] = id_match.group(1) if id_match else None
+
+    if raw['rating']:
+        try:
+            episode['rating'] = float(raw['rating'].strip())
+        except ValueError:
+            pass
+
+    if raw['votes']:
+        episode['votes'] = parse_vote_count(raw['votes'])
+
+    for text in raw['dates']:
+        air_date = parse_air_date(text)
+        if air_date:
+            episode['air_date'] = air_date
+            break
+
+    return int(match.group(1)), episode
+
+
+def credits_from_items(items):
+    """Director and writers from (item text, link texts) pairs of the credits list"""
+    director = None
+    writers = []
+
+    for text, links in items:
+        # Check for Director
+        if 'Director' in text and 'Directors' not in text and links:
+            director = links[0]
+
+        # Check for Writers - include all writers from the Writers section
+        if 'Writer' in text:
+            for writer_name in links:
+                if writer_name and writer_name not in writers:
+                    writers.append(writer_name)
+
+    return {
+        'director': director,
+        'writer': ', '.join(writers) if writers else None
+    }
+
+
+# --- Embedded structured data ----------------------------------------------
+# IMDB pages carry their data as JSON (__NEXT_DATA__, and JSON-LD on title
+# pages). Reading it is one json.loads and gives exact vote counts, so the
+# DOM is only parsed when a page has no usable payload.
+
+def dig(data, *keys):
+    """data[k1][k2]... or None as soon as a level is missing"""
+    for key in keys:
+        if isinstance(data, dict):
+            data = data.get(key)
+        elif isinstance(data, list) and isinstance(key, int) and -len(data) <= key < len(data):
+            data = data[key]
+        else:
+            return None
+    return data
+
+
+def as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iso_date(parts):
+    """ISO date from a {'year', 'month', 'day'} dict; None unless all three are there"""
+    year, month, day = (as_int(dig(parts, key)) for key in ('year', 'month', 'day'))
+    if not (year and month and day):
+        return None
+    try:
+        return datetime(year, month, day).date().isoformat()
+    except ValueError:
+        return None
+
+
+def season_from_next_data(data):
+    """Season-page episodes from __NEXT_DATA__, or None if the payload has no episode list"""
+    items = dig(data, 'props', 'pageProps', 'contentData', 'section', 'episodes', 'items')
+    if not isinstance(items, list) or not items:
+        return None
+
+    episodes = {}
+    for item in items:
+        ep_num = as_int(dig(item, 'episode'))
+        if ep_num is None or ep_num in episodes:
+            continue
+
+        imdb_id = dig(item, 'id')
+        plot = dig(item, 'plot')
+        episodes[ep_num] = {
+            'title': unescape(dig(item, 'titleText') or '') or None,
+            'description': squash(unescape(plot)) if isinstance(plot, str) else None,
+            'rating': as_float(dig(item, 'aggregateRating')) or None,
+            'votes': as_int(dig(item, 'voteCount')) or None,
+            'imdb_id': imdb_id if isinstance(imdb_id, str) and imdb_id.startswith('tt') else None,
+            'air_date': iso_date(dig(item, 'releaseDate')),
+        }
+    return episodes
+
+
+def people(value):
+    """Person names from a JSON-LD director/creator value (one object or a list)"""
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [unescape(item['name']) for item in value
+            if isinstance(item, dict) and item.get('@type', 'Person') == 'Person' and item.get('name')]
+
+
+def title_from_structured(html):
+    """
+    Plot, rating, exact vote count, directors and writers of a title page
+
+    __NEXT_DATA__ is read first and JSON-LD fills whatever it lacks; fields in
+    neither are None (directors/writers empty).
+    """
+    title = {'description': None, 'rating': None, 'votes': None, 'directors': [], 'writers': []}
+
+    fold = dig(next_data(html), 'props', 'pageProps', 'aboveTheFoldData')
+    if fold:
+        plot = dig(fold, 'plot', 'plotText', 'plainText')
+        title['description'] = squash(plot) if isinstance(plot, str) else None
+        title['rating'] = as_float(dig(fold, 'ratingsSummary', 'aggregateRating'))
+        title['votes'] = as_int(dig(fold, 'ratingsSummary', 'voteCount'))
+
+        for group in dig(fold, 'principalCredits') or []:
+            category = dig(group, 'category', 'id')
+            names = [dig(credit, 'name', 'nameText', 'text') for credit in dig(group, 'credits') or []]
+            names = [name for name in names if name]
+            if category == 'director':
+                title['directors'] = names
+            elif category == 'writer':
+                title['writers'] = names
+
+    ld = json_ld(html)
+    if ld:
+        if not title['description'] and isinstance(ld.get('description'), str):
+            title['description'] = squash(unescape(ld['description']))
+        if title['rating'] is None:
+            title['rating'] = as_float(dig(ld, 'aggregateRating', 'ratingValue'))
+        if title['votes'] is None:
+            title['votes'] = as_int(dig(ld, 'aggregateRating', 'ratingCount'))
+        if not title['directors']:
+            title['directors'] = people(ld.get('director'))
+        if not title['writers']:
+            title['writers'] = people(ld.get('creator'))
+
+    return title
+
+
+# --- lxml backend -----------------------------------------------------------
+
+if HAVE_LXML:
+    def _has_class(cls):
+        return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+    LX_SEASON_ITEMS = [etree.XPath(f"//{tag}[{_has_class(cls)}]") for tag, cls in SEASON_ITEM_CLASSES]
+    LX_HEADING = [etree.XPath(f".//div[{_has_class('ipc-title__text')}]"),
+                  etree.XPath(".//meta[@itemprop='episodeNumber']/@content")]
+    LX_PLOT = [etree.XPath(f".//div[{_has_class('ipc-html-content-inner-div')}]"),
+               etree.XPath(f".//div[{_has_class('item_description')}]")]
+    LX_HREF = [etree.XPath(".//a[contains(@href, '/title/tt')]/@href")]
+    LX_RATING = [etree.XPath(f".//span[{_has_class('ipc-rating-star--rating')}]"),
+                 etree.XPath(f".//span[{_has_class('ipl-rating-star__rating')}]")]
+    LX_VOTES = [etree.XPath(f".//span[{_has_class('ipc-rating-star--voteCount')}]"),
+                etree.XPath(f".//span[{_has_class('ipl-rating-star__total-votes')}]")]
+    LX_AIRDATE = etree.XPath(".//*[contains(@class, 'airdate')]")
+    LX_SPANS = etree.XPath(".//span")
+
+    LX_CREDIT_ITEMS = etree.XPath("//li[contains(@class, 'ipc-metadata-list__item')]")
+    LX_LINKS = etree.XPath(".//a")
+
+    LX_DESCRIPTION = [etree.XPath("//span[@data-testid='plot-xl']"),
+                      etree.XPath(f"//section[@data-testid='Storyline']//div[{_has_class('ipc-html-content-inner-div')}]"),
+                      etree.XPath("//meta[@name='description']/@content")]
+
+    def _text(node):
+        return node if isinstance(node, str) else node.text_content()
+
+    def _first(node, xpaths):
+        """Text of the first match of the first XPath that matches anything"""
+        for xpath in xpaths:
+            found = xpath(node)
+            if found:
+                return _text(found[0])
+        return None
+
+    def _lxml_document(html):
+        # libxml2 refuses an empty document; treat it as a page with nothing on it
+        return lxml_html.document_fromstring(html if html and html.strip() else '<html></html>')
+
+    def _lxml_season_items(html):
+        document = _lxml_document(html)
+        for xpath in LX_SEASON_ITEMS:
+            items = xpath(document)
+            if items:
+                break
+
+        for item in items:
+            plot = _first(item, LX_PLOT)
+            yield {
+                'heading': _first(item, LX_HEADING),
+                'plot': plot,
+                'href': _first(item, LX_HREF),
+                'rating': _first(item, LX_RATING),
+                'votes': _first(item, LX_VOTES),
+                'dates': [_text(node) for node in (LX_AIRDATE(item) or LX_SPANS(item))],
+            }
+
+    def _lxml_credit_items(html):
+        for li in LX_CREDIT_ITEMS(_lxml_document(html)):
+            yield li.text_content(), [link.text_content().strip() for link in LX_LINKS(li)]
+
+    def _lxml_title_description(html):
+        document = _lxml_document(html)
+        for xpath in LX_DESCRIPTION:
+            for node in xpath(document):
+                description = squash(_text(node))
+                if description:
+                    return description
+        return None
+
+
+# --- BeautifulSoup fallback ---------------------------------------------------
+
+def _is_season_item(css_class):
+    # While straining, bs4 passes the whole class attribute, not single classes
+    return css_class is not None and any(cls in css_class.split() for _, cls in SEASON_ITEM_CLASSES)
+
+
+SEASON_STRAINER = SoupStrainer(['article', 'div'], class_=_is_season_item)
+def _is_credit_item(css_class):
+    return css_class is not None and 'ipc-metadata-list__item' in css_class
+
+
+CREDITS_STRAINER = SoupStrainer('li', class_=_is_credit_item)
+DESCRIPTION_STRAINER = SoupStrainer(['span', 'section', 'meta'])
+
+
+def _soup_first(item, *finds):
+    for name, attrs in finds:
+        found = item.find(name, attrs)
+        if found:
+            return found
+    return None
+
+
+def _soup_season_items(html):
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SEASON_STRAINER)
+    for tag, cls in SEASON_ITEM_CLASSES:
+        items = soup.find_all(tag, class_=cls)
+        if items:
+            break
+
+    for item in items:
+        heading = _soup_first(item, ('div', {'class': 'ipc-title__text'}),
+                              ('meta', {'itemprop': 'episodeNumber'}))
+        plot = _soup_first(item, ('div', {'class': 'ipc-html-content-inner-div'}),
+                           ('div', {'class': 'item_description'}))
+        link = item.find('a', href=TITLE_ID_RE)
+        rating = _soup_first(item, ('span', {'class': 'ipc-rating-star--rating'}),
+                             ('span', {'class': 'ipl-rating-star__rating'}))
+        votes = _soup_first(item, ('span', {'class': 'ipc-rating-star--voteCount'}),
+                            ('span', {'class': 'ipl-rating-star__total-votes'}))
+        dates = item.find_all(class_=re.compile('airdate')) or item.find_all('span')
+
+        yield {
+            'heading': (heading.get('content') if heading.name == 'meta' else heading.get_text()) if heading else None,
+            'plot': plot.get_text() if plot else None,
+            'href': link['href'] if link else None,
+            'rating': rating.get_text() if rating else None,
+            'votes': votes.get_text() if votes else None,
+            'dates': [node.get_text() for node in dates],
+        }
+
+
+def _soup_credit_items(html):
+    soup = BeautifulSoup(html, 'html.parser', parse_only=CREDITS_STRAINER)
+    for li in soup.find_all('li', class_=_is_credit_item):
+        yield li.get_text(), [link.get_text(strip=True) for link in li.find_all('a')]
+
+
+def _soup_title_description(html):
+    soup = BeautifulSoup(html, 'html.parser', parse_only=DESCRIPTION_STRAINER)
+
+    plot_span = soup.find('span', {'data-testid': 'plot-xl'})
+    if plot_span and squash(plot_span.get_text()):
+        return squash(plot_span.get_text())
+
+    storyline = soup.find('section', {'data-testid': 'Storyline'})
+    plot_div = storyline.find('div', class_='ipc-html-content-inner-div') if storyline else None
+    if plot_div and squash(plot_div.get_text()):
+        return squash(plot_div.get_text())
+
+    meta_desc = soup.find('meta', {'name': 'description'})
+    if meta_desc:
+        return squash(meta_desc.get('content', ''))
+    return None
+
+
+# --- Public API ------------------------------------------------------------
+
+def parse_season_page(html):
+    """episode number -> {'title', 'description', 'rating', 'votes', 'imdb_id', 'air_date'}"""
+    episodes = season_from_next_data(next_data(html))
+    if episodes:
+        return episodes
+
+    raw_items = _lxml_season_items(html) if HAVE_LXML else _soup_season_items(html)
+
+    episodes = {}
+    for raw in raw_items:
+        ep_num, episode = season_episode(raw)
+        if ep_num is not None and ep_num not in episodes:
+            episodes[ep_num] = episode
+    return episodes
+
+
+def parse_episode_crew(html):
+    """{'director', 'writer'} from an episode title page (writers comma-separated)"""
+    title = title_from_structured(html)
+    if title['directors'] or title['writers']:
+        writers = list(dict.fromkeys(title['writers']))
+        return {
+            'director': title['directors'][0] if title['directors'] else None,
+            'writer': ', '.join(writers) if writers else None
+        }
+
+    items = _lxml_credit_items(html) if HAVE_LXML else _soup_credit_items(html)
+    return credits_from_items(items)
+
+
+def parse_title_description(html):
+    """Plot summary from an episode title page, or None"""
+    description = title_from_structured(html)['description']
+    if description:
+        return description
+
+    description = _lxml_title_description(html) if HAVE_LXML else _soup_title_description(html)
+    return description or None
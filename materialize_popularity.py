@@ -0,0 +1,383 @@
+"""
+Materialized popularity tables
+Keeps per-character, per-species and per-actor appearance aggregates in
+Character_Popularity, Species_Popularity and Actor_Popularity: episode counts,
+vote-weighted rating sums, total votes, series lists and a popularity score.
+
+Triggers on Character_Episodes, Episodes, Characters, Character_Actors and
+Character_Effective_Actor put the affected entities on the Popularity_Dirty queue; a refresh recomputes only
+those rows. Popularity reports are then single indexed SELECTs.
+
+Usage:
+    python materialize_popularity.py            # Install tables/triggers, refresh dirty rows
+    python materialize_popularity.py --full     # Rebuild every row
+    python materialize_popularity.py --top 20   # Refresh, then show the top 20 of each
+"""
+
+import math
+import sys
+
+from db_connection import connect
+from effective_actor import ensure_effective_actor_mapping
+
+# Shared aggregate columns: appearance counts, vote-weighted rating and score
+AGGREGATE_COLUMNS = """
+    num_episodes INTEGER NOT NULL,
+    rated_episodes INTEGER NOT NULL,
+    total_votes INTEGER NOT NULL,
+    weighted_rating_sum REAL NOT NULL, -- SUM(imdb_rating * imdb_votes) over rated episodes
+    rating_sum REAL NOT NULL,
+    weighted_avg_rating REAL NOT NULL,
+    popularity_score REAL NOT NULL,    -- weighted_avg_rating * ln(1 + total_votes) / 10
+    series TEXT,                       -- comma-separated series abbreviations
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+"""
+
+TABLES_SQL = f"""
+    CREATE TABLE IF NOT EXISTS Popularity_Dirty (
+        entity_type VARCHAR(20) NOT NULL, -- character, species, actor
+        entity_id INTEGER NOT NULL,
+        PRIMARY KEY (entity_type, entity_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS Character_Popularity (
+        character_id INTEGER PRIMARY KEY,
+        {AGGREGATE_COLUMNS}
+    );
+
+    CREATE TABLE IF NOT EXISTS Species_Popularity (
+        species_id INTEGER PRIMARY KEY,
+        num_characters INTEGER NOT NULL,
+        {AGGREGATE_COLUMNS}
+    );
+
+    CREATE TABLE IF NOT EXISTS Actor_Popularity (
+        actor_id INTEGER PRIMARY KEY,
+        num_characters INTEGER NOT NULL,
+        {AGGREGATE_COLUMNS}
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_character_popularity_score ON Character_Popularity(popularity_score);
+    CREATE INDEX IF NOT EXISTS idx_species_popularity_score ON Species_Popularity(popularity_score);
+    CREATE INDEX IF NOT EXISTS idx_actor_popularity_score ON Actor_Popularity(popularity_score);
+"""
+
+# Characters are the unit of change; species and actors are derived from the
+# dirty characters at refresh time, plus their old values when they change
+TRIGGERS_SQL = """
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_appearance_insert
+    AFTER INSERT ON Character_Episodes
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', NEW.character_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_appearance_delete
+    AFTER DELETE ON Character_Episodes
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', OLD.character_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_appearance_update
+    AFTER UPDATE OF character_id, episode_id ON Character_Episodes
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', OLD.character_id);
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', NEW.character_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_episode_rating
+    AFTER UPDATE OF imdb_rating, imdb_votes, series_id ON Episodes
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty
+        SELECT 'character', character_id FROM Character_Episodes WHERE episode_id = NEW.episode_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_character_species
+    AFTER UPDATE OF species_id ON Characters
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', NEW.character_id);
+        INSERT OR IGNORE INTO Popularity_Dirty
+        SELECT 'species', OLD.species_id WHERE OLD.species_id IS NOT NULL;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_role_insert
+    AFTER INSERT ON Character_Actors
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', NEW.character_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_role_delete
+    AFTER DELETE ON Character_Actors
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', OLD.character_id);
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('actor', OLD.actor_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_role_update
+    AFTER UPDATE OF character_id, actor_id ON Character_Actors
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', OLD.character_id);
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', NEW.character_id);
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('actor', OLD.actor_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_character_primary_actor
+    AFTER UPDATE OF primary_actor_id ON Characters
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('character', NEW.character_id);
+        INSERT OR IGNORE INTO Popularity_Dirty
+        SELECT 'actor', OLD.primary_actor_id WHERE OLD.primary_actor_id IS NOT NULL;
+    END;
+
+    -- The effective_actor triggers replace a character's mapping rows whenever its
+    -- roles or primary actor change, so every actor it used to credit is queued here
+    -- (e.g. the Character_Actors roles dropped when a primary actor is set)
+    CREATE TRIGGER IF NOT EXISTS trg_popularity_effective_actor_delete
+    AFTER DELETE ON Character_Effective_Actor
+    BEGIN
+        INSERT OR IGNORE INTO Popularity_Dirty VALUES ('actor', OLD.actor_id);
+    END;
+"""
+
+# Aggregates over rated episodes, shared by the three entity queries
+RATING_AGGREGATES = """
+    COUNT(*) AS num_episodes,
+    COUNT(e.imdb_rating) AS rated_episodes,
+    COALESCE(SUM(CASE WHEN e.imdb_rating IS NOT NULL THEN COALESCE(e.imdb_votes, 0) END), 0) AS total_votes,
+    COALESCE(SUM(e.imdb_rating * COALESCE(e.imdb_votes, 0)), 0) AS weighted_rating_sum,
+    COALESCE(SUM(e.imdb_rating), 0) AS rating_sum,
+    GROUP_CONCAT(DISTINCT s.abbreviation) AS series
+"""
+
+# Vote-weighted average, falling back to the plain mean when no episode has votes
+SCORED_SELECT = """
+    SELECT *, weighted_avg_rating * ln1p(total_votes) / 10 AS popularity_score
+    FROM (
+        SELECT *,
+            CASE WHEN total_votes > 0 THEN weighted_rating_sum / total_votes
+                 WHEN rated_episodes > 0 THEN rating_sum / rated_episodes
+                 ELSE 0 END AS weighted_avg_rating
+        FROM ({aggregate})
+    )
+"""
+
+# Appearance rows per character; for species, the character's species
+CHARACTER_AGGREGATE = f"""
+    SELECT ce.character_id AS entity_id, {RATING_AGGREGATES}
+    FROM Character_Episodes ce
+    JOIN Episodes e ON ce.episode_id = e.episode_id
+    JOIN Series s ON e.series_id = s.series_id
+    {{where}}
+    GROUP BY ce.character_id
+"""
+
+SPECIES_AGGREGATE = f"""
+    SELECT c.species_id AS entity_id, COUNT(DISTINCT ce.character_id) AS num_characters, {RATING_AGGREGATES}
+    FROM Character_Episodes ce
+    JOIN Characters c ON ce.character_id = c.character_id
+    JOIN Episodes e ON ce.episode_id = e.episode_id
+    JOIN Series s ON e.series_id = s.series_id
+    WHERE c.species_id IS NOT NULL {{and_where}}
+    GROUP BY c.species_id
+"""
+
+# Actors get each episode once, however many of their characters appear in it
+ACTOR_ROLES = """
+    SELECT DISTINCT ea.actor_id, ea.character_id, ce.episode_id
+    FROM Character_Effective_Actor ea
+    JOIN Character_Episodes ce ON ea.character_id = ce.character_id
+"""
+
+ACTOR_AGGREGATE = f"""
+    SELECT ae.actor_id AS entity_id, MAX(ac.num_characters) AS num_characters, {RATING_AGGREGATES}
+    FROM (SELECT DISTINCT actor_id, episode_id FROM actor_roles) ae
+    JOIN (
+        SELECT actor_id, COUNT(DISTINCT character_id) AS num_characters
+        FROM actor_roles
+        GROUP BY actor_id
+    ) ac ON ae.actor_id = ac.actor_id
+    JOIN Episodes e ON ae.episode_id = e.episode_id
+    JOIN Series s ON e.series_id = s.series_id
+    GROUP BY ae.actor_id
+"""
+
+# entity type -> (table, key column, extra columns, aggregate query)
+ENTITIES = {
+    'character': ('Character_Popularity', 'character_id', [], CHARACTER_AGGREGATE),
+    'species': ('Species_Popularity', 'species_id', ['num_characters'], SPECIES_AGGREGATE),
+    'actor': ('Actor_Popularity', 'actor_id', ['num_characters'], ACTOR_AGGREGATE),
+}
+
+VALUE_COLUMNS = ['num_episodes', 'rated_episodes', 'total_votes', 'weighted_rating_sum',
+                 'rating_sum', 'series', 'weighted_avg_rating', 'popularity_score']
+
+
+def install(conn):
+    """Create the popularity tables, dirty queue and triggers"""
+    ensure_effective_actor_mapping(conn)
+    cursor = conn.cursor()
+    cursor.executescript(TABLES_SQL)
+    cursor.executescript(TRIGGERS_SQL)
+    conn.commit()
+
+
+def aggregate_query(entity_type, restricted):
+    """Scored aggregate SELECT for one entity type, optionally limited to temp.Popularity_Refresh"""
+    _, key_column, _, aggregate = ENTITIES[entity_type]
+    keys = f"(SELECT entity_id FROM temp.Popularity_Refresh WHERE entity_type = '{entity_type}')"
+
+    if entity_type == 'character':
+        aggregate = aggregate.format(where=f"WHERE ce.character_id IN {keys}" if restricted else "")
+    elif entity_type == 'species':
+        aggregate = aggregate.format(and_where=f"AND c.species_id IN {keys}" if restricted else "")
+
+    query = SCORED_SELECT.format(aggregate=aggregate)
+    if entity_type == 'actor':
+        roles = ACTOR_ROLES
+        if restricted:
+            roles += f" WHERE ea.actor_id IN {keys}"
+        query = f"WITH actor_roles AS ({roles}) {query}"
+    return query
+
+
+def write_entity(cursor, entity_type, restricted):
+    """Replace the popularity rows for one entity type (all, or the keys queued for refresh)"""
+    table, key_column, extra_columns, _ = ENTITIES[entity_type]
+    columns = extra_columns + VALUE_COLUMNS
+
+    if restricted:
+        cursor.execute(f"""
+            DELETE FROM {table} WHERE {key_column} IN
+            (SELECT entity_id FROM temp.Popularity_Refresh WHERE entity_type = ?)
+        """, (entity_type,))
+    else:
+        cursor.execute(f"DELETE FROM {table}")
+
+    cursor.execute(f"""
+        INSERT INTO {table} ({key_column}, {', '.join(columns)})
+        SELECT entity_id, {', '.join(columns)} FROM ({aggregate_query(entity_type, restricted)})
+    """)
+    return cursor.rowcount
+
+
+def queue_related(cursor):
+    """Add the species and actors of every queued character to the refresh set"""
+    cursor.execute("""
+        INSERT OR IGNORE INTO temp.Popularity_Refresh
+        SELECT 'species', c.species_id
+        FROM Characters c
+        WHERE c.species_id IS NOT NULL
+          AND c.character_id IN (SELECT entity_id FROM temp.Popularity_Refresh WHERE entity_type = 'character')
+    """)
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO temp.Popularity_Refresh
+        SELECT 'actor', actor_id
+        FROM Character_Effective_Actor
+        WHERE character_id IN (SELECT entity_id FROM temp.Popularity_Refresh WHERE entity_type = 'character')
+    """)
+
+
+def refresh(conn, full=False):
+    """
+    Recompute the popularity rows
+
+    Incremental by default: only the entities on the Popularity_Dirty queue
+    (and the species/actors of queued characters) are rewritten, and the
+    queue is cleared in the same transaction.
+    """
+    conn.create_function('ln1p', 1, math.log1p, deterministic=True)
+    cursor = conn.cursor()
+
+    conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")  # Hold off writers so no queued change is lost
+    try:
+        if full:
+            counts = {entity_type: write_entity(cursor, entity_type, restricted=False)
+                      for entity_type in ENTITIES}
+        else:
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS Popularity_Refresh (
+                    entity_type VARCHAR(20) NOT NULL,
+                    entity_id INTEGER NOT NULL,
+                    PRIMARY KEY (entity_type, entity_id)
+                )
+            """)
+            cursor.execute("DELETE FROM temp.Popularity_Refresh")
+            cursor.execute("INSERT INTO temp.Popularity_Refresh SELECT entity_type, entity_id FROM Popularity_Dirty")
+            queue_related(cursor)
+            counts = {entity_type: write_entity(cursor, entity_type, restricted=True)
+                      for entity_type in ENTITIES}
+
+        cursor.execute("DELETE FROM Popularity_Dirty")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    mode = 'Rebuilt' if full else 'Refreshed'
+    print(f"{mode} {counts['character']} characters, {counts['species']} species, "
+          f"{counts['actor']} actors")
+    return counts
+
+
+def show_top(conn, limit=20):
+    """Top characters, species and actors straight from the popularity tables"""
+    cursor = conn.cursor()
+
+    reports = [
+        ("CHARACTERS", """
+            SELECT c.name, COALESCE(sp.name, 'Unknown'), p.num_episodes, p.weighted_avg_rating,
+                   REPLACE(p.series, ',', ', '), p.popularity_score
+            FROM Character_Popularity p
+            JOIN Characters c ON p.character_id = c.character_id
+            LEFT JOIN Species sp ON c.species_id = sp.species_id
+            ORDER BY p.popularity_score DESC LIMIT ?
+        """),
+        ("SPECIES", """
+            SELECT sp.name, p.num_characters, p.num_episodes, p.weighted_avg_rating,
+                   REPLACE(p.series, ',', ', '), p.popularity_score
+            FROM Species_Popularity p
+            JOIN Species sp ON p.species_id = sp.species_id
+            ORDER BY p.popularity_score DESC LIMIT ?
+        """),
+        ("ACTORS", """
+            SELECT a.first_name || ' ' || a.last_name, p.num_characters, p.num_episodes,
+                   p.weighted_avg_rating, REPLACE(p.series, ',', ', '), p.popularity_score
+            FROM Actor_Popularity p
+            JOIN Actors a ON p.actor_id = a.actor_id
+            ORDER BY p.popularity_score DESC LIMIT ?
+        """),
+    ]
+
+    for title, query in reports:
+        print("\n" + "="*70)
+        print(f"TOP {limit} {title} BY POPULARITY")
+        print("="*70)
+        for rank, (name, detail, episodes, rating, series, score) in enumerate(
+                cursor.execute(query, (limit,)), 1):
+            print(f"{rank:<4} {name[:30]:<30} {str(detail)[:15]:<15} {episodes:>5} eps  "
+                  f"{rating:5.2f}  {score:6.3f}  {series or ''}")
+
+
+if __name__ == '__main__':
+    conn = connect()
+
+    print("="*70)
+    print("MATERIALIZED POPULARITY TABLES")
+    print("="*70)
+
+    install(conn)
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Character_Popularity")
+    empty = cursor.fetchone()[0] == 0
+
+    # First run (or --full) builds everything; later runs only the dirty queue
+    refresh(conn, full='--full' in sys.argv or empty)
+
+    if '--top' in sys.argv:
+        index = sys.argv.index('--top')
+        limit = int(sys.argv[index + 1]) if len(sys.argv) > index + 1 else 20
+        show_top(conn, limit)
+
+    conn.close()
@@ -0,0 +1,118 @@
+"""
+Species and planet mentions in episode descriptions
+All names are compiled into one case-insensitive regex, factored into a prefix
+trie so the scan cost doesn't grow with the number of names, and each
+description is scanned once for both kinds. Results are cached per episode.
+
+Names come from the Species table (species) and the species homeworlds
+(planets), on top of the common names below.
+
+Usage:
+    from mention_extractor import MentionExtractor
+
+    mentions = MentionExtractor.from_database(conn)
+    species, planets = mentions.scan("Worf returns to Qo'noS...")
+"""
+
+import re
+
+# Common Star Trek species
+DEFAULT_SPECIES = ['Klingon', 'Romulan', 'Vulcan', 'Andorian', 'Tellarite', 'Ferengi',
+                   'Cardassian', 'Bajoran', 'Betazoid', 'Trill', 'Borg', 'Changeling',
+                   'Kazon', 'Ocampa', 'Talaxian', 'Species 8472', 'Breen', 'Gorn',
+                   'Orion', 'Tholian', 'Horta', 'Tribble', 'Q']
+
+# Common Star Trek planets/locations
+DEFAULT_PLANETS = ['Earth', 'Vulcan', 'Qo\'noS', 'Romulus', 'Bajor', 'Cardassia', 'Ferenginar',
+                   'Betazed', 'Trill', 'Risa', 'Andoria', 'Tellar', 'Deep Space', 'Starbase']
+
+SPECIES, PLANET = 0, 1
+
+
+def trie_pattern(terms):
+    """
+    Regex alternation matching any of `terms`, factored into a prefix trie
+
+    Shared prefixes are matched once, so the engine follows one path per
+    position instead of trying every term. Longer terms are preferred.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return _node_pattern(trie)
+
+
+def _node_pattern(node):
+    branches = [re.escape(char) + _node_pattern(child)
+                for char, child in sorted(node.items()) if char != '']
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+
+    pattern = '(?:' + '|'.join(branches) + ')'
+    return pattern + '?' if '' in node else pattern
+
+
+class MentionExtractor:
+    """Single-scan species/planet matcher with a per-episode cache"""
+
+    def __init__(self, species=DEFAULT_SPECIES, planets=DEFAULT_PLANETS):
+        # lowercase term -> canonical name per kind (a term can be both, e.g. Vulcan)
+        self.terms = {}
+        for kind, names in ((SPECIES, species), (PLANET, planets)):
+            for name in names:
+                name = name.strip() if name else ''
+                if name:
+                    self.terms.setdefault(name.lower(), [None, None])
+                    if self.terms[name.lower()][kind] is None:
+                        self.terms[name.lower()][kind] = name
+
+        self.pattern = None
+        if self.terms:
+            # Whole words only, allowing a plural or possessive ending (Klingons, Borg's)
+            self.pattern = re.compile(r"(?<!\w)(" + trie_pattern(self.terms) + r")(?:'s|s)?(?!\w)",
+                                      re.IGNORECASE)
+        self.cache = {}
+
+    @classmethod
+    def from_database(cls, conn):
+        """Extractor over the Species table and homeworld gazetteer plus the default names"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM Species WHERE name IS NOT NULL")
+        species = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT DISTINCT homeworld FROM Species WHERE homeworld IS NOT NULL")
+        planets = [row[0] for row in cursor.fetchall()]
+
+        return cls(DEFAULT_SPECIES + species, DEFAULT_PLANETS + planets)
+
+    def scan(self, description):
+        """Return (species, planets) sets mentioned in a description"""
+        species, planets = set(), set()
+        if not isinstance(description, str) or self.pattern is None:
+            return species, planets
+
+        for match in self.pattern.finditer(description):
+            species_name, planet_name = self.terms[match.group(1).lower()]
+            if species_name:
+                species.add(species_name)
+            if planet_name:
+                planets.add(planet_name)
+        return species, planets
+
+    def extract(self, episode_id, description):
+        """scan(), cached by episode_id"""
+        if episode_id not in self.cache:
+            self.cache[episode_id] = self.scan(description)
+        return self.cache[episode_id]
+
+    def extract_all(self, episode_df):
+        """(species, planets) for every row of an episodes DataFrame, in row order"""
+        return [self.extract(episode_id, description)
+                for episode_id, description in zip(episode_df['episode_id'], episode_df['description'])]
+
+    def clear(self):
+        self.cache.clear()
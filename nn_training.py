@@ -0,0 +1,179 @@
+"""
+Shared training loop for the Star Trek rating networks
+Shuffled mini-batches through a torch DataLoader, a held-out validation split,
+learning-rate reduction on plateaus and early stopping on validation loss.
+
+Features can be a dense array or a scipy sparse matrix; batches are densified
+one at a time, so wide one-hot feature sets never need a dense copy. Models
+with an EmbeddingBag input take their batches from make_incidence_batch.
+
+Usage:
+    from nn_training import fit
+
+    history = fit(model, features, targets, weights, max_epochs=1000)
+"""
+
+import copy
+import time
+from functools import partial
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from scipy import sparse
+from torch.utils.data import DataLoader
+
+
+def make_batch(features, targets, weights, indices):
+    """Build ((X,), y, w) tensors for a list of row indices"""
+    indices = np.asarray(indices, dtype=np.int64)
+    rows = features[indices]
+    if sparse.issparse(rows):
+        rows = rows.toarray()
+
+    X = torch.as_tensor(np.asarray(rows, dtype=np.float32))
+    y, w = target_tensors(targets, weights, indices)
+    return (X,), y, w
+
+
+def make_incidence_batch(features, targets, weights, indices):
+    """
+    Build ((dense, char_indices, offsets), y, w) for models with an EmbeddingBag input
+
+    `features` is a (dense array, CSR incidence matrix) pair; each row's
+    nonzero columns become one bag, so only the appearances are materialized.
+    """
+    dense, incidence = features
+    indices = np.asarray(indices, dtype=np.int64)
+    rows = incidence[indices]
+
+    X = torch.as_tensor(np.asarray(dense[indices], dtype=np.float32))
+    char_indices = torch.as_tensor(rows.indices.astype(np.int64))
+    offsets = torch.as_tensor(rows.indptr[:-1].astype(np.int64))
+    y, w = target_tensors(targets, weights, indices)
+    return (X, char_indices, offsets), y, w
+
+
+def target_tensors(targets, weights, indices):
+    y = torch.as_tensor(np.asarray(targets[indices], dtype=np.float32)).reshape(-1, 1)
+    w = torch.as_tensor(np.asarray(weights[indices], dtype=np.float32)).reshape(-1, 1)
+    return y, w
+
+
+def split_indices(n_samples, val_fraction, seed):
+    """Shuffled (train, validation) index arrays; no validation set for tiny data"""
+    order = np.random.default_rng(seed).permutation(n_samples)
+    n_val = int(n_samples * val_fraction)
+    if n_val < 2 or n_samples - n_val < 2:
+        return order, order[:0]
+    return order[n_val:], order[:n_val]
+
+
+def weighted_loss(predictions, y, w):
+    return (nn.functional.mse_loss(predictions, y, reduction='none') * w).mean()
+
+
+def evaluate(model, loader):
+    """Weighted MSE over every batch of a loader"""
+    model.eval()
+    total, count = 0.0, 0
+    with torch.no_grad():
+        for inputs, y, w in loader:
+            total += weighted_loss(model(*inputs), y, w).item() * len(y)
+            count += len(y)
+    return total / count
+
+
+def fit(model, features, targets, weights, max_epochs=1000, learning_rate=0.001,
+        batch_size=64, val_fraction=0.15, patience=40, lr_patience=10, lr_factor=0.5,
+        num_workers=0, seed=42, log_every=10, batch_builder=make_batch):
+    """
+    Train `model` on weighted MSE with early stopping
+
+    Args:
+        features: (n, d) dense array or scipy sparse matrix, or whatever
+            `batch_builder` expects (e.g. a (dense, incidence) pair for
+            make_incidence_batch)
+        targets, weights: length-n arrays
+        max_epochs: Upper bound; training stops earlier once validation loss
+            hasn't improved for `patience` epochs
+        lr_patience, lr_factor: ReduceLROnPlateau settings
+        num_workers: DataLoader worker processes building batches
+
+    Returns:
+        dict with per-epoch 'train_loss', 'val_loss', 'epoch_seconds' lists and
+        'best_epoch'. The model is left with its best-validation weights.
+    """
+    targets = np.asarray(targets).reshape(-1)
+    weights = np.asarray(weights).reshape(-1)
+    if sparse.issparse(features):
+        features = features.tocsr()
+
+    torch.manual_seed(seed)
+    train_idx, val_idx = split_indices(len(targets), val_fraction, seed)
+
+    collate = partial(batch_builder, features, targets, weights)
+    train_loader = DataLoader(train_idx.tolist(), batch_size=batch_size, shuffle=True,
+                              num_workers=num_workers, collate_fn=collate)
+    val_loader = None
+    if len(val_idx):
+        val_loader = DataLoader(val_idx.tolist(), batch_size=max(batch_size, 256),
+                                num_workers=num_workers, collate_fn=collate)
+
+    optimizer = optim.Adam(model.parameters(), lr=learning_rate)
+    scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=lr_factor,
+                                                     patience=lr_patience)
+
+    print(f"Training on {len(train_idx)} episodes, validating on {len(val_idx)}")
+    print(f"Max epochs: {max_epochs}, Learning rate: {learning_rate}, Batch size: {batch_size}")
+
+    history = {'train_loss': [], 'val_loss': [], 'epoch_seconds': [], 'best_epoch': 0}
+    best_loss = float('inf')
+    best_state = copy.deepcopy(model.state_dict())
+    stale_epochs = 0
+
+    for epoch in range(max_epochs):
+        started = time.perf_counter()
+        model.train()
+
+        total, count = 0.0, 0
+        for inputs, y, w in train_loader:
+            loss = weighted_loss(model(*inputs), y, w)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(y)
+            count += len(y)
+
+        train_loss = total / count
+        val_loss = evaluate(model, val_loader) if val_loader else train_loss
+        scheduler.step(val_loss)
+        elapsed = time.perf_counter() - started
+
+        history['train_loss'].append(train_loss)
+        history['val_loss'].append(val_loss)
+        history['epoch_seconds'].append(elapsed)
+
+        if val_loss < best_loss:
+            best_loss = val_loss
+            best_state = copy.deepcopy(model.state_dict())
+            history['best_epoch'] = epoch + 1
+            stale_epochs = 0
+        else:
+            stale_epochs += 1
+
+        if (epoch + 1) % log_every == 0:
+            lr = optimizer.param_groups[0]['lr']
+            print(f"Epoch {epoch + 1}/{max_epochs}, Loss: {train_loss:.6f}, "
+                  f"Val loss: {val_loss:.6f}, LR: {lr:.2e}, {elapsed * 1000:.0f} ms/epoch")
+
+        if stale_epochs >= patience:
+            print(f"Early stopping at epoch {epoch + 1} (no improvement for {patience} epochs)")
+            break
+
+    model.load_state_dict(best_state)
+    print(f"Best validation loss {best_loss:.6f} at epoch {history['best_epoch']}, "
+          f"{np.mean(history['epoch_seconds']) * 1000:.0f} ms/epoch on average")
+
+    return history
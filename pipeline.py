@@ -0,0 +1,264 @@
+"""
+Resumable pipeline for the full STAPI population
+Runs the populate_full stages as a dependency graph, recording per-stage status
+and per-page / per-entity progress in the database. A restart skips finished
+stages and picks unfinished ones up where they stopped.
+
+Stages without dependencies between them run concurrently, each on its own
+database connection, sharing one rate-limited STAPI client.
+
+Usage:
+    python pipeline.py              # Run or resume
+    python pipeline.py --status     # Show checkpoint state
+    python pipeline.py --restart    # Clear checkpoints and start over
+"""
+
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+
+from db_connection import connect, bulk_load
+from fetch_engine import FetchEngine, STAPI_BASE_URL
+from populate_full import STAPIFullPopulator, BULK_TABLES
+
+# stage -> (kind, STAPI endpoint, dependencies)
+# Spacecraft waits for organizations because ships are attached to Starfleet;
+# characters need species and episodes need series for their foreign keys.
+STAGES = {
+    'species': ('pages', 'species', []),
+    'performers': ('pages', 'performer', []),
+    'series': ('pages', 'series', []),
+    'organizations': ('pages', 'organization', []),
+    'spacecraft': ('pages', 'spacecraft', ['organizations']),
+    'characters': ('pages', 'character', ['species']),
+    'episodes': ('pages', 'episode', ['series']),
+    'character_episodes': ('episode_links', None, ['characters', 'episodes']),
+    'character_details': ('character_details', None, ['characters', 'performers', 'organizations']),
+}
+
+# Seconds a stage connection waits for another stage's write transaction
+STAGE_DB_TIMEOUT = 120
+
+
+class CheckpointConsumer:
+    """Character detail consumer that records each processed character as done"""
+
+    label = 'characters checkpointed'
+    records_progress = True  # Skipped by CharacterDetailStage when another consumer failed
+
+    def __init__(self, cursor, checkpoints, stage):
+        self.cursor = cursor
+        self.checkpoints = checkpoints
+        self.stage = stage
+        self.count = 0
+
+    def consume(self, char_id, details):
+        self.checkpoints.record(self.cursor, self.stage, char_id)
+        self.count += 1
+
+
+class Checkpoints:
+    """Stage status and per-item progress, stored in Pipeline_Stages / Pipeline_Progress"""
+
+    RECORD_SQL = """
+        INSERT OR IGNORE INTO Pipeline_Progress (stage, item) VALUES (?, ?)
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.create_tables()
+
+    def create_tables(self):
+        self.cursor.executescript("""
+            CREATE TABLE IF NOT EXISTS Pipeline_Stages (
+                stage VARCHAR(50) PRIMARY KEY,
+                status VARCHAR(20) NOT NULL, -- running, done, failed
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                error TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS Pipeline_Progress (
+                stage VARCHAR(50) NOT NULL,
+                item VARCHAR(50) NOT NULL, -- page number or database id
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (stage, item)
+            );
+        """)
+        self.conn.commit()
+
+    def status(self, stage):
+        self.cursor.execute("SELECT status FROM Pipeline_Stages WHERE stage = ?", (stage,))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+
+    def set_status(self, stage, status, error=None):
+        if status == 'running':
+            self.cursor.execute("""
+                INSERT INTO Pipeline_Stages (stage, status, started_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(stage) DO UPDATE SET
+                    status = excluded.status, started_at = excluded.started_at,
+                    finished_at = NULL, error = NULL
+            """, (stage, status))
+        else:
+            self.cursor.execute("""
+                UPDATE Pipeline_Stages
+                SET status = ?, finished_at = CURRENT_TIMESTAMP, error = ?
+                WHERE stage = ?
+            """, (status, error, stage))
+        self.conn.commit()
+
+    def done_items(self, stage):
+        """Set of items (as strings) already finished for a stage"""
+        self.cursor.execute("SELECT item FROM Pipeline_Progress WHERE stage = ?", (stage,))
+        return {row[0] for row in self.cursor.fetchall()}
+
+    def record(self, cursor, stage, item):
+        """Mark an item done; written on the caller's cursor so it commits with the item's rows"""
+        cursor.execute(self.RECORD_SQL, (stage, str(item)))
+
+    def consumer(self, stage):
+        """Consumer class for CharacterDetailStage that checkpoints each character"""
+        return partial(CheckpointConsumer, checkpoints=self, stage=stage)
+
+    def reset(self):
+        self.cursor.execute("DELETE FROM Pipeline_Progress")
+        self.cursor.execute("DELETE FROM Pipeline_Stages")
+        self.conn.commit()
+
+    def show(self):
+        self.cursor.execute("""
+            SELECT s.stage, s.status, s.started_at, s.finished_at, s.error,
+                   (SELECT COUNT(*) FROM Pipeline_Progress p WHERE p.stage = s.stage)
+            FROM Pipeline_Stages s
+        """)
+        rows = {row[0]: row[1:] for row in self.cursor.fetchall()}
+
+        for stage in STAGES:
+            status, started, finished, error, items = rows.get(stage, ('pending', None, None, None, 0))
+            print(f"{stage:20} {status:8} {items:6} items done  {finished or started or ''}")
+            if error:
+                print(f"{'':20} {error.strip().splitlines()[-1]}")
+
+
+class PipelineRunner:
+    """Run the STAGES graph, resuming from the checkpoints in the database"""
+
+    def __init__(self, db_path='startrek.db', requests_per_second=10, max_in_flight=8, max_parallel_stages=4):
+        self.db_path = db_path
+        self.max_parallel_stages = max_parallel_stages
+        self.client = FetchEngine(STAPI_BASE_URL, requests_per_second=requests_per_second,
+                                  max_in_flight=max_in_flight)
+        self.conn = connect(db_path)
+        self.checkpoints = Checkpoints(self.conn)
+
+    def close(self):
+        self.client.close()
+        self.conn.close()
+
+    def run_stage(self, stage):
+        """Run one stage on its own connection (called on a worker thread)"""
+        kind, endpoint, _ = STAGES[stage]
+
+        populator = STAPIFullPopulator(self.db_path, client=self.client)
+        populator.connect(timeout=STAGE_DB_TIMEOUT)
+        checkpoints = Checkpoints(populator.conn)
+
+        try:
+            if kind == 'pages':
+                populator.populate_entity_resumable(endpoint, checkpoints, stage)
+            elif kind == 'episode_links':
+                populator.link_character_episodes(checkpoints=checkpoints, stage=stage)
+            elif kind == 'character_details':
+                populator.link_character_details(checkpoints=checkpoints, stage=stage)
+        finally:
+            populator.close()
+
+    def run(self):
+        """
+        Run every unfinished stage as soon as its dependencies are done
+
+        Returns:
+            True if every stage finished
+        """
+        finished = {stage for stage in STAGES if self.checkpoints.status(stage) == 'done'}
+        failed = set()
+        if finished:
+            print(f"Resuming: {', '.join(sorted(finished))} already done")
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel_stages) as executor:
+            running = {}
+
+            while True:
+                for stage, (_, _, deps) in STAGES.items():
+                    if stage in finished or stage in failed or stage in running.values():
+                        continue
+                    if any(dep in failed for dep in deps):
+                        print(f"[{stage}] skipped: a dependency failed")
+                        failed.add(stage)
+                    elif all(dep in finished for dep in deps):
+                        print(f"\n[{stage}] starting")
+                        self.checkpoints.set_status(stage, 'running')
+                        running[executor.submit(self.run_stage, stage)] = stage
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        self.checkpoints.set_status(stage, 'done')
+                        finished.add(stage)
+                        print(f"[{stage}] done")
+                    else:
+                        details = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+                        self.checkpoints.set_status(stage, 'failed', details)
+                        failed.add(stage)
+                        print(f"[{stage}] FAILED: {error}")
+
+        return not failed
+
+
+def main():
+    runner = PipelineRunner()
+
+    try:
+        if '--status' in sys.argv:
+            runner.checkpoints.show()
+            return
+
+        if '--restart' in sys.argv:
+            print("Clearing pipeline checkpoints...")
+            runner.checkpoints.reset()
+
+        print("="*70)
+        print("FULL STAR TREK DATABASE POPULATION (RESUMABLE PIPELINE)")
+        print("="*70)
+
+        with bulk_load(runner.conn, BULK_TABLES):
+            ok = runner.run()
+
+        print("\n" + "="*70)
+        runner.checkpoints.show()
+        print("="*70)
+
+        if ok:
+            populator = STAPIFullPopulator(runner.db_path, client=runner.client)
+            populator.connect()
+            populator.show_statistics()
+            populator.close()
+            print("\nPIPELINE COMPLETE!")
+        else:
+            print("\nSome stages failed. Fix the problem and re-run to resume where they stopped.")
+            sys.exit(1)
+    finally:
+        runner.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,34 @@
 """
 Scrape director and writer from IMDB episode pages and populate Episodes table
 For each episode in the database, visits its IMDB page to get director/writer info
+
+Pages are fetched concurrently through a FetchEngine (pooled connections,
+per-host rate limiting, retries with jittered backoff) and the results are
+written in batches from the main thread.
+
+Usage:
+    python populate_crew_from_fullcredits.py
+
+    # Against recorded pages (see fixture_server.py)
+    IMDB_BASE_URL=http://localhost:8765 python populate_crew_from_fullcredits.py
 """
 
 import sqlite3
-import requests
-from bs4 import BeautifulSoup
-import time
-import re
+from db_connection import connect
+from fetch_engine import FetchEngine, IMDB_BASE_URL
+from imdb_harvester import HEADERS, ensure_harvest_columns, series_registry
+from imdb_parser import parse_episode_crew
+
+# Series crawled for crew credits (IMDB ids come from the Series table)
+CREW_SERIES = ['TOS', 'TNG', 'DS9', 'VOY', 'ENT']
 
-SERIES_IMDB_IDS = {
-    'TOS': 'tt0060028',
-    'TNG': 'tt0092455',
-    'DS9': 'tt0106145',
-    'VOY': 'tt0112178',
-    'ENT': 'tt0244365'
-}
+REQUESTS_PER_SECOND = 4
+MAX_IN_FLIGHT = 8
+BATCH_SIZE = 50
 
 def add_crew_columns():
     """Add director and writer columns to Episodes table"""
-    conn = sqlite3.connect('startrek.db')
+    conn = connect()
     cursor = conn.cursor()
     
     try:
@@ -37,120 +46,93 @@ def add_crew_columns():
     conn.commit()
     conn.close()
 
-def get_episode_crew(episode_imdb_id):
+def get_episode_crew(client, episode_imdb_id):
     """Get director and writer(s) for a specific episode"""
-    url = f"https://www.imdb.com/title/{episode_imdb_id}/"
+    response = client.get(f"title/{episode_imdb_id}/")
+    if response is None:
+        return {'director': None, 'writer': None}
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        director = None
-        writers = []
-        
-        # Look for Director and Writers in credits
-        # They typically appear as "Director" or "Writers" followed by names
-        for li in soup.find_all('li', class_=lambda x: x and 'ipc-metadata-list__item' in str(x)):
-            text = li.get_text()
-            
-            # Check for Director
-            if 'Director' in text and 'Directors' not in text:
-                links = li.find_all('a')
-                if links:
-                    director = links[0].get_text(strip=True)
-            
-            # Check for Writers - include all writers from the Writers section
-            if 'Writer' in text:
-                links = li.find_all('a')
-                for link in links:
-                    writer_name = link.get_text(strip=True)
-                    if writer_name and writer_name not in writers:
-                        writers.append(writer_name)
-        
-        return {
-            'director': director,
-            'writer': ', '.join(writers) if writers else None
-        }
-    
+        return parse_episode_crew(response.text)
     except Exception as e:
-        print(f"    Error: {e}")
+        print(f"    Error parsing {episode_imdb_id}: {e}")
         return {'director': None, 'writer': None}
 
-def populate_crew_data():
+
+def write_crew(cursor, updates):
+    """Write a batch of (director, writer, episode_id) rows"""
+    cursor.executemany("""
+        UPDATE Episodes 
+        SET director = ?, writer = ?
+        WHERE episode_id = ?
+    """, updates)
+
+
+def populate_crew_data(client=None):
     """Populate director and writer for all episodes"""
-    conn = sqlite3.connect('startrek.db')
+    conn = connect()
     cursor = conn.cursor()
     
-    total_updated = 0
+    ensure_harvest_columns(conn)
     
-    for series_abbr, series_imdb_id in SERIES_IMDB_IDS.items():
-        print(f"\n{'='*70}")
-        print(f"Processing {series_abbr}")
-        print('='*70)
-        
-        # Get series_id
-        cursor.execute("SELECT series_id FROM Series WHERE abbreviation = ?", (series_abbr,))
-        result = cursor.fetchone()
-        if not result:
-            print(f"✗ Series {series_abbr} not found in database")
-            continue
-        
-        series_id = result[0]
-        
-        # Get all episodes for this series that have IMDB IDs
+    # Every episode with an IMDB id, across all crew series
+    episodes = []
+    for series_id, series_abbr, series_imdb_id in series_registry(conn, CREW_SERIES):
         cursor.execute("""
             SELECT episode_id, season, episode_number, title, imdb_id
             FROM Episodes
             WHERE series_id = ? AND imdb_id IS NOT NULL
             ORDER BY season, episode_number
         """, (series_id,))
+        series_episodes = cursor.fetchall()
+        print(f"{series_abbr}: {len(series_episodes)} episodes with IMDB IDs")
+        episodes.extend((series_abbr,) + row for row in series_episodes)
+    
+    if not episodes:
+        print("✗ No episodes with IMDB IDs")
+        conn.close()
+        return
+    
+    own_client = client is None
+    if own_client:
+        client = FetchEngine(IMDB_BASE_URL, requests_per_second=REQUESTS_PER_SECOND,
+                             max_in_flight=MAX_IN_FLIGHT, timeout=15, headers=HEADERS)
+    
+    print(f"\nFetching {len(episodes)} episode pages "
+          f"({MAX_IN_FLIGHT} in flight, {REQUESTS_PER_SECOND} requests/s)...\n")
+    
+    updated = {}
+    batch = []
+    results = client.imap(lambda episode: get_episode_crew(client, episode[5]), episodes)
+    for i, ((series_abbr, episode_id, season, ep_num, title, imdb_id), crew) in enumerate(results, 1):
+        if crew['director'] or crew['writer']:
+            batch.append((crew['director'], crew['writer'], episode_id))
+            updated[series_abbr] = updated.get(series_abbr, 0) + 1
+            print(f"  {series_abbr} S{season:02d}E{ep_num:02d}: {title} - "
+                  f"{crew['director'] or '?'} / {crew['writer'] or '?'}")
+        else:
+            print(f"  {series_abbr} S{season:02d}E{ep_num:02d}: {title} - no crew found")
         
-        episodes = cursor.fetchall()
-        print(f"Found {len(episodes)} episodes with IMDB IDs")
-        
-        if not episodes:
-            print(f"✗ No episodes with IMDB IDs for {series_abbr}")
-            continue
-        
-        updated = 0
-        for episode_id, season, ep_num, title, imdb_id in episodes:
-            print(f"  S{season:02d}E{ep_num:02d}: {title}")
-            
-            crew = get_episode_crew(imdb_id)
-            
-            if crew['director'] or crew['writer']:
-                cursor.execute("""
-                    UPDATE Episodes 
-                    SET director = ?, writer = ?
-                    WHERE episode_id = ?
-                """, (crew['director'], crew['writer'], episode_id))
-                
-                if cursor.rowcount > 0:
-                    updated += 1
-                    if crew['director']:
-                        print(f"    Director: {crew['director']}")
-                    if crew['writer']:
-                        print(f"    Writer: {crew['writer']}")
-            
-            # Rate limiting
-            time.sleep(0.5)
-        
-        conn.commit()
-        print(f"✓ Updated {updated} episodes for {series_abbr}")
-        total_updated += updated
-        
-        # Rate limiting between series
-        time.sleep(2)
+        if len(batch) >= BATCH_SIZE:
+            write_crew(cursor, batch)
+            conn.commit()
+            batch = []
+            print(f"\n--- Progress: {i}/{len(episodes)} episodes fetched ---\n")
     
+    write_crew(cursor, batch)
+    conn.commit()
     conn.close()
     
+    stats = client.stats
+    if own_client:
+        client.close()
+    
     print("\n" + "="*70)
-    print(f"COMPLETE: Updated {total_updated} episodes total")
+    for series_abbr in CREW_SERIES:
+        if series_abbr in updated:
+            print(f"✓ Updated {updated[series_abbr]} episodes for {series_abbr}")
+    print(f"COMPLETE: Updated {sum(updated.values())} episodes total")
+    print(f"HTTP: {stats['requests']} requests, {stats['retries']} retries, {stats['errors']} errors")
     print("="*70)
 
 if __name__ == "__main__":
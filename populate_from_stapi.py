@@ -27,10 +27,15 @@ Use this script when:
 - Time: ~5-10 minutes
 """
 
-import sqlite3
 import requests
 import time
 from datetime import datetime
+from http_cache import cached_get
+import bulk_ingest
+from db_connection import connect, bulk_load
+
+# Tables whose secondary indexes are dropped during the bulk load and rebuilt after
+BULK_TABLES = ['Species', 'Actors', 'Characters', 'Ships']
 
 class STAPIPopulator:
     """Class to handle fetching data from STAPI and populating the database"""
@@ -44,7 +49,7 @@ class STAPIPopulator:
         
     def connect(self):
         """Connect to the database"""
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = connect(self.db_path)
         self.cursor = self.conn.cursor()
         
     def close(self):
@@ -90,7 +95,7 @@ class STAPIPopulator:
             print(f"Fetching {endpoint} page {page_number}...")
             
             try:
-                response = requests.get(url, params=params, timeout=30)
+                response = cached_get(url, params=params, timeout=30)
                 response.raise_for_status()
                 data = response.json()
                 
@@ -135,122 +140,37 @@ class STAPIPopulator:
         
         species_list = self.fetch_with_pagination('species', max_pages=max_pages)
         
-        inserted = 0
-        for species in species_list:
-            try:
-                name = species.get('name')
-                if not name:
-                    continue
-                
-                homeworld = species.get('homeworld', {}).get('name') if species.get('homeworld') else None
-                classification = species.get('type')
-                warp_capable = species.get('warpCapableSpecies', False)
-                
-                self.cursor.execute("""
-                    INSERT OR IGNORE INTO Species (name, homeworld, classification, warp_capable)
-                    VALUES (?, ?, ?, ?)
-                """, (name, homeworld, classification, int(warp_capable)))
-                
-                if self.cursor.rowcount > 0:
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"Error inserting species {species.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"\nInserted {inserted} new species")
-        return inserted
+        return bulk_ingest.ingest(self.conn, 'Species', [
+            (bulk_ingest.SPECIES_INSERT, bulk_ingest.species_rows(species_list))
+        ], 'species')
     
     def populate_performers(self, max_pages=5):
-        """Fetch and insert actor/performer data"""
+        """Fetch and upsert actor/performer data"""
         print("\n" + "="*70)
         print("POPULATING PERFORMERS (ACTORS)")
         print("="*70)
         
         performers = self.fetch_with_pagination('performer', max_pages=max_pages)
         
-        inserted = 0
-        for performer in performers:
-            try:
-                name = performer.get('name', '')
-                if not name:
-                    continue
-                
-                # Split name into first and last
-                name_parts = name.split(maxsplit=1)
-                first_name = name_parts[0] if name_parts else ''
-                last_name = name_parts[1] if len(name_parts) > 1 else ''
-                
-                birth_date = performer.get('birthDate')
-                
-                # Check if actor already exists
-                self.cursor.execute("""
-                    SELECT actor_id FROM Actors 
-                    WHERE first_name = ? AND last_name = ?
-                """, (first_name, last_name))
-                
-                if self.cursor.fetchone() is None:
-                    self.cursor.execute("""
-                        INSERT INTO Actors (first_name, last_name, birth_date)
-                        VALUES (?, ?, ?)
-                    """, (first_name, last_name, birth_date))
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"Error inserting performer {performer.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"\nInserted {inserted} new actors")
-        return inserted
+        return bulk_ingest.ingest(self.conn, 'Actors',
+                                  bulk_ingest.actor_batches(bulk_ingest.performer_rows(performers)),
+                                  'actors')
     
     def populate_characters(self, max_pages=5):
-        """Fetch and insert character data"""
+        """Fetch and upsert character data"""
         print("\n" + "="*70)
         print("POPULATING CHARACTERS")
         print("="*70)
         
         characters = self.fetch_with_pagination('character', max_pages=max_pages)
+        species_ids = bulk_ingest.load_lookup(self.cursor, 'Species', 'name', 'species_id')
         
-        inserted = 0
-        for character in characters:
-            try:
-                name = character.get('name')
-                if not name or not character.get('uid'):
-                    continue
-                
-                # Get species
-                species_name = None
-                if character.get('characterSpecies'):
-                    species_name = character['characterSpecies'][0].get('name')
-                
-                species_id = None
-                if species_name:
-                    self.cursor.execute("SELECT species_id FROM Species WHERE name = ?", (species_name,))
-                    result = self.cursor.fetchone()
-                    if result:
-                        species_id = result[0]
-                
-                gender = character.get('gender')
-                
-                # Check if character exists
-                self.cursor.execute("SELECT character_id FROM Characters WHERE name = ?", (name,))
-                
-                if self.cursor.fetchone() is None:
-                    self.cursor.execute("""
-                        INSERT INTO Characters (name, species_id, gender)
-                        VALUES (?, ?, ?)
-                    """, (name, species_id, gender))
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"Error inserting character {character.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"\nInserted {inserted} new characters")
-        return inserted
+        return bulk_ingest.ingest(self.conn, 'Characters',
+                                  bulk_ingest.character_batches(bulk_ingest.character_rows(characters, species_ids)),
+                                  'characters')
     
     def populate_spacecraft(self, max_pages=3):
-        """Fetch and insert spacecraft data"""
+        """Fetch and upsert spacecraft data"""
         print("\n" + "="*70)
         print("POPULATING SPACECRAFT")
         print("="*70)
@@ -262,36 +182,9 @@ class STAPIPopulator:
         result = self.cursor.fetchone()
         starfleet_id = result[0] if result else None
         
-        inserted = 0
-        for spacecraft in spacecraft_list:
-            try:
-                name = spacecraft.get('name')
-                if not name:
-                    continue
-                
-                registry = spacecraft.get('registry')
-                ship_class = spacecraft.get('spacecraftClass', {}).get('name') if spacecraft.get('spacecraftClass') else None
-                status = spacecraft.get('status')
-                
-                # Check if ship exists
-                self.cursor.execute("""
-                    SELECT ship_id FROM Ships 
-                    WHERE name = ? AND (registry = ? OR registry IS NULL)
-                """, (name, registry))
-                
-                if self.cursor.fetchone() is None:
-                    self.cursor.execute("""
-                        INSERT INTO Ships (name, registry, class, organization_id, status)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (name, registry, ship_class, starfleet_id, status))
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"Error inserting spacecraft {spacecraft.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"\nInserted {inserted} new spacecraft")
-        return inserted
+        return bulk_ingest.ingest(self.conn, 'Ships',
+                                  bulk_ingest.ship_batches(bulk_ingest.spacecraft_rows(spacecraft_list, starfleet_id)),
+                                  'spacecraft')
     
     def show_statistics(self):
         """Display database statistics after population"""
@@ -327,12 +220,14 @@ def main():
     populator.connect()
     
     try:
-        # Populate in order (species first, then characters that reference species)
-        # Set max_pages=None to fetch ALL data
-        populator.populate_species(max_pages=None)
-        populator.populate_performers(max_pages=None)
-        populator.populate_characters(max_pages=None)
-        populator.populate_spacecraft(max_pages=None)
+        # Bulk-load mode: secondary indexes are rebuilt and ANALYZE runs at the end
+        with bulk_load(populator.conn, BULK_TABLES):
+            # Populate in order (species first, then characters that reference species)
+            # Set max_pages=None to fetch ALL data
+            populator.populate_species(max_pages=None)
+            populator.populate_performers(max_pages=None)
+            populator.populate_characters(max_pages=None)
+            populator.populate_spacecraft(max_pages=None)
         
         # Show final statistics
         populator.show_statistics()
@@ -3,93 +3,104 @@ Full Population Script for Star Trek Database using STAPI
 This script fetches detailed entity data to populate ALL tables including relationships
 """
 
-import sqlite3
-import requests
-import time
 from datetime import datetime
 
+import bulk_ingest
+from fetch_engine import FetchEngine, STAPI_BASE_URL
+from character_details import (CharacterDetailStage, PerformerLinker, OrganizationLinker,
+                               ALL_CONSUMERS, load_uid_map)
+from db_connection import connect, bulk_load
+
+# Tables whose secondary indexes are dropped during the bulk load and rebuilt after
+BULK_TABLES = ['Species', 'Actors', 'Characters', 'Ships', 'Series', 'Episodes', 'Organizations',
+               'Character_Actors', 'Character_Organizations', 'Character_Episodes']
+
 class STAPIFullPopulator:
     """Enhanced class to fully populate all tables including relationships"""
     
-    BASE_URL = "http://stapi.co/api/v1/rest"
+    BASE_URL = STAPI_BASE_URL
     
-    def __init__(self, db_path='startrek.db'):
+    # Search endpoint -> key holding the result list
+    ENDPOINT_KEYS = {
+        'character': 'characters',
+        'species': 'species',
+        'performer': 'performers',
+        'spacecraft': 'spacecraft',
+        'series': 'series',
+        'episode': 'episodes',
+        'organization': 'organizations'
+    }
+    
+    def __init__(self, db_path='startrek.db', requests_per_second=10, max_in_flight=8, client=None):
         self.db_path = db_path
         self.conn = None
         self.cursor = None
         
-        # Cache mappings: name -> uid
-        self.character_uids = {}
-        self.episode_uids = {}
-        self.ship_uids = {}
+        # Shared rate-limited session for every STAPI request
+        # (pass one in to share it between several populators)
+        self.owns_client = client is None
+        self.client = client or FetchEngine(self.BASE_URL, requests_per_second=requests_per_second,
+                                            max_in_flight=max_in_flight)
         
-    def connect(self):
+    def connect(self, timeout=30):
         """Connect to the database"""
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = connect(self.db_path, timeout=timeout)
         self.cursor = self.conn.cursor()
         
     def close(self):
-        """Close database connection"""
+        """Close database connection and HTTP session"""
         if self.conn:
             self.conn.close()
+        if self.owns_client:
+            self.client.close()
+    
+    def fetch_page(self, endpoint, page_number, page_size=100):
+        """Fetch one search page, or None on failure"""
+        url = f"{self.BASE_URL}/{endpoint}/search"
+        params = {
+            'pageNumber': page_number,
+            'pageSize': page_size
+        }
+        return self.client.get_json(url, params=params)
+    
+    def page_items(self, endpoint, data):
+        """Pull the item list out of a search page"""
+        response_key = self.ENDPOINT_KEYS.get(endpoint, endpoint + 's')
+        for key in [response_key, endpoint, endpoint + 's']:
+            if key in data:
+                return data[key]
+        return None
     
     def fetch_with_pagination(self, endpoint, page_size=100, max_pages=None):
         """Fetch data with pagination"""
         all_items = []
         page_number = 0
         
-        endpoint_map = {
-            'character': 'characters',
-            'species': 'species',
-            'performer': 'performers',
-            'spacecraft': 'spacecraft',
-            'series': 'series',
-            'episode': 'episodes',
-            'organization': 'organizations'
-        }
-        
-        response_key = endpoint_map.get(endpoint, endpoint + 's')
-        
         while True:
             if max_pages and page_number >= max_pages:
                 break
-                
-            url = f"{self.BASE_URL}/{endpoint}/search"
-            params = {
-                'pageNumber': page_number,
-                'pageSize': page_size
-            }
             
             print(f"  Page {page_number}...", end='', flush=True)
             
-            try:
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-                
-                items = None
-                for key in [response_key, endpoint, endpoint + 's']:
-                    if key in data:
-                        items = data[key]
-                        break
-                
-                if items is None or not items:
-                    print(f" Done!")
-                    break
-                    
-                all_items.extend(items)
-                print(f" +{len(items)} (total: {len(all_items)})")
-                
-                page = data.get('page', {})
-                if page.get('lastPage', True):
-                    break
-                    
-                page_number += 1
-                time.sleep(0.3)
+            data = self.fetch_page(endpoint, page_number, page_size)
+            if data is None:
+                print(f" Error!")
+                break
+            
+            items = self.page_items(endpoint, data)
+            
+            if items is None or not items:
+                print(f" Done!")
+                break
                 
-            except requests.exceptions.RequestException as e:
-                print(f" Error: {e}")
+            all_items.extend(items)
+            print(f" +{len(items)} (total: {len(all_items)})")
+            
+            page = data.get('page', {})
+            if page.get('lastPage', True):
                 break
+                
+            page_number += 1
         
         return all_items
     
@@ -98,616 +109,221 @@ class STAPIFullPopulator:
         url = f"{self.BASE_URL}/{endpoint}"
         params = {'uid': uid}
         
-        try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            # The response key is usually the singular form
-            singular_key = endpoint.rstrip('s') if endpoint.endswith('s') else endpoint
-            return data.get(singular_key, data.get(endpoint, {}))
-            
-        except Exception as e:
-            print(f"    Error fetching {endpoint}/{uid}: {e}")
+        data = self.client.get_json(url, params=params)
+        if data is None:
             return None
+        
+        # The response key is usually the singular form
+        singular_key = endpoint.rstrip('s') if endpoint.endswith('s') else endpoint
+        return data.get(singular_key, data.get(endpoint, {}))
     
-    def populate_species(self, max_pages=None):
-        """Fetch and insert species data"""
+    def populate_entity(self, endpoint, title, max_pages=None):
+        """Fetch every search page for an endpoint and write it in one batch"""
         print("\n" + "="*70)
-        print("POPULATING SPECIES")
+        print(f"POPULATING {title}")
         print("="*70)
         
-        species_list = self.fetch_with_pagination('species', max_pages=max_pages)
-        
-        inserted = 0
-        for species in species_list:
-            try:
-                name = species.get('name')
-                if not name:
-                    continue
-                
-                homeworld = species.get('homeworld', {}).get('name') if species.get('homeworld') else None
-                classification = species.get('type')
-                warp_capable = species.get('warpCapableSpecies', False)
-                
-                self.cursor.execute("""
-                    INSERT OR IGNORE INTO Species (name, homeworld, classification, warp_capable)
-                    VALUES (?, ?, ?, ?)
-                """, (name, homeworld, classification, int(warp_capable)))
-                
-                if self.cursor.rowcount > 0:
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"  Error inserting species {species.get('name')}: {e}")
+        items = self.fetch_with_pagination(endpoint, max_pages=max_pages)
+        table, label = bulk_ingest.ENTITY_TABLES[endpoint]
         
-        self.conn.commit()
-        print(f"Inserted {inserted} new species")
-        return inserted
+        return bulk_ingest.ingest(self.conn, table,
+                                  bulk_ingest.entity_batches(self.cursor, endpoint, items), label)
+    
+    def populate_species(self, max_pages=None):
+        """Fetch and insert species data"""
+        return self.populate_entity('species', 'SPECIES', max_pages)
     
     def populate_performers(self, max_pages=None):
-        """Fetch and insert actor/performer data"""
-        print("\n" + "="*70)
-        print("POPULATING PERFORMERS (ACTORS)")
-        print("="*70)
-        
-        performers = self.fetch_with_pagination('performer', max_pages=max_pages)
-        
-        inserted = 0
-        for performer in performers:
-            try:
-                name = performer.get('name', '')
-                if not name:
-                    continue
-                
-                # Split name into first and last
-                name_parts = name.split(maxsplit=1)
-                first_name = name_parts[0] if name_parts else ''
-                last_name = name_parts[1] if len(name_parts) > 1 else ''
-                
-                birth_date = performer.get('birthDate')
-                
-                # Check if actor already exists
-                self.cursor.execute("""
-                    SELECT actor_id FROM Actors 
-                    WHERE first_name = ? AND last_name = ?
-                """, (first_name, last_name))
-                
-                if self.cursor.fetchone() is None:
-                    self.cursor.execute("""
-                        INSERT INTO Actors (first_name, last_name, birth_date)
-                        VALUES (?, ?, ?)
-                    """, (first_name, last_name, birth_date))
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"  Error inserting performer {performer.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"Inserted {inserted} new actors")
-        return inserted
+        """Fetch and upsert actor/performer data"""
+        return self.populate_entity('performer', 'PERFORMERS (ACTORS)', max_pages)
     
     def populate_characters(self, max_pages=None):
-        """Fetch and insert character data"""
-        print("\n" + "="*70)
-        print("POPULATING CHARACTERS")
-        print("="*70)
-        
-        characters = self.fetch_with_pagination('character', max_pages=max_pages)
-        
-        inserted = 0
-        for character in characters:
-            try:
-                name = character.get('name')
-                if not name or not character.get('uid'):
-                    continue
-                
-                # Get species
-                species_name = None
-                if character.get('characterSpecies'):
-                    species_name = character['characterSpecies'][0].get('name')
-                
-                species_id = None
-                if species_name:
-                    self.cursor.execute("SELECT species_id FROM Species WHERE name = ?", (species_name,))
-                    result = self.cursor.fetchone()
-                    if result:
-                        species_id = result[0]
-                
-                gender = character.get('gender')
-                
-                # Check if character exists
-                self.cursor.execute("SELECT character_id FROM Characters WHERE name = ?", (name,))
-                
-                if self.cursor.fetchone() is None:
-                    self.cursor.execute("""
-                        INSERT INTO Characters (name, species_id, gender)
-                        VALUES (?, ?, ?)
-                    """, (name, species_id, gender))
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"  Error inserting character {character.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"Inserted {inserted} new characters")
-        return inserted
+        """Fetch and upsert character data"""
+        return self.populate_entity('character', 'CHARACTERS', max_pages)
     
     def populate_spacecraft(self, max_pages=None):
-        """Fetch and insert spacecraft data"""
-        print("\n" + "="*70)
-        print("POPULATING SPACECRAFT")
-        print("="*70)
-        
-        spacecraft_list = self.fetch_with_pagination('spacecraft', max_pages=max_pages)
-        
-        # Get Starfleet organization ID
-        self.cursor.execute("SELECT organization_id FROM Organizations WHERE name = 'Starfleet'")
-        result = self.cursor.fetchone()
-        starfleet_id = result[0] if result else None
-        
-        inserted = 0
-        for spacecraft in spacecraft_list:
-            try:
-                name = spacecraft.get('name')
-                if not name:
-                    continue
-                
-                registry = spacecraft.get('registry')
-                ship_class = spacecraft.get('spacecraftClass', {}).get('name') if spacecraft.get('spacecraftClass') else None
-                status = spacecraft.get('status')
-                
-                # Check if ship exists
-                self.cursor.execute("""
-                    SELECT ship_id FROM Ships 
-                    WHERE name = ? AND (registry = ? OR registry IS NULL)
-                """, (name, registry))
-                
-                if self.cursor.fetchone() is None:
-                    self.cursor.execute("""
-                        INSERT INTO Ships (name, registry, class, organization_id, status)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (name, registry, ship_class, starfleet_id, status))
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"  Error inserting spacecraft {spacecraft.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"Inserted {inserted} new spacecraft")
-        return inserted
+        """Fetch and upsert spacecraft data"""
+        return self.populate_entity('spacecraft', 'SPACECRAFT', max_pages)
     
     def populate_series(self):
         """Populate series table"""
-        print("\n" + "="*70)
-        print("POPULATING SERIES")
-        print("="*70)
-        
-        series_list = self.fetch_with_pagination('series', max_pages=None)
-        
-        inserted = 0
-        for series in series_list:
-            try:
-                title = series.get('title')
-                if not title:
-                    continue
-                
-                abbreviation = series.get('abbreviation')
-                
-                # Parse years
-                production_start = series.get('productionStartYear')
-                production_end = series.get('productionEndYear')
-                
-                num_seasons = series.get('seasonsCount')
-                num_episodes = series.get('episodesCount')
-                
-                self.cursor.execute("""
-                    INSERT OR IGNORE INTO Series 
-                    (name, abbreviation, start_year, end_year, num_seasons, num_episodes)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (title, abbreviation, production_start, production_end, num_seasons, num_episodes))
-                
-                if self.cursor.rowcount > 0:
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"  Error inserting series {series.get('title')}: {e}")
-        
-        self.conn.commit()
-        print(f"Inserted {inserted} new series")
-        return inserted
+        return self.populate_entity('series', 'SERIES')
     
     def populate_episodes(self, max_pages=None):
         """Populate episodes table"""
-        print("\n" + "="*70)
-        print("POPULATING EPISODES")
-        print("="*70)
-        
-        episodes = self.fetch_with_pagination('episode', max_pages=max_pages)
-        
-        inserted = 0
-        for episode in episodes:
-            try:
-                title = episode.get('title')
-                if not title:
-                    continue
-                
-                # Get series
-                series_data = episode.get('series')
-                series_id = None
-                if series_data:
-                    series_title = series_data.get('title')
-                    self.cursor.execute("SELECT series_id FROM Series WHERE name = ?", (series_title,))
-                    result = self.cursor.fetchone()
-                    if result:
-                        series_id = result[0]
-                
-                season = episode.get('seasonNumber')
-                episode_num = episode.get('episodeNumber')
-                
-                # Parse air date (format: YYYY-MM-DD)
-                air_date = episode.get('usAirDate')
-                
-                self.cursor.execute("""
-                    INSERT OR IGNORE INTO Episodes 
-                    (series_id, title, season, episode_number, air_date)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (series_id, title, season, episode_num, air_date))
-                
-                if self.cursor.rowcount > 0:
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"  Error inserting episode {episode.get('title')}: {e}")
-        
-        self.conn.commit()
-        print(f"Inserted {inserted} new episodes")
-        return inserted
+        return self.populate_entity('episode', 'EPISODES', max_pages)
     
     def populate_organizations(self):
         """Populate organizations table"""
-        print("\n" + "="*70)
-        print("POPULATING ORGANIZATIONS")
-        print("="*70)
-        
-        orgs = self.fetch_with_pagination('organization', max_pages=None)
-        
-        inserted = 0
-        for org in orgs:
-            try:
-                name = org.get('name')
-                if not name:
-                    continue
-                
-                self.cursor.execute("""
-                    INSERT OR IGNORE INTO Organizations (name)
-                    VALUES (?)
-                """, (name,))
-                
-                if self.cursor.rowcount > 0:
-                    inserted += 1
-                    
-            except Exception as e:
-                print(f"  Error inserting organization {org.get('name')}: {e}")
-        
-        self.conn.commit()
-        print(f"Inserted {inserted} new organizations")
-        return inserted
+        return self.populate_entity('organization', 'ORGANIZATIONS')
     
-    def build_character_uid_cache(self, max_pages=None):
-        """Build cache of character names to UIDs from search results"""
-        print("\n" + "="*70)
-        print("BUILDING CHARACTER UID CACHE")
-        print("="*70)
-        
-        page_number = 0
-        
-        while True:
-            if max_pages and page_number >= max_pages:
-                break
-                
-            print(f"  Page {page_number}...", end='', flush=True)
-            
-            try:
-                response = requests.get(
-                    f"{self.BASE_URL}/character/search",
-                    params={'pageNumber': page_number, 'pageSize': 100},
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    characters = data.get('characters', [])
-                    
-                    if not characters:
-                        print(" Done!")
-                        break
-                    
-                    for char in characters:
-                        name = char.get('name')
-                        uid = char.get('uid')
-                        if name and uid:
-                            self.character_uids[name] = uid
-                    
-                    print(f" +{len(characters)} (cache: {len(self.character_uids)})")
-                    
-                    page = data.get('page', {})
-                    if page.get('lastPage', True):
-                        break
-                    
-                    page_number += 1
-                    time.sleep(0.3)
-                else:
-                    break
-                    
-            except Exception as e:
-                print(f" Error: {e}")
-                break
-        
-        print(f"Cached {len(self.character_uids)} character UIDs")
-        return len(self.character_uids)
+    def populate_entity_resumable(self, endpoint, checkpoints, stage=None, page_size=100):
+        """
+        Fetch and write an endpoint page by page, recording each finished page
+        
+        Each page's rows and its checkpoint are committed in the same
+        transaction, so after a crash only unfinished pages are fetched again.
+        """
+        stage = stage or endpoint
+        table, label = bulk_ingest.ENTITY_TABLES[endpoint]
+        done = checkpoints.done_items(stage)
+        
+        first = self.fetch_page(endpoint, 0, page_size)
+        if first is None:
+            raise RuntimeError(f"Could not fetch the first {endpoint} page")
+        
+        total_pages = first.get('page', {}).get('totalPages', 1)
+        pages = [page for page in range(1, total_pages) if str(page) not in done]
+        print(f"[{stage}] {total_pages} pages, {len(done)} already done")
+        
+        def write_page(page_number, data):
+            items = self.page_items(endpoint, data) or []
+            batches = bulk_ingest.entity_batches(self.cursor, endpoint, items)
+            batches.append((checkpoints.RECORD_SQL, [(stage, str(page_number))]))
+            return bulk_ingest.bulk_write(self.conn, batches)
+        
+        failed = 0
+        if '0' not in done:
+            failed += write_page(0, first)
+        
+        written = 1
+        fetch = lambda page: self.fetch_page(endpoint, page, page_size)
+        for page_number, data in self.client.imap(fetch, pages):
+            if data is None:
+                raise RuntimeError(f"Could not fetch {endpoint} page {page_number}")
+            failed += write_page(page_number, data)
+            written += 1
+            if written % 10 == 0:
+                print(f"[{stage}] {written}/{len(pages) + 1} pages written")
+        
+        print(f"[{stage}] finished: {table} now has {bulk_ingest.count_rows(self.cursor, table)} rows "
+              f"({failed} {label} failed)")
+        return failed
     
-    def build_episode_uid_cache(self, max_pages=None):
-        """Build cache of episode titles to UIDs"""
-        print("\n" + "="*70)
-        print("BUILDING EPISODE UID CACHE")
-        print("="*70)
-        
-        page_number = 0
-        
-        while True:
-            if max_pages and page_number >= max_pages:
-                break
-                
-            print(f"  Page {page_number}...", end='', flush=True)
-            
-            try:
-                response = requests.get(
-                    f"{self.BASE_URL}/episode/search",
-                    params={'pageNumber': page_number, 'pageSize': 100},
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    episodes = data.get('episodes', [])
-                    
-                    if not episodes:
-                        print(" Done!")
-                        break
-                    
-                    for ep in episodes:
-                        title = ep.get('title')
-                        uid = ep.get('uid')
-                        if title and uid:
-                            self.episode_uids[title] = uid
-                    
-                    print(f" +{len(episodes)} (cache: {len(self.episode_uids)})")
-                    
-                    page = data.get('page', {})
-                    if page.get('lastPage', True):
-                        break
-                    
-                    page_number += 1
-                    time.sleep(0.3)
-                else:
-                    break
-                    
-            except Exception as e:
-                print(f" Error: {e}")
-                break
-        
-        print(f"Cached {len(self.episode_uids)} episode UIDs")
-        return len(self.episode_uids)
+    def fetch_details_concurrently(self, endpoint, rows):
+        """
+        Fetch entity details for (db_id, stapi_uid) rows in parallel
+        
+        Yields (db_id, details) on the calling thread as responses arrive, so the
+        caller can write to the database while the next requests are in flight.
+        """
+        fetch = lambda item: self.fetch_entity_details(endpoint, item[1])
+        for (db_id, uid), details in self.client.imap(fetch, rows):
+            yield db_id, details
     
-    def link_character_performers(self, max_chars=None):
-        """Link characters to performers (actors) using cached UIDs"""
+    def link_character_details(self, max_chars=None, consumers=None, checkpoints=None,
+                               stage='character_details'):
+        """
+        Fetch each character's details once and apply every consumer to it:
+        performers, organizations, rank/title, attributes and appearance stats
+        
+        With checkpoints, characters already recorded for `stage` are skipped and
+        each processed character is recorded in the same commit as its rows. If
+        any character couldn't be fetched or applied, RuntimeError is raised after the
+        others are committed, so the stage stays unfinished and a re-run
+        retries only the missing ones.
+        """
         print("\n" + "="*70)
-        print("LINKING CHARACTERS TO ACTORS")
+        print("LINKING CHARACTER DETAILS (SINGLE PASS)")
         print("="*70)
         
-        # Get all characters from database
-        self.cursor.execute("SELECT character_id, name FROM Characters")
+        # Get all characters that are known to STAPI
+        self.cursor.execute("SELECT character_id, stapi_uid FROM Characters WHERE stapi_uid IS NOT NULL")
         characters = self.cursor.fetchall()
         
         if max_chars:
             characters = characters[:max_chars]
         
-        print(f"Processing {len(characters)} characters...")
-        
-        linked = 0
-        processed = 0
+        if checkpoints:
+            done = checkpoints.done_items(stage)
+            characters = [row for row in characters if str(row[0]) not in done]
+            consumers = list(consumers or ALL_CONSUMERS) + [checkpoints.consumer(stage)]
         
-        for char_id, char_name in characters:
-            processed += 1
-            if processed % 100 == 0:
-                print(f"  {processed}/{len(characters)} processed, {linked} links created")
-                self.conn.commit()  # Commit periodically
-            
-            # Get UID from cache
-            uid = self.character_uids.get(char_name)
-            if not uid:
-                continue
-            
-            try:
-                # Fetch full character details
-                char_details = self.fetch_entity_details('character', uid)
-                
-                if char_details and char_details.get('performers'):
-                    for performer in char_details['performers']:
-                        performer_name = performer.get('name', '')
-                        if not performer_name:
-                            continue
-                        
-                        # Split name
-                        name_parts = performer_name.split(maxsplit=1)
-                        first_name = name_parts[0] if name_parts else ''
-                        last_name = name_parts[1] if len(name_parts) > 1 else ''
-                        
-                        # Find actor in database
-                        self.cursor.execute("""
-                            SELECT actor_id FROM Actors 
-                            WHERE first_name = ? AND last_name = ?
-                        """, (first_name, last_name))
-                        
-                        result = self.cursor.fetchone()
-                        if result:
-                            actor_id = result[0]
-                            
-                            # Link character to actor
-                            self.cursor.execute("""
-                                INSERT OR IGNORE INTO Character_Actors 
-                                (character_id, actor_id)
-                                VALUES (?, ?)
-                            """, (char_id, actor_id))
-                            
-                            if self.cursor.rowcount > 0:
-                                linked += 1
-                
-                time.sleep(0.2)  # Rate limiting
-                
-            except Exception as e:
-                continue
+        detail_stage = CharacterDetailStage(self.conn, self.client, consumers)
+        counts = detail_stage.run(characters)
         
-        self.conn.commit()
-        print(f"\nLinked {linked} character-actor relationships")
-        return linked
+        if checkpoints and detail_stage.failed:
+            raise RuntimeError(f"{detail_stage.failed} character details could not be fetched or applied")
+        return counts
     
-    def link_character_episodes(self, max_episodes=None):
-        """Link characters to episodes they appeared in using cached UIDs"""
+    def link_character_performers(self, max_chars=None):
+        """Link characters to performers (actors) using stored UIDs"""
+        counts = self.link_character_details(max_chars, consumers=[PerformerLinker])
+        return counts['PerformerLinker']
+    
+    def link_character_episodes(self, max_episodes=None, checkpoints=None, stage='character_episodes'):
+        """
+        Link characters to episodes they appeared in using stored UIDs
+        
+        With checkpoints, episodes already recorded for `stage` are skipped, and
+        RuntimeError is raised at the end if any episode couldn't be fetched.
+        """
         print("\n" + "="*70)
         print("LINKING CHARACTERS TO EPISODES")
         print("="*70)
         
-        # Get all episodes from database
-        self.cursor.execute("SELECT episode_id, title FROM Episodes")
+        # Get all episodes that are known to STAPI
+        self.cursor.execute("SELECT episode_id, stapi_uid FROM Episodes WHERE stapi_uid IS NOT NULL")
         episodes = self.cursor.fetchall()
         
         if max_episodes:
             episodes = episodes[:max_episodes]
         
+        if checkpoints:
+            done = checkpoints.done_items(stage)
+            episodes = [row for row in episodes if str(row[0]) not in done]
+        
+        character_ids = load_uid_map(self.cursor, 'Characters', 'character_id')
+        
         print(f"Processing {len(episodes)} episodes...")
         
         linked = 0
         processed = 0
+        failed = 0
         
-        for episode_id, episode_title in episodes:
+        for episode_id, ep_details in self.fetch_details_concurrently('episode', episodes):
             processed += 1
             if processed % 50 == 0:
                 print(f"  {processed}/{len(episodes)} processed, {linked} links created")
                 self.conn.commit()  # Commit periodically
             
-            # Get UID from cache
-            uid = self.episode_uids.get(episode_title)
-            if not uid:
+            if not ep_details:
+                failed += 1
                 continue
             
-            try:
-                # Fetch episode details
-                ep_details = self.fetch_entity_details('episode', uid)
-                
-                if ep_details and ep_details.get('characters'):
-                    for character in ep_details['characters']:
-                        char_name = character.get('name')
-                        if not char_name:
-                            continue
-                        
-                        # Find character in database
-                        self.cursor.execute("""
-                            SELECT character_id FROM Characters WHERE name = ?
-                        """, (char_name,))
-                        
-                        result = self.cursor.fetchone()
-                        if result:
-                            char_id = result[0]
-                            
-                            # Link character to episode
-                            self.cursor.execute("""
-                                INSERT OR IGNORE INTO Character_Episodes 
-                                (character_id, episode_id, role_type)
-                                VALUES (?, ?, ?)
-                            """, (char_id, episode_id, 'main'))
-                            
-                            if self.cursor.rowcount > 0:
-                                linked += 1
-                
-                time.sleep(0.2)
-                
-            except Exception as e:
-                continue
-        
-        self.conn.commit()
-        print(f"\nLinked {linked} character-episode relationships")
-        return linked
-    
-    def link_character_organizations(self, max_chars=None):
-        """Link characters to organizations using character details"""
-        print("\n" + "="*70)
-        print("LINKING CHARACTERS TO ORGANIZATIONS")
-        print("="*70)
-        
-        # Get all characters from database
-        self.cursor.execute("SELECT character_id, name FROM Characters")
-        characters = self.cursor.fetchall()
-        
-        if max_chars:
-            characters = characters[:max_chars]
-        
-        print(f"Processing {len(characters)} characters...")
-        
-        linked = 0
-        processed = 0
-        
-        for char_id, char_name in characters:
-            processed += 1
-            if processed % 100 == 0:
-                print(f"  {processed}/{len(characters)} processed, {linked} links created")
-                self.conn.commit()
+            if checkpoints:
+                checkpoints.record(self.cursor, stage, episode_id)
             
-            # Get UID from cache
-            uid = self.character_uids.get(char_name)
-            if not uid:
+            if not ep_details.get('characters'):
                 continue
             
-            try:
-                # Fetch character details
-                char_details = self.fetch_entity_details('character', uid)
-                
-                # Use 'organizations' field (not 'characterOrganizations')
-                if char_details and char_details.get('organizations'):
-                    for org in char_details['organizations']:
-                        org_name = org.get('name')
-                        if not org_name:
-                            continue
-                        
-                        # Find organization in database
-                        self.cursor.execute("""
-                            SELECT organization_id FROM Organizations WHERE name = ?
-                        """, (org_name,))
-                        
-                        result = self.cursor.fetchone()
-                        if result:
-                            org_id = result[0]
-                            
-                            # Link character to organization
-                            self.cursor.execute("""
-                                INSERT OR IGNORE INTO Character_Organizations 
-                                (character_id, organization_id, role)
-                                VALUES (?, ?, ?)
-                            """, (char_id, org_id, 'member'))
-                            
-                            if self.cursor.rowcount > 0:
-                                linked += 1
+            for character in ep_details['characters']:
+                char_id = character_ids.get(character.get('uid'))
+                if not char_id:
+                    continue
                 
-                time.sleep(0.2)
+                # Link character to episode
+                self.cursor.execute("""
+                    INSERT OR IGNORE INTO Character_Episodes 
+                    (character_id, episode_id, role_type)
+                    VALUES (?, ?, ?)
+                """, (char_id, episode_id, 'main'))
                 
-            except Exception as e:
-                continue
+                if self.cursor.rowcount > 0:
+                    linked += 1
         
         self.conn.commit()
-        print(f"\nLinked {linked} character-organization relationships")
+        print(f"\nLinked {linked} character-episode relationships ({failed} episodes failed)")
+        
+        if checkpoints and failed:
+            raise RuntimeError(f"{failed} episode details could not be fetched")
         return linked
     
+    def link_character_organizations(self, max_chars=None):
+        """Link characters to organizations using character details"""
+        counts = self.link_character_details(max_chars, consumers=[OrganizationLinker])
+        return counts['OrganizationLinker']
+    
     def show_statistics(self):
         """Display database statistics"""
         print("\n" + "="*70)
@@ -731,7 +347,9 @@ def main():
     print("FULL STAR TREK DATABASE POPULATION FROM STAPI")
     print("="*70)
     print("\nThis will fetch ALL data including relationships.")
-    print("This may take 3-5 hours due to API rate limiting.\n")
+    print("Detail lookups run concurrently under a shared rate limit;")
+    print("expect tens of minutes depending on the STAPI request budget.")
+    print("For a resumable run that can be restarted after a crash, use pipeline.py.\n")
     
     response = input("Proceed? (y/n): ")
     if response.lower() != 'y':
@@ -742,47 +360,39 @@ def main():
     populator.connect()
     
     try:
-        # Step 1: Populate main tables (base entities first)
-        print("\n" + "="*70)
-        print("STEP 1: POPULATING BASE TABLES")
-        print("="*70)
-        
-        populator.populate_species(max_pages=None)
-        populator.populate_performers(max_pages=None)
-        populator.populate_characters(max_pages=None)
-        populator.populate_spacecraft(max_pages=None)
-        
-        # Step 2: Populate supporting tables
-        print("\n" + "="*70)
-        print("STEP 2: POPULATING SUPPORTING TABLES")
-        print("="*70)
-        
-        populator.populate_series()
-        populator.populate_organizations()
-        populator.populate_episodes(max_pages=None)  # Fetch ALL episodes
-        
-        # Step 3: Build UID caches
-        print("\n" + "="*70)
-        print("STEP 3: BUILDING UID CACHES")
-        print("="*70)
-        
-        populator.build_character_uid_cache(max_pages=None)
-        populator.build_episode_uid_cache(max_pages=None)
-        
-        # Step 4: Link relationships
-        print("\n" + "="*70)
-        print("STEP 4: LINKING RELATIONSHIPS")
-        print("="*70)
-        print("\nNote: This step is intensive and may take a while...")
-        
-        # Link ALL characters (remove max_chars limit)
-        populator.link_character_performers(max_chars=None)
-        
-        # Link all episodes
-        populator.link_character_episodes(max_episodes=None)
-        
-        # Link ALL character organizations
-        populator.link_character_organizations(max_chars=None)
+        # Bulk-load mode: secondary indexes are rebuilt and ANALYZE runs at the end
+        with bulk_load(populator.conn, BULK_TABLES):
+            # Step 1: Populate main tables (base entities first)
+            print("\n" + "="*70)
+            print("STEP 1: POPULATING BASE TABLES")
+            print("="*70)
+        
+            populator.populate_species(max_pages=None)
+            populator.populate_performers(max_pages=None)
+            populator.populate_characters(max_pages=None)
+            populator.populate_spacecraft(max_pages=None)
+        
+            # Step 2: Populate supporting tables
+            print("\n" + "="*70)
+            print("STEP 2: POPULATING SUPPORTING TABLES")
+            print("="*70)
+        
+            populator.populate_series()
+            populator.populate_organizations()
+            populator.populate_episodes(max_pages=None)  # Fetch ALL episodes
+        
+            # Step 3: Link relationships (rows carry their STAPI uid, no cache crawl needed)
+            print("\n" + "="*70)
+            print("STEP 3: LINKING RELATIONSHIPS")
+            print("="*70)
+            print("\nNote: This step is intensive and may take a while...")
+        
+            # Link all episodes
+            populator.link_character_episodes(max_episodes=None)
+        
+            # One pass over ALL character details feeds actors, organizations,
+            # rank/title, attributes and per-series appearance stats
+            populator.link_character_details(max_chars=None)
         
         # Show final stats
         populator.show_statistics()
@@ -1,71 +1,30 @@
 """
 Populate type column in Organizations table from STAPI boolean flags
 """
-import sqlite3
-import requests
 import time
+from http_cache import cached_get
+from db_connection import connect
 
 BASE_URL = "http://stapi.co/api/v1/rest"
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
 print("POPULATING ORGANIZATION TYPE FROM STAPI")
 print("="*70)
 
-# Build organization UID cache
-print("\n1. Building organization UID cache...")
-uid_cache = {}
-page = 0
-max_pages = 100
+# Populate type
+print("\nPopulating type field...")
 
-while page < max_pages:
-    search_url = f"{BASE_URL}/organization/search"
-    params = {'pageNumber': page, 'pageSize': 100}
-    
-    try:
-        response = requests.get(search_url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        organizations = data.get('organizations', [])
-        if not organizations:
-            break
-        
-        for org in organizations:
-            org_name = org.get('name')
-            org_uid = org.get('uid')
-            if org_name and org_uid:
-                uid_cache[org_name] = org_uid
-        
-        print(f"   Page {page}: cached {len(organizations)} UIDs (total: {len(uid_cache)})")
-        
-        page_info = data.get('page', {})
-        if page_info.get('lastPage', True):
-            break
-        
-        page += 1
-        time.sleep(0.3)
-        
-    except Exception as e:
-        print(f"   Error fetching page {page}: {e}")
-        break
-
-print(f"\n   Total UIDs cached: {len(uid_cache)}")
-
-# Now populate type
-print("\n2. Populating type field...")
-
-cursor.execute("SELECT organization_id, name FROM Organizations")
+# Each row carries its STAPI uid (see add_stapi_uid_columns.py)
+cursor.execute("SELECT organization_id, stapi_uid FROM Organizations")
 all_organizations = cursor.fetchall()
 
 updated_count = 0
 skipped_count = 0
 
-for org_id, org_name in all_organizations:
-    org_uid = uid_cache.get(org_name)
-    
+for org_id, org_uid in all_organizations:
     if not org_uid:
         skipped_count += 1
         continue
@@ -73,7 +32,7 @@ for org_id, org_name in all_organizations:
     # Get full organization details
     try:
         detail_url = f"{BASE_URL}/organization"
-        response = requests.get(detail_url, params={'uid': org_uid}, timeout=30)
+        response = cached_get(detail_url, params={'uid': org_uid}, timeout=30)
         response.raise_for_status()
         data = response.json()
         
@@ -1,127 +1,27 @@
 """
 Populate rank and title fields in Characters table from STAPI
 """
-import sqlite3
-import requests
-import time
 
-BASE_URL = "http://stapi.co/api/v1/rest"
+from character_details import CharacterDetailStage, RankTitleUpdater
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
 print("POPULATING RANK AND TITLE FROM STAPI")
 print("="*70)
 
-# Build character UID cache
-print("\n1. Building character UID cache...")
-uid_cache = {}
-page = 0
-max_pages = 100
+# Populate rank and title for every character with a stored STAPI uid
+print("\nPopulating rank and title fields...")
 
-while page < max_pages:
-    search_url = f"{BASE_URL}/character/search"
-    params = {'pageNumber': page, 'pageSize': 100}
-    
-    try:
-        response = requests.get(search_url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        characters = data.get('characters', [])
-        if not characters:
-            break
-        
-        for char in characters:
-            char_name = char.get('name')
-            char_uid = char.get('uid')
-            if char_name and char_uid:
-                uid_cache[char_name] = char_uid
-        
-        print(f"   Page {page}: cached {len(characters)} UIDs (total: {len(uid_cache)})")
-        
-        page_info = data.get('page', {})
-        if page_info.get('lastPage', True):
-            break
-        
-        page += 1
-        time.sleep(0.3)
-        
-    except Exception as e:
-        print(f"   Error fetching page {page}: {e}")
-        break
-
-print(f"\n   Total UIDs cached: {len(uid_cache)}")
-
-# Now populate rank and title
-print("\n2. Populating rank and title fields...")
-
-cursor.execute("SELECT character_id, name FROM Characters")
+cursor.execute("SELECT character_id, stapi_uid FROM Characters")
 all_characters = cursor.fetchall()
 
-updated_count = 0
-skipped_count = 0
-
-for char_id, char_name in all_characters:
-    char_uid = uid_cache.get(char_name)
-    
-    if not char_uid:
-        skipped_count += 1
-        continue
-    
-    # Get full character details
-    try:
-        detail_url = f"{BASE_URL}/character"
-        response = requests.get(detail_url, params={'uid': char_uid}, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'character' in data:
-            char_details = data['character']
-            
-            # Get titles field
-            titles = char_details.get('titles', [])
-            
-            rank = None
-            title = None
-            
-            if titles:
-                # Separate military ranks from positions/titles
-                for title_obj in titles:
-                    title_name = title_obj.get('name')
-                    is_military_rank = title_obj.get('militaryRank', False) or title_obj.get('fleetRank', False)
-                    is_position = title_obj.get('position', False)
-                    
-                    if is_military_rank and not rank:
-                        rank = title_name
-                    elif is_position and not title:
-                        title = title_name
-                    elif not rank and not title:
-                        # If unclear, put in title
-                        title = title_name
-            
-            # Update character
-            if rank or title:
-                cursor.execute("""
-                    UPDATE Characters
-                    SET rank = ?, title = ?
-                    WHERE character_id = ?
-                """, (rank, title, char_id))
-                
-                if rank or title:
-                    updated_count += 1
-                    if updated_count % 50 == 0:
-                        print(f"   Updated {updated_count} characters...")
-                        conn.commit()
-        
-        time.sleep(0.5)  # Rate limiting
-        
-    except Exception as e:
-        skipped_count += 1
-        continue
-
-conn.commit()
+stage = CharacterDetailStage(conn, consumers=[RankTitleUpdater])
+counts = stage.run(all_characters, commit_every=50)
+updated_count = counts['RankTitleUpdater']
+skipped_count = len(all_characters) - updated_count
 
 print("\n" + "="*70)
 print(f"Updated {updated_count} characters with rank/title")
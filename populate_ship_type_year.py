@@ -1,71 +1,30 @@
 """
 Populate type and launched_year columns in Ships table from STAPI
 """
-import sqlite3
-import requests
 import time
+from http_cache import cached_get
+from db_connection import connect
 
 BASE_URL = "http://stapi.co/api/v1/rest"
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
 print("POPULATING SHIP TYPE AND LAUNCHED_YEAR FROM STAPI")
 print("="*70)
 
-# Build spacecraft UID cache
-print("\n1. Building spacecraft UID cache...")
-uid_cache = {}
-page = 0
-max_pages = 100
+# Populate type and launched_year
+print("\nPopulating type and launched_year fields...")
 
-while page < max_pages:
-    search_url = f"{BASE_URL}/spacecraft/search"
-    params = {'pageNumber': page, 'pageSize': 100}
-    
-    try:
-        response = requests.get(search_url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        spacecraft = data.get('spacecrafts', [])
-        if not spacecraft:
-            break
-        
-        for ship in spacecraft:
-            ship_name = ship.get('name')
-            ship_uid = ship.get('uid')
-            if ship_name and ship_uid:
-                uid_cache[ship_name] = ship_uid
-        
-        print(f"   Page {page}: cached {len(spacecraft)} UIDs (total: {len(uid_cache)})")
-        
-        page_info = data.get('page', {})
-        if page_info.get('lastPage', True):
-            break
-        
-        page += 1
-        time.sleep(0.3)
-        
-    except Exception as e:
-        print(f"   Error fetching page {page}: {e}")
-        break
-
-print(f"\n   Total UIDs cached: {len(uid_cache)}")
-
-# Now populate type and launched_year
-print("\n2. Populating type and launched_year fields...")
-
-cursor.execute("SELECT ship_id, name FROM Ships")
+# Each row carries its STAPI uid (see add_stapi_uid_columns.py)
+cursor.execute("SELECT ship_id, stapi_uid FROM Ships")
 all_ships = cursor.fetchall()
 
 updated_count = 0
 skipped_count = 0
 
-for ship_id, ship_name in all_ships:
-    ship_uid = uid_cache.get(ship_name)
-    
+for ship_id, ship_uid in all_ships:
     if not ship_uid:
         skipped_count += 1
         continue
@@ -73,7 +32,7 @@ for ship_id, ship_name in all_ships:
     # Get full spacecraft details
     try:
         detail_url = f"{BASE_URL}/spacecraft"
-        response = requests.get(detail_url, params={'uid': ship_uid}, timeout=30)
+        response = cached_get(detail_url, params={'uid': ship_uid}, timeout=30)
         response.raise_for_status()
         data = response.json()
         
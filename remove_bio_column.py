@@ -1,9 +1,9 @@
 """
 Remove bio column from Characters table
 """
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
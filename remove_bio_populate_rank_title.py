@@ -1,13 +1,11 @@
 """
 Remove bio column from Characters table and populate rank/title from STAPI
 """
-import sqlite3
-import requests
-import time
 
-BASE_URL = "http://stapi.co/api/v1/rest"
+from character_details import CharacterDetailStage, RankTitleUpdater
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
@@ -31,6 +29,7 @@ cursor.execute("""
         death_year INTEGER,
         gender VARCHAR(20),
         occupation VARCHAR(100),
+        stapi_uid VARCHAR(20),
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (species_id) REFERENCES Species(species_id)
@@ -38,12 +37,15 @@ cursor.execute("""
 """)
 
 print("2. Copying data from old table...")
-cursor.execute("""
+cursor.execute("PRAGMA table_info(Characters)")
+has_stapi_uid = any(column[1] == 'stapi_uid' for column in cursor.fetchall())
+uid_column = "stapi_uid" if has_stapi_uid else "NULL"
+cursor.execute(f"""
     INSERT INTO Characters_new 
     (character_id, name, rank, title, species_id, birth_year, death_year, 
-     gender, occupation, created_at, updated_at)
+     gender, occupation, stapi_uid, created_at, updated_at)
     SELECT character_id, name, rank, title, species_id, birth_year, death_year,
-           gender, occupation, created_at, updated_at
+           gender, occupation, {uid_column}, created_at, updated_at
     FROM Characters
 """)
 
@@ -55,6 +57,7 @@ cursor.execute("DROP TABLE Characters")
 
 print("4. Renaming new table...")
 cursor.execute("ALTER TABLE Characters_new RENAME TO Characters")
+cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_characters_stapi_uid ON Characters(stapi_uid)")
 
 conn.commit()
 
@@ -64,114 +67,19 @@ print("\n" + "="*70)
 print("STEP 2: POPULATING RANK AND TITLE FROM STAPI")
 print("="*70)
 
-# Build character UID cache
-print("\n1. Building character UID cache...")
-uid_cache = {}
-page = 0
-max_pages = 100
-
-while page < max_pages:
-    search_url = f"{BASE_URL}/character/search"
-    params = {'pageNumber': page, 'pageSize': 100}
-    
-    try:
-        response = requests.get(search_url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        characters = data.get('characters', [])
-        if not characters:
-            break
-        
-        for char in characters:
-            char_name = char.get('name')
-            char_uid = char.get('uid')
-            if char_name and char_uid:
-                uid_cache[char_name] = char_uid
-        
-        print(f"   Page {page}: cached {len(characters)} UIDs (total: {len(uid_cache)})")
-        
-        page_info = data.get('page', {})
-        if page_info.get('lastPage', True):
-            break
-        
-        page += 1
-        time.sleep(0.3)
-        
-    except Exception as e:
-        print(f"   Error fetching page {page}: {e}")
-        break
-
-print(f"\n   Total UIDs cached: {len(uid_cache)}")
-
-# Now populate rank and title
-print("\n2. Populating rank and title fields...")
-
-cursor.execute("SELECT character_id, name FROM Characters")
-all_characters = cursor.fetchall()
+if not has_stapi_uid:
+    print("\nNo stapi_uid column yet - run add_stapi_uid_columns.py first")
 
-updated_count = 0
-skipped_count = 0
-
-for char_id, char_name in all_characters:
-    char_uid = uid_cache.get(char_name)
-    
-    if not char_uid:
-        skipped_count += 1
-        continue
-    
-    # Get full character details
-    try:
-        detail_url = f"{BASE_URL}/character"
-        response = requests.get(detail_url, params={'uid': char_uid}, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'character' in data:
-            char_details = data['character']
-            
-            # Get titles field
-            titles = char_details.get('titles', [])
-            
-            rank = None
-            title = None
-            
-            if titles:
-                # Separate military ranks from positions/titles
-                for title_obj in titles:
-                    title_name = title_obj.get('name')
-                    is_military_rank = title_obj.get('militaryRank', False) or title_obj.get('fleetRank', False)
-                    is_position = title_obj.get('position', False)
-                    
-                    if is_military_rank and not rank:
-                        rank = title_name
-                    elif is_position and not title:
-                        title = title_name
-                    elif not rank and not title:
-                        # If unclear, put in title
-                        title = title_name
-            
-            # Update character
-            if rank or title:
-                cursor.execute("""
-                    UPDATE Characters
-                    SET rank = ?, title = ?
-                    WHERE character_id = ?
-                """, (rank, title, char_id))
-                
-                if rank or title:
-                    updated_count += 1
-                    if updated_count % 50 == 0:
-                        print(f"   Updated {updated_count} characters...")
-                        conn.commit()
-        
-        time.sleep(0.5)  # Rate limiting
-        
-    except Exception as e:
-        skipped_count += 1
-        continue
+# Populate rank and title for every character with a stored STAPI uid
+print("\nPopulating rank and title fields...")
 
-conn.commit()
+cursor.execute("SELECT character_id, stapi_uid FROM Characters")
+all_characters = cursor.fetchall()
+
+stage = CharacterDetailStage(conn, consumers=[RankTitleUpdater])
+counts = stage.run(all_characters, commit_every=50)
+updated_count = counts['RankTitleUpdater']
+skipped_count = len(all_characters) - updated_count
 
 print("\n" + "="*70)
 print(f"Updated {updated_count} characters with rank/title")
@@ -1,9 +1,9 @@
 """
 Remove start_year, end_year, and role columns from Character_Organizations table
 """
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
@@ -3,9 +3,9 @@ Remove duplicate episodes from the Episodes table
 Keeps only one entry per series/season/episode_number combination
 """
 
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
@@ -1,9 +1,9 @@
 """
 Remove founded_year, affiliation, and description columns from Organizations table
 """
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
@@ -1,9 +1,9 @@
 """
 Remove organization_id and description columns from Ships table
 """
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
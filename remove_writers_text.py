@@ -1,9 +1,9 @@
 """
 Remove the word 'Writers' from the writer column
 """
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 # Remove 'Writers, ' prefix and keep the actual names
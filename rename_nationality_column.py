@@ -2,9 +2,9 @@
 Rename nationality column to birth_place in Actors table
 """
 
-import sqlite3
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
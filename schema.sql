@@ -15,6 +15,7 @@ CREATE TABLE Organizations (
     organization_id INTEGER PRIMARY KEY AUTOINCREMENT,
     name VARCHAR(100) NOT NULL UNIQUE,
     type VARCHAR(50), -- e.g., military, government, religious, criminal
+    stapi_uid VARCHAR(20), -- STAPI entity uid, used as the upsert key
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -27,6 +28,7 @@ CREATE TABLE Actors (
     birth_date DATE,
     birth_place VARCHAR(100),
     bio TEXT,
+    stapi_uid VARCHAR(20), -- STAPI entity uid, used as the upsert key
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -40,6 +42,7 @@ CREATE TABLE Ships (
     type VARCHAR(50), -- e.g., Starship, Shuttle, Space station
     launched_year INTEGER,
     status VARCHAR(50), -- active, destroyed, decommissioned
+    stapi_uid VARCHAR(20), -- STAPI entity uid, used as the upsert key
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -55,6 +58,7 @@ CREATE TABLE Characters (
     death_year INTEGER,
     gender VARCHAR(20),
     occupation VARCHAR(100),
+    stapi_uid VARCHAR(20), -- STAPI entity uid, used as the upsert key
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (species_id) REFERENCES Species(species_id)
@@ -112,6 +116,7 @@ CREATE TABLE Episodes (
     description TEXT,
     imdb_rating DECIMAL(3,1),
     imdb_votes INTEGER,
+    stapi_uid VARCHAR(20), -- STAPI entity uid, used as the upsert key
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (series_id) REFERENCES Series(series_id)
@@ -141,3 +146,8 @@ CREATE INDEX idx_episodes_series ON Episodes(series_id);
 CREATE INDEX idx_episodes_rating ON Episodes(imdb_rating);
 CREATE INDEX idx_character_episodes_character ON Character_Episodes(character_id);
 CREATE INDEX idx_character_episodes_episode ON Character_Episodes(episode_id);
+CREATE UNIQUE INDEX idx_characters_stapi_uid ON Characters(stapi_uid);
+CREATE UNIQUE INDEX idx_actors_stapi_uid ON Actors(stapi_uid);
+CREATE UNIQUE INDEX idx_ships_stapi_uid ON Ships(stapi_uid);
+CREATE UNIQUE INDEX idx_organizations_stapi_uid ON Organizations(stapi_uid);
+CREATE UNIQUE INDEX idx_episodes_stapi_uid ON Episodes(stapi_uid);
@@ -6,14 +6,14 @@ to determine popularity and find patterns
 
 import torch
 import torch.nn as nn
-import torch.optim as optim
-import sqlite3
 import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import StandardScaler
-import re
-from collections import defaultdict
+from db_connection import connect
+from analysis_data import (EPISODE_DTYPES, read_frame, load_appearances,
+                           load_actor_appearances, load_descriptions)
+from nn_training import fit
 
 class StarTrekAnalysisNN(nn.Module):
     def __init__(self, input_size, hidden_size=128):
@@ -46,13 +46,13 @@ class StarTrekDataLoader:
         self.scaler = StandardScaler()
         
     def connect(self):
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = connect(self.db_path)
         
     def close(self):
         if self.conn:
             self.conn.close()
     
-    def get_episode_data(self):
+    def get_episode_data(self, with_descriptions=True):
         """Get all episode data with ratings, descriptions, votes"""
         query = """
         SELECT 
@@ -63,60 +63,63 @@ class StarTrekDataLoader:
             e.season,
             e.episode_number,
             e.imdb_rating,
-            e.imdb_votes,
-            e.description
+            e.imdb_votes
         FROM Episodes e
         JOIN Series s ON e.series_id = s.series_id
         WHERE e.imdb_rating IS NOT NULL
         ORDER BY s.abbreviation, e.season, e.episode_number
         """
-        df = pd.read_sql_query(query, self.conn)
+        df = read_frame(self.conn, query, EPISODE_DTYPES)
         
-        # Fill missing descriptions with empty string
-        df['description'] = df['description'].fillna('')
+        # Descriptions are only needed for the pattern analysis and description length
+        if with_descriptions:
+            df['description'] = load_descriptions(self.conn, df['episode_id']).to_numpy()
+            # Fill missing descriptions with empty string
+            df['description'] = df['description'].fillna('')
         df['imdb_votes'] = df['imdb_votes'].fillna(0)
         
         return df
     
-    def get_character_episodes(self):
-        """Get character appearances in episodes"""
-        query = """
-        SELECT 
-            ce.episode_id,
-            c.character_id,
-            c.name as character_name,
-            c.species_id,
-            sp.name as species_name,
-            s.abbreviation as series_code
-        FROM Character_Episodes ce
-        JOIN Characters c ON ce.character_id = c.character_id
-        LEFT JOIN Species sp ON c.species_id = sp.species_id
-        JOIN Episodes e ON ce.episode_id = e.episode_id
-        JOIN Series s ON e.series_id = s.series_id
-        """
-        df = pd.read_sql_query(query, self.conn)
-        return df
+    def get_character_episodes(self, chunksize=None):
+        """Get character appearances in episodes (ids as int32, names as categories)"""
+        return load_appearances(self.conn, with_series=True, chunksize=chunksize)
     
-    def get_actor_episodes(self):
+    def get_actor_episodes(self, chunksize=None):
         """Get actor performances in episodes - only primary actors when available"""
-        query = """
-        SELECT DISTINCT
-            ce.episode_id,
-            COALESCE(c.primary_actor_id, ca.actor_id) as actor_id,
-            COALESCE(pa.first_name || ' ' || pa.last_name, a.first_name || ' ' || a.last_name) as actor_name,
-            c.character_id,
-            c.name as character_name,
-            ca.series as series_code
-        FROM Character_Episodes ce
-        JOIN Characters c ON ce.character_id = c.character_id
-        LEFT JOIN Actors pa ON c.primary_actor_id = pa.actor_id
-        LEFT JOIN Character_Actors ca ON c.character_id = ca.character_id AND c.primary_actor_id IS NULL
-        LEFT JOIN Actors a ON ca.actor_id = a.actor_id
-        JOIN Episodes e ON ce.episode_id = e.episode_id
-        WHERE c.primary_actor_id IS NOT NULL OR ca.actor_id IS NOT NULL
+        return load_actor_appearances(self.conn, with_role_series=True, chunksize=chunksize)
+    
+    def weighted_ratings(self, merged, key):
         """
-        df = pd.read_sql_query(query, self.conn)
-        return df
+        Vote-weighted average rating and total votes per `key` group
+        
+        Only rated rows count; a group whose rated episodes have no votes falls
+        back to the plain mean rating, and a group with no rated episodes gets 0.
+        Groups come back in order of first appearance.
+        """
+        rated = merged['imdb_rating'].notna()
+        frame = pd.DataFrame({
+            key: merged[key],
+            'imdb_rating': merged['imdb_rating'],
+            'votes': merged['imdb_votes'].where(rated, 0),
+            'weighted_votes': merged['imdb_rating'] * merged['imdb_votes'],
+        })
+        
+        stats = frame.groupby(key, sort=False, observed=True).agg(
+            total_votes=('votes', 'sum'),
+            weighted_sum=('weighted_votes', 'sum'),
+            mean_rating=('imdb_rating', 'mean'),
+        )
+        
+        voted = stats['total_votes'] > 0
+        stats['weighted_avg_rating'] = (stats['weighted_sum'] / stats['total_votes'].where(voted)) \
+            .fillna(stats['mean_rating']).fillna(0)
+        stats['popularity_score'] = (stats['weighted_avg_rating'] * np.log1p(stats['total_votes'])) / 10
+        return stats
+    
+    def joined_series(self, merged, key, series_column):
+        """Comma-separated distinct series per `key` group, in row order"""
+        series = merged[[key, series_column]].dropna().drop_duplicates()
+        return series.groupby(key, sort=False, observed=True)[series_column].agg(', '.join)
     
     def analyze_character_popularity(self, episode_df, character_df):
         """
@@ -132,45 +135,20 @@ class StarTrekDataLoader:
         # Merge character appearances with episode ratings
         merged = character_df.merge(episode_df, on='episode_id', how='left')
         
-        results = []
-        
-        for char_id in merged['character_id'].unique():
-            char_data = merged[merged['character_id'] == char_id]
-            char_name = char_data['character_name'].iloc[0]
-            species = char_data['species_name'].iloc[0] if pd.notna(char_data['species_name'].iloc[0]) else 'Unknown'
-            
-            # Calculate metrics
-            num_episodes = len(char_data)
-            
-            # Weighted average rating (weighted by votes)
-            valid_ratings = char_data[char_data['imdb_rating'].notna()]
-            if len(valid_ratings) > 0:
-                total_votes = valid_ratings['imdb_votes'].sum()
-                if total_votes > 0:
-                    weighted_rating = (valid_ratings['imdb_rating'] * valid_ratings['imdb_votes']).sum() / total_votes
-                else:
-                    weighted_rating = valid_ratings['imdb_rating'].mean()
-                
-                total_votes_on_episodes = valid_ratings['imdb_votes'].sum()
-            else:
-                weighted_rating = 0
-                total_votes_on_episodes = 0
-            
-            # Get series appearances
-            series_list = char_data['series_code_x'].unique().tolist()
-            
-            results.append({
-                'character_id': char_id,
-                'character_name': char_name,
-                'species': species,
-                'num_episodes': num_episodes,
-                'weighted_avg_rating': weighted_rating,
-                'total_votes': total_votes_on_episodes,
-                'series': ', '.join(series_list),
-                'popularity_score': (weighted_rating * np.log1p(total_votes_on_episodes)) / 10  # Normalized score
-            })
-        
-        results_df = pd.DataFrame(results)
+        grouped = merged.groupby('character_id', sort=False)
+        first_rows = merged.drop_duplicates('character_id').set_index('character_id')
+        stats = self.weighted_ratings(merged, 'character_id')
+        
+        results_df = pd.DataFrame({
+            'character_id': stats.index,
+            'character_name': first_rows['character_name'].to_numpy(),
+            'species': first_rows['species_name'].astype(object).fillna('Unknown').to_numpy(),
+            'num_episodes': grouped.size().to_numpy(),
+            'weighted_avg_rating': stats['weighted_avg_rating'].to_numpy(),
+            'total_votes': stats['total_votes'].to_numpy(),
+            'series': self.joined_series(merged, 'character_id', 'series_code_x').reindex(stats.index).to_numpy(),
+            'popularity_score': stats['popularity_score'].to_numpy()
+        })
         results_df = results_df.sort_values('popularity_score', ascending=False)
         
         return results_df
@@ -185,36 +163,17 @@ class StarTrekDataLoader:
         merged = character_df.merge(episode_df, on='episode_id', how='left')
         merged = merged[merged['species_name'].notna()]
         
-        results = []
+        grouped = merged.groupby('species_name', sort=False, observed=True)
+        stats = self.weighted_ratings(merged, 'species_name')
         
-        for species in merged['species_name'].unique():
-            species_data = merged[merged['species_name'] == species]
-            
-            # Calculate metrics
-            num_characters = species_data['character_id'].nunique()
-            num_episodes = len(species_data)
-            
-            valid_ratings = species_data[species_data['imdb_rating'].notna()]
-            if len(valid_ratings) > 0:
-                total_votes = valid_ratings['imdb_votes'].sum()
-                if total_votes > 0:
-                    weighted_rating = (valid_ratings['imdb_rating'] * valid_ratings['imdb_votes']).sum() / total_votes
-                else:
-                    weighted_rating = valid_ratings['imdb_rating'].mean()
-            else:
-                weighted_rating = 0
-                total_votes = 0
-            
-            results.append({
-                'species': species,
-                'num_characters': num_characters,
-                'num_episodes': num_episodes,
-                'weighted_avg_rating': weighted_rating,
-                'total_votes': total_votes,
-                'popularity_score': (weighted_rating * np.log1p(total_votes)) / 10
-            })
-        
-        results_df = pd.DataFrame(results)
+        results_df = pd.DataFrame({
+            'species': stats.index,
+            'num_characters': grouped['character_id'].nunique().to_numpy(),
+            'num_episodes': grouped.size().to_numpy(),
+            'weighted_avg_rating': stats['weighted_avg_rating'].to_numpy(),
+            'total_votes': stats['total_votes'].to_numpy(),
+            'popularity_score': stats['popularity_score'].to_numpy()
+        })
         results_df = results_df.sort_values('popularity_score', ascending=False)
         
         return results_df
@@ -234,55 +193,35 @@ class StarTrekDataLoader:
         # Merge actor appearances with episode ratings
         merged = actor_df.merge(episode_df, on='episode_id', how='left')
         
-        results = []
-        
-        for actor_id in merged['actor_id'].unique():
-            actor_data = merged[merged['actor_id'] == actor_id]
-            actor_name = actor_data['actor_name'].iloc[0]
-            
-            # Calculate metrics - count UNIQUE episodes only (not duplicates from multiple characters)
-            num_episodes = actor_data['episode_id'].nunique()
-            num_characters = actor_data['character_id'].nunique()
-            
-            # Get character names sorted by episode count
-            char_episode_counts = actor_data.groupby('character_name')['episode_id'].nunique().sort_values(ascending=False)
-            top_characters = char_episode_counts.head(3).index.tolist()
-            character_list = ', '.join(top_characters)  # Show top 3 characters by episode count
-            if len(char_episode_counts) > 3:
-                character_list += f" (+{len(char_episode_counts)-3} more)"
-            
-            # Weighted average rating (weighted by votes) - use unique episodes
-            unique_episodes = actor_data.drop_duplicates(subset='episode_id')
-            valid_ratings = unique_episodes[unique_episodes['imdb_rating'].notna()]
-            if len(valid_ratings) > 0:
-                total_votes = valid_ratings['imdb_votes'].sum()
-                if total_votes > 0:
-                    weighted_rating = (valid_ratings['imdb_rating'] * valid_ratings['imdb_votes']).sum() / total_votes
-                else:
-                    weighted_rating = valid_ratings['imdb_rating'].mean()
-                
-                total_votes_on_episodes = valid_ratings['imdb_votes'].sum()
-            else:
-                weighted_rating = 0
-                total_votes_on_episodes = 0
-            
-            # Get series appearances (filter out None values)
-            series_list = [s for s in unique_episodes['series_code_x'].unique() if pd.notna(s)]
-            series_str = ', '.join(series_list) if series_list else 'Unknown'
-            
-            results.append({
-                'actor_id': actor_id,
-                'actor_name': actor_name,
-                'num_episodes': num_episodes,
-                'num_characters': num_characters,
-                'main_characters': character_list,
-                'weighted_avg_rating': weighted_rating,
-                'total_votes': total_votes_on_episodes,
-                'series': series_str,
-                'popularity_score': (weighted_rating * np.log1p(total_votes_on_episodes)) / 10
-            })
-        
-        results_df = pd.DataFrame(results)
+        grouped = merged.groupby('actor_id', sort=False)
+        first_rows = merged.drop_duplicates('actor_id').set_index('actor_id')
+        
+        # Character names by UNIQUE episode count, top 3 per actor (ties stay in name order)
+        char_counts = merged.groupby(['actor_id', 'character_name'], observed=True)['episode_id'].nunique()
+        char_counts = char_counts.reset_index(name='episodes') \
+            .sort_values('episodes', ascending=False, kind='stable')
+        names_played = char_counts.groupby('actor_id').size()
+        character_list = char_counts.groupby('actor_id', sort=False).head(3) \
+            .groupby('actor_id')['character_name'].agg(', '.join)
+        extra = names_played - 3
+        character_list = character_list.where(extra <= 0, character_list + ' (+' + extra.astype(str) + ' more)')
+        
+        # Ratings and series over UNIQUE episodes (not duplicates from multiple characters)
+        unique_episodes = merged.drop_duplicates(subset=['actor_id', 'episode_id'])
+        stats = self.weighted_ratings(unique_episodes, 'actor_id')
+        series = self.joined_series(unique_episodes, 'actor_id', 'series_code_x')
+        
+        results_df = pd.DataFrame({
+            'actor_id': stats.index,
+            'actor_name': first_rows['actor_name'].to_numpy(),
+            'num_episodes': grouped['episode_id'].nunique().to_numpy(),
+            'num_characters': grouped['character_id'].nunique().to_numpy(),
+            'main_characters': character_list.reindex(stats.index).fillna('').to_numpy(),
+            'weighted_avg_rating': stats['weighted_avg_rating'].to_numpy(),
+            'total_votes': stats['total_votes'].to_numpy(),
+            'series': series.reindex(stats.index).astype(object).fillna('Unknown').to_numpy(),
+            'popularity_score': stats['popularity_score'].to_numpy()
+        })
         results_df = results_df.sort_values('popularity_score', ascending=False)
         
         return results_df
@@ -352,57 +291,32 @@ class StarTrekDataLoader:
         print("="*70)
         
         # Filter episodes with ratings
-        valid_eps = episode_df[episode_df['imdb_rating'].notna()].copy()
-        
-        features_list = []
-        targets = []
-        episode_ids = []
-        
-        for idx, row in valid_eps.iterrows():
-            episode_id = row['episode_id']
-            
-            # Get characters in this episode
-            chars_in_ep = character_df[character_df['episode_id'] == episode_id]
-            
-            # Feature 1: Number of characters
-            num_chars = len(chars_in_ep)
-            
-            # Feature 2: Number of unique species
-            num_species = chars_in_ep['species_name'].nunique() if len(chars_in_ep) > 0 else 0
-            
-            # Feature 3: Has human characters
-            has_human = 1 if 'Human' in chars_in_ep['species_name'].values else 0
-            
-            # Feature 4: Season number (normalized)
-            season_norm = row['season'] / 10.0 if pd.notna(row['season']) else 0
-            
-            # Feature 5: Episode number in season (normalized)
-            ep_num_norm = row['episode_number'] / 25.0 if pd.notna(row['episode_number']) else 0
-            
-            # Feature 6: Description length (log-scaled)
-            desc_length = np.log1p(len(str(row['description']))) / 10.0
-            
-            # Target: Normalized rating (0-1 scale)
-            rating_normalized = row['imdb_rating'] / 10.0
-            
-            # Weight: Log of votes (for weighted loss)
-            weight = np.log1p(row['imdb_votes']) if row['imdb_votes'] > 0 else 1.0
-            
-            features_list.append([
-                num_chars,
-                num_species,
-                has_human,
-                season_norm,
-                ep_num_norm,
-                desc_length,
-                weight  # Include weight as a feature
-            ])
-            
-            targets.append(rating_normalized)
-            episode_ids.append(episode_id)
-        
-        features_array = np.array(features_list, dtype=np.float32)
-        targets_array = np.array(targets, dtype=np.float32).reshape(-1, 1)
+        valid_eps = episode_df[episode_df['imdb_rating'].notna()]
+        
+        # Per-episode character aggregates, computed once and joined on episode_id
+        by_episode = character_df.assign(is_human=(character_df['species_name'] == 'Human').astype(np.float64)) \
+            .groupby('episode_id').agg(
+                num_chars=('character_id', 'size'),
+                num_species=('species_name', 'nunique'),
+                has_human=('is_human', 'max'),
+            )
+        aggregates = by_episode.reindex(valid_eps['episode_id']).fillna(0)
+        
+        votes = valid_eps['imdb_votes'].to_numpy(dtype=np.float64)
+        
+        features_array = np.column_stack([
+            aggregates['num_chars'].to_numpy(),                                 # Number of characters
+            aggregates['num_species'].to_numpy(),                               # Number of unique species
+            aggregates['has_human'].to_numpy(),                                 # Has human characters
+            (valid_eps['season'] / 10.0).fillna(0).to_numpy(dtype=np.float64),  # Season (normalized)
+            (valid_eps['episode_number'] / 25.0).fillna(0).to_numpy(dtype=np.float64),  # Episode in season (normalized)
+            np.log1p(valid_eps['description'].astype(str).str.len().to_numpy()) / 10.0,  # Description length (log-scaled)
+            np.where(votes > 0, np.log1p(np.maximum(votes, 0)), 1.0),           # Weight: log of votes (used by the weighted loss)
+        ]).astype(np.float32)
+        
+        # Target: Normalized rating (0-1 scale)
+        targets_array = (valid_eps['imdb_rating'] / 10.0).to_numpy(dtype=np.float32).reshape(-1, 1)
+        episode_ids = valid_eps['episode_id'].tolist()
         
         print(f"Prepared {len(features_array)} training samples")
         print(f"Feature dimensions: {features_array.shape}")
@@ -410,52 +324,31 @@ class StarTrekDataLoader:
         return features_array, targets_array, episode_ids
 
 
-def train_neural_network(features, targets, epochs=1000, learning_rate=0.001):
-    """Train the neural network to predict episode ratings"""
+def train_neural_network(features, targets, epochs=1000, learning_rate=0.001, **fit_options):
+    """
+    Train the neural network to predict episode ratings
+    
+    Mini-batch training with a validation split and early stopping (see
+    nn_training.fit); `epochs` is the upper bound.
+    """
     print("\n" + "="*70)
     print("TRAINING NEURAL NETWORK")
     print("="*70)
     
-    # Convert to PyTorch tensors
-    X = torch.FloatTensor(features)
-    y = torch.FloatTensor(targets)
-    
     # Extract weights (last column of features)
-    weights = X[:, -1]
-    X_train = X[:, :-1]  # Remove weight column from features
+    weights = features[:, -1]
+    X_train = features[:, :-1]  # Remove weight column from features
     
     # Create model
     input_size = X_train.shape[1]
     model = StarTrekAnalysisNN(input_size, hidden_size=128)
     
-    # Loss and optimizer
-    criterion = nn.MSELoss(reduction='none')  # No reduction for weighted loss
-    optimizer = optim.Adam(model.parameters(), lr=learning_rate)
-    
-    # Training loop
-    losses = []
-    
-    for epoch in range(epochs):
-        # Forward pass
-        predictions = model(X_train)
-        
-        # Calculate weighted loss
-        loss_per_sample = criterion(predictions, y)
-        weighted_loss = (loss_per_sample * weights.unsqueeze(1)).mean()
-        
-        # Backward pass
-        optimizer.zero_grad()
-        weighted_loss.backward()
-        optimizer.step()
-        
-        losses.append(weighted_loss.item())
-        
-        if (epoch + 1) % 100 == 0:
-            print(f"Epoch {epoch + 1}/{epochs}, Loss: {weighted_loss.item():.6f}")
+    history = fit(model, X_train, targets, weights, max_epochs=epochs,
+                  learning_rate=learning_rate, **fit_options)
     
     print("\nTraining complete!")
     
-    return model, losses
+    return model, history['train_loss']
 
 
 def main():
@@ -1,15 +1,81 @@
 """
 Neural Network for Star Trek Database Analysis
 Uses NN to predict episode quality and determine character/species/actor popularity
+
+Usage:
+    python startrek_analysis_nn_v2.py             # Dense one-hot model
+    python startrek_analysis_nn_v2.py --sparse    # Sparse character input (EmbeddingBag)
+    python startrek_analysis_nn_v2.py --retrain   # Ignore the saved model bundle
+    python startrek_analysis_nn_v2.py --incremental
+        # Fine-tune the saved model on new/changed episodes and only
+        # re-aggregate the characters, species and actors they touch
+
+The trained model is saved with its scaler and vocabularies to
+startrek_nn_bundle.pth; later runs on unchanged data load it instead of training.
 """
 
+import hashlib
+import os
+import sys
+
 import torch
 import torch.nn as nn
-import torch.optim as optim
-import sqlite3
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
+from db_connection import connect
+from analysis_data import (EPISODE_DTYPES, read_frame, load_appearances,
+                           load_actor_appearances, load_descriptions)
+from mention_extractor import MentionExtractor
+from nn_training import fit, make_batch, make_incidence_batch
+
+SERIES_CODES = {'TOS': 1, 'TNG': 2, 'DS9': 3, 'VOY': 4, 'ENT': 5}
+
+# Basic columns at the start of every feature vector (chars, season, episode, date, series)
+BASE_FEATURES = 7
+
+# Model bundle: weights plus everything needed to featurize and score without retraining
+BUNDLE_PATH = 'startrek_nn_bundle.pth'
+BUNDLE_FORMAT = 'startrek-nn-bundle'
+BUNDLE_VERSION = 3  # 2: per-episode hashes and predictions for --incremental; 3: per-episode cast
+
+POPULARITY_REPORTS = ['nn_character_popularity.csv', 'nn_species_popularity.csv',
+                      'nn_actor_popularity.csv']
+
+
+def training_data_hash(episode_df, character_df):
+    """SHA-256 over the episode and appearance columns the model is trained on"""
+    digest = hashlib.sha256()
+    episode_cols = ['episode_id', 'season', 'episode_number', 'imdb_rating', 'imdb_votes',
+                    'description', 'air_date', 'series_code']
+    for df in (episode_df[episode_cols], character_df[['episode_id', 'character_name']]):
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def merge_report(path, fresh_df, key, touched, sort_column):
+    """Rows of a previous report for untouched entities plus freshly computed rows, re-sorted"""
+    previous = pd.read_csv(path)
+    kept = previous[~previous[key].isin(touched)]
+    # Fresh scores are float32; widen them before rounding so the merged columns
+    # hold the same float64 values as a full run writes (7.45, not 7.449999809)
+    fresh_df = fresh_df.copy()
+    float_columns = fresh_df.select_dtypes('floating').columns
+    fresh_df[float_columns] = fresh_df[float_columns].astype('float64').round(2)
+    merged = pd.concat([kept, fresh_df], ignore_index=True)
+    return merged.sort_values(sort_column, ascending=False)
+
+
+def widen_linear(layer, mapping, in_features):
+    """Copy of a Linear layer with its input columns moved to `mapping`; new columns get zero weight"""
+    widened = nn.Linear(in_features, layer.out_features)
+    with torch.no_grad():
+        widened.weight.zero_()
+        widened.weight[:, torch.as_tensor(mapping)] = layer.weight
+        widened.bias.copy_(layer.bias)
+    return widened
+
 
 class StarTrekNN(nn.Module):
     def __init__(self, input_size):
@@ -34,6 +100,37 @@ class StarTrekNN(nn.Module):
         return x
 
 
+class StarTrekSparseNN(nn.Module):
+    """
+    StarTrekNN with a sparse first layer for the character one-hots
+    
+    The numeric features (basic, species, planets) go through a Linear layer
+    and the characters in each episode through a summed EmbeddingBag, which is
+    the same as a Linear layer over the one-hot columns but only touches the
+    characters that appear.
+    """
+    def __init__(self, num_dense, num_characters):
+        super(StarTrekSparseNN, self).__init__()
+        self.dense_in = nn.Linear(num_dense, 128)
+        self.characters = nn.EmbeddingBag(num_characters, 128, mode='sum')
+        self.fc2 = nn.Linear(128, 64)
+        self.fc3 = nn.Linear(64, 32)
+        self.fc4 = nn.Linear(32, 1)
+        
+        self.relu = nn.ReLU()
+        self.dropout = nn.Dropout(0.3)
+        self.sigmoid = nn.Sigmoid()
+    
+    def forward(self, x, char_indices, offsets):
+        x = self.relu(self.dense_in(x) + self.characters(char_indices, offsets))
+        x = self.dropout(x)
+        x = self.relu(self.fc2(x))
+        x = self.dropout(x)
+        x = self.relu(self.fc3(x))
+        x = self.sigmoid(self.fc4(x))  # Output 0-1 (normalized rating)
+        return x
+
+
 class StarTrekAnalyzer:
     def __init__(self, db_path='startrek.db'):
         self.db_path = db_path
@@ -46,14 +143,27 @@ class StarTrekAnalyzer:
         self.all_planets = []
         self.all_characters = []
         
+        # Cached per-episode predictions (see score_episodes)
+        self.episode_scores = None
+        
+        # Species/planet matcher, built from the database on first use
+        self.mentions = None
+        
+        # Hash of the data the current model was trained on (see training_data_hash),
+        # per-episode content hashes, casts and the last predictions, for incremental runs
+        self.data_hash = None
+        self.episode_hashes = {}
+        self.episode_cast = {}
+        self.predictions = {}
+        
     def connect(self):
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = connect(self.db_path)
         
     def close(self):
         if self.conn:
             self.conn.close()
     
-    def load_episode_data(self):
+    def load_episode_data(self, with_descriptions=True):
         """Load all episodes with their features"""
         query = """
         SELECT 
@@ -64,98 +174,53 @@ class StarTrekAnalyzer:
             e.episode_number,
             e.imdb_rating,
             e.imdb_votes,
-            e.description,
             e.air_date,
             s.abbreviation as series_code
         FROM Episodes e
         JOIN Series s ON e.series_id = s.series_id
         WHERE e.imdb_rating IS NOT NULL
         """
-        return pd.read_sql_query(query, self.conn)
+        df = read_frame(self.conn, query, EPISODE_DTYPES)
+        
+        # Descriptions feed the species/planet mentions; skip them when only scoring ids
+        if with_descriptions:
+            df['description'] = load_descriptions(self.conn, df['episode_id']).to_numpy()
+        return df
     
-    def load_character_episodes(self):
-        """Load character appearances in episodes"""
-        query = """
-        SELECT 
-            ce.episode_id,
-            ce.character_id,
-            c.name as character_name,
-            sp.name as species_name
-        FROM Character_Episodes ce
-        JOIN Characters c ON ce.character_id = c.character_id
-        LEFT JOIN Species sp ON c.species_id = sp.species_id
-        """
-        return pd.read_sql_query(query, self.conn)
+    def load_character_episodes(self, chunksize=None):
+        """Load character appearances in episodes (ids as int32, names as categories)"""
+        return load_appearances(self.conn, chunksize=chunksize)
     
-    def load_actor_episodes(self):
+    def load_actor_episodes(self, chunksize=None):
         """Load actor performances in episodes - only primary actor per character"""
-        query = """
-        SELECT DISTINCT
-            ce.episode_id,
-            COALESCE(c.primary_actor_id, ca.actor_id) as actor_id,
-            COALESCE(pa.first_name || ' ' || pa.last_name, a.first_name || ' ' || a.last_name) as actor_name,
-            c.character_id,
-            c.name as character_name
-        FROM Character_Episodes ce
-        JOIN Characters c ON ce.character_id = c.character_id
-        LEFT JOIN Actors pa ON c.primary_actor_id = pa.actor_id
-        LEFT JOIN Character_Actors ca ON c.character_id = ca.character_id AND c.primary_actor_id IS NULL
-        LEFT JOIN Actors a ON ca.actor_id = a.actor_id
-        WHERE c.primary_actor_id IS NOT NULL OR ca.actor_id IS NOT NULL
-        """
-        return pd.read_sql_query(query, self.conn)
+        return load_actor_appearances(self.conn, chunksize=chunksize)
+    
+    def get_mentions(self):
+        """Mention extractor over the database's species and homeworlds (built once)"""
+        if self.mentions is None:
+            self.mentions = MentionExtractor.from_database(self.conn) if self.conn else MentionExtractor()
+        return self.mentions
     
     def extract_species_from_description(self, description):
         """Extract species mentions from episode description"""
-        if pd.isna(description):
-            return []
-        
-        # Common Star Trek species
-        species_list = ['Klingon', 'Romulan', 'Vulcan', 'Andorian', 'Tellarite', 'Ferengi', 
-                       'Cardassian', 'Bajoran', 'Betazoid', 'Trill', 'Borg', 'Changeling',
-                       'Kazon', 'Ocampa', 'Talaxian', 'Species 8472', 'Breen', 'Gorn',
-                       'Orion', 'Tholian', 'Horta', 'Tribble', 'Q']
-        
-        found = []
-        desc_lower = description.lower()
-        for species in species_list:
-            if species.lower() in desc_lower:
-                found.append(species)
-        return found
+        return sorted(self.get_mentions().scan(description)[0])
     
     def extract_planets_from_description(self, description):
         """Extract planet mentions from episode description"""
-        if pd.isna(description):
-            return []
-        
-        # Common Star Trek planets/locations
-        planets = ['Earth', 'Vulcan', 'Qo\'noS', 'Romulus', 'Bajor', 'Cardassia', 'Ferenginar',
-                  'Betazed', 'Trill', 'Risa', 'Andoria', 'Tellar', 'Deep Space', 'Starbase']
-        
-        found = []
-        desc_lower = description.lower()
-        for planet in planets:
-            if planet.lower() in desc_lower:
-                found.append(planet)
-        return found
+        return sorted(self.get_mentions().scan(description)[1])
     
     def build_vocabularies(self, episode_df, character_df):
         """Build vocabularies of all unique species, planets, and characters"""
         print("\nBuilding vocabularies...")
         
-        # Get all unique species mentioned in descriptions
+        # Get all unique species and planets mentioned in descriptions (one scan each)
         all_species_set = set()
-        for desc in episode_df['description']:
-            species = self.extract_species_from_description(desc)
-            all_species_set.update(species)
-        self.all_species = sorted(list(all_species_set))
-        
-        # Get all unique planets mentioned in descriptions
         all_planets_set = set()
-        for desc in episode_df['description']:
-            planets = self.extract_planets_from_description(desc)
+        for species, planets in self.get_mentions().extract_all(episode_df):
+            all_species_set.update(species)
             all_planets_set.update(planets)
-        self.all_planets = sorted(list(all_planets_set))
+        self.all_species = sorted(all_species_set)
+        self.all_planets = sorted(all_planets_set)
         
         # Get all unique characters from database
         self.all_characters = sorted(character_df['character_name'].unique().tolist())
@@ -164,189 +229,477 @@ class StarTrekAnalyzer:
         print(f"Found {len(self.all_planets)} unique planet mentions")
         print(f"Found {len(self.all_characters)} unique characters")
     
-    def build_episode_features(self, episode_df, character_df):
-        """Build feature vectors for each episode"""
-        features_list = []
-        episode_ids = []
-        targets = []
-        weights = []
-        
-        for _, ep in episode_df.iterrows():
-            episode_id = ep['episode_id']
-            
-            # Get characters in this episode
-            chars = character_df[character_df['episode_id'] == episode_id]
-            char_names = chars['character_name'].tolist()
-            
-            # Basic features
-            num_chars = len(chars)
-            season = ep['season'] if pd.notna(ep['season']) else 0
-            ep_num = ep['episode_number'] if pd.notna(ep['episode_number']) else 0
-            
-            # Air date features
-            if pd.notna(ep['air_date']):
-                try:
-                    air_date = pd.to_datetime(ep['air_date'])
-                    air_year = air_date.year
-                    air_month = air_date.month
-                    air_day = air_date.day
-                except:
-                    air_year = 0
-                    air_month = 0
-                    air_day = 0
-            else:
-                air_year = 0
-                air_month = 0
-                air_day = 0
-            
-            # Species mentioned in description
-            species_mentioned = self.extract_species_from_description(ep['description'])
-            
-            # Planets mentioned in description
-            planets_mentioned = self.extract_planets_from_description(ep['description'])
-            
-            # Series encoding
-            series_map = {'TOS': 1, 'TNG': 2, 'DS9': 3, 'VOY': 4, 'ENT': 5}
-            series_code = series_map.get(ep['series_code'], 0)
-            
-            # Build feature vector
-            feature_vector = [
-                num_chars, season, ep_num, air_year, air_month, air_day, series_code
-            ]
-            
-            # One-hot encode species (1 if mentioned, 0 if not)
-            for species in self.all_species:
-                feature_vector.append(1.0 if species in species_mentioned else 0.0)
-            
-            # One-hot encode planets (1 if mentioned, 0 if not)
-            for planet in self.all_planets:
-                feature_vector.append(1.0 if planet in planets_mentioned else 0.0)
-            
-            # One-hot encode characters (1 if appears in episode, 0 if not)
-            for character in self.all_characters:
-                feature_vector.append(1.0 if character in char_names else 0.0)
-            
-            # Target: normalized rating
-            rating = ep['imdb_rating'] / 10.0
-            
-            # Weight: log of votes
-            weight = np.log1p(ep['imdb_votes']) if ep['imdb_votes'] > 0 else 1.0
-            
-            features_list.append(feature_vector)
-            episode_ids.append(episode_id)
-            targets.append(rating)
-            weights.append(weight)
-        
-        return np.array(features_list, dtype=np.float32), np.array(targets, dtype=np.float32), np.array(weights, dtype=np.float32), episode_ids
-    
-    def train_model(self, features, targets, weights, epochs=1000, learning_rate=0.001):
-        """Train the neural network on episode data"""
-        print("\n" + "="*70)
-        print("TRAINING NEURAL NETWORK")
-        print("="*70)
+    def mention_matrix(self, found_sets, vocabulary):
+        """Episode x term matrix (CSR): 1 where the term was mentioned in the description"""
+        columns = {term: i for i, term in enumerate(vocabulary)}
+        rows, cols = [], []
+        for row, found in enumerate(found_sets):
+            for term in found:
+                if term in columns:
+                    rows.append(row)
+                    cols.append(columns[term])
+        return sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                 shape=(len(found_sets), len(vocabulary)))
+    
+    def character_incidence(self, episode_df, character_df):
+        """
+        Episode x character incidence matrix (CSR) over self.all_characters
         
-        # Scale features
-        features_scaled = self.scaler.fit_transform(features)
+        Returns:
+            (matrix, appearances) - appearances[i] is the number of character
+            rows for episode i, including names outside the vocabulary
+        """
+        rows = pd.Index(episode_df['episode_id']).get_indexer(character_df['episode_id'])
+        cols = pd.Categorical(character_df['character_name'], categories=self.all_characters).codes
         
-        # Convert to tensors
-        X = torch.FloatTensor(features_scaled)
-        y = torch.FloatTensor(targets).reshape(-1, 1)
-        w = torch.FloatTensor(weights).reshape(-1, 1)
+        in_episodes = rows >= 0
+        appearances = np.bincount(rows[in_episodes], minlength=len(episode_df))
         
-        # Initialize model
-        input_size = X.shape[1]
-        self.model = StarTrekNN(input_size)
+        keep = in_episodes & (cols >= 0)
+        matrix = sparse.csr_matrix(
+            (np.ones(keep.sum(), dtype=np.float32), (rows[keep], cols[keep])),
+            shape=(len(episode_df), len(self.all_characters)))
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0  # Appearing twice in an episode is still one appearance
+        return matrix, appearances
+    
+    def build_episode_features(self, episode_df, character_df, as_sparse=False):
+        """
+        Build feature vectors for each episode
         
-        optimizer = optim.Adam(self.model.parameters(), lr=learning_rate)
-        criterion = nn.MSELoss(reduction='none')
+        Columns: 7 basic features (chars, season, episode, air date, series),
+        then species, planets and characters one-hot over the vocabularies.
+        With as_sparse=True the features come back as a CSR matrix.
+        """
+        char_matrix, appearances = self.character_incidence(episode_df, character_df)
+        
+        # Unparseable air dates become NaT -> 0, as before
+        air_dates = pd.to_datetime(episode_df['air_date'], errors='coerce')
+        
+        base = np.column_stack([
+            appearances,
+            episode_df['season'].fillna(0).to_numpy(dtype=np.float64),
+            episode_df['episode_number'].fillna(0).to_numpy(dtype=np.float64),
+            air_dates.dt.year.fillna(0).to_numpy(dtype=np.float64),
+            air_dates.dt.month.fillna(0).to_numpy(dtype=np.float64),
+            air_dates.dt.day.fillna(0).to_numpy(dtype=np.float64),
+            episode_df['series_code'].map(SERIES_CODES).fillna(0).to_numpy(dtype=np.float64),
+        ]).astype(np.float32)
+        
+        # Species/planet mentions, cached per episode by the extractor
+        mentions = self.get_mentions().extract_all(episode_df)
+        
+        features = sparse.hstack([
+            sparse.csr_matrix(base),
+            self.mention_matrix([species for species, _ in mentions], self.all_species),
+            self.mention_matrix([planets for _, planets in mentions], self.all_planets),
+            char_matrix,
+        ], format='csr', dtype=np.float32)
+        
+        if not as_sparse:
+            features = features.toarray()
+        
+        # Target: normalized rating
+        targets = (episode_df['imdb_rating'] / 10.0).to_numpy(dtype=np.float32)
+        
+        # Weight: log of votes (1.0 for episodes without votes)
+        votes = episode_df['imdb_votes'].fillna(0).to_numpy(dtype=np.float64)
+        weights = np.where(votes > 0, np.log1p(np.maximum(votes, 0)), 1.0).astype(np.float32)
+        
+        return features, targets, weights, episode_df['episode_id'].tolist()
+    
+    def num_dense_features(self):
+        """Columns before the character block: basic features, species, planets"""
+        return BASE_FEATURES + len(self.all_species) + len(self.all_planets)
+    
+    def split_features(self, features):
+        """Split an as_sparse feature matrix into (dense numeric array, character CSR)"""
+        features = sparse.csr_matrix(features)
+        n_dense = self.num_dense_features()
+        return features[:, :n_dense].toarray(), features[:, n_dense:].tocsr()
+    
+    def model_inputs(self, features, sparse_model, fit_scaler=False):
+        """
+        Scaled model inputs plus the nn_training batch builder that reads them
         
-        print(f"Training on {len(X)} episodes with {input_size} features")
-        print(f"Epochs: {epochs}, Learning rate: {learning_rate}")
+        The sparse model only scales the numeric columns and keeps the character
+        incidence as CSR; the dense model scales every column.
+        """
+        scale = self.scaler.fit_transform if fit_scaler else self.scaler.transform
+        if sparse_model:
+            dense, incidence = self.split_features(features)
+            return (scale(dense), incidence), make_incidence_batch
+        if sparse.issparse(features):
+            features = features.toarray()
+        return scale(features), make_batch
+    
+    def train_model(self, features, targets, weights, epochs=1000, learning_rate=0.001, **fit_options):
+        """
+        Train the neural network on episode data
         
-        losses = []
+        Mini-batch training with a validation split and early stopping (see
+        nn_training.fit); `epochs` is the upper bound. Sparse features (from
+        build_episode_features(as_sparse=True)) train StarTrekSparseNN, which
+        scales only the numeric columns and never densifies the characters.
+        """
+        print("\n" + "="*70)
+        print("TRAINING NEURAL NETWORK")
+        print("="*70)
         
-        for epoch in range(epochs):
-            self.model.train()
-            
-            # Forward pass
-            predictions = self.model(X)
-            
-            # Weighted loss
-            loss = criterion(predictions, y)
-            weighted_loss = (loss * w).mean()
-            
-            # Backward pass
-            optimizer.zero_grad()
-            weighted_loss.backward()
-            optimizer.step()
-            
-            losses.append(weighted_loss.item())
-            
-            if (epoch + 1) % 100 == 0:
-                print(f"Epoch {epoch + 1}/{epochs}, Loss: {weighted_loss.item():.6f}")
+        sparse_model = sparse.issparse(features)
+        inputs, batch_builder = self.model_inputs(features, sparse_model, fit_scaler=True)
+        if sparse_model:
+            dense, incidence = inputs
+            self.model = StarTrekSparseNN(dense.shape[1], incidence.shape[1])
+            print(f"Input features: {dense.shape[1]} dense + {incidence.shape[1]} characters (sparse)")
+        else:
+            self.model = StarTrekNN(inputs.shape[1])
+            print(f"Input features: {inputs.shape[1]}")
+        
+        fit_options.setdefault('batch_builder', batch_builder)
+        history = fit(self.model, inputs, targets, weights, max_epochs=epochs,
+                      learning_rate=learning_rate, **fit_options)
+        losses = history['train_loss']
         
         print(f"\nTraining complete! Final loss: {losses[-1]:.6f}")
         
         return losses
     
+    def fine_tune(self, features, targets, weights, epochs=30, learning_rate=0.0002, **fit_options):
+        """Warm-start the current model for a few epochs, keeping its scaler"""
+        print("\n" + "="*70)
+        print("FINE-TUNING NEURAL NETWORK")
+        print("="*70)
+        
+        inputs, batch_builder = self.model_inputs(features, isinstance(self.model, StarTrekSparseNN))
+        fit_options.setdefault('batch_builder', batch_builder)
+        fit_options.setdefault('patience', 10)
+        history = fit(self.model, inputs, targets, weights, max_epochs=epochs,
+                      learning_rate=learning_rate, **fit_options)
+        return history['train_loss']
+    
     def predict_episode_quality(self, features):
         """Use trained model to predict episode quality (0-10 scale)"""
         self.model.eval()
         with torch.no_grad():
-            features_scaled = self.scaler.transform(features)
-            X = torch.FloatTensor(features_scaled)
-            predictions = self.model(X).numpy().flatten()
+            inputs, batch_builder = self.model_inputs(features, isinstance(self.model, StarTrekSparseNN))
+            n = features.shape[0]
+            batch, _, _ = batch_builder(inputs, np.zeros(n), np.zeros(n), np.arange(n))
+            predictions = self.model(*batch).numpy().flatten()
             return predictions * 10.0  # Convert back to 0-10 scale
     
+    def feature_importance(self):
+        """Mean absolute first-layer weight per input feature, in feature column order"""
+        if isinstance(self.model, StarTrekSparseNN):
+            dense_weights = self.model.dense_in.weight.data.numpy()     # (128, num_dense)
+            char_weights = self.model.characters.weight.data.numpy()    # (num_characters, 128)
+            return np.concatenate([np.abs(dense_weights).mean(axis=0), np.abs(char_weights).mean(axis=1)])
+        
+        first_layer_weights = self.model.fc1.weight.data.numpy()  # Shape: (128, num_features)
+        return np.abs(first_layer_weights).mean(axis=0)
+    
+    def save(self, path=BUNDLE_PATH, data_hash=None, episode_hashes=None, episode_cast=None):
+        """
+        Save a versioned model bundle
+        
+        Holds the model class and config, state dict, scaler statistics,
+        vocabularies, the hash of the training data (see training_data_hash)
+        and, for incremental runs, per-episode hashes, casts and cached predictions.
+        """
+        if isinstance(self.model, StarTrekSparseNN):
+            model_config = {'num_dense': self.model.dense_in.in_features,
+                            'num_characters': self.model.characters.num_embeddings}
+        else:
+            model_config = {'input_size': self.model.fc1.in_features}
+        
+        torch.save({
+            'format': BUNDLE_FORMAT,
+            'version': BUNDLE_VERSION,
+            'model_class': type(self.model).__name__,
+            'model_config': model_config,
+            'state_dict': self.model.state_dict(),
+            'scaler': {
+                'mean': torch.from_numpy(self.scaler.mean_),
+                'var': torch.from_numpy(self.scaler.var_),
+                'scale': torch.from_numpy(self.scaler.scale_),
+                'n_samples_seen': int(np.max(self.scaler.n_samples_seen_)),
+            },
+            'vocabularies': {
+                'species': list(self.all_species),
+                'planets': list(self.all_planets),
+                'characters': list(self.all_characters),
+            },
+            'data_hash': data_hash,
+            'episode_hashes': episode_hashes or {},
+            'episode_cast': episode_cast or {},
+            'predictions': {int(episode_id): float(rating) for episode_id, rating in self.predictions.items()},
+        }, path)
+        self.data_hash = data_hash
+        self.episode_hashes = episode_hashes or {}
+        self.episode_cast = episode_cast or {}
+    
+    def load_bundle(self, path=BUNDLE_PATH):
+        """Restore model, scaler and vocabularies from a bundle written by save()"""
+        bundle = torch.load(path, weights_only=True)
+        if bundle.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"{path} is not a model bundle")
+        if bundle['version'] > BUNDLE_VERSION:
+            raise ValueError(f"{path} is bundle version {bundle['version']}, "
+                             f"this script reads up to version {BUNDLE_VERSION}")
+        
+        model_classes = {'StarTrekNN': StarTrekNN, 'StarTrekSparseNN': StarTrekSparseNN}
+        self.model = model_classes[bundle['model_class']](**bundle['model_config'])
+        self.model.load_state_dict(bundle['state_dict'])
+        self.model.eval()
+        
+        scaler = bundle['scaler']
+        self.scaler = StandardScaler()
+        self.scaler.mean_ = scaler['mean'].numpy()
+        self.scaler.var_ = scaler['var'].numpy()
+        self.scaler.scale_ = scaler['scale'].numpy()
+        self.scaler.n_samples_seen_ = scaler['n_samples_seen']
+        self.scaler.n_features_in_ = len(self.scaler.mean_)
+        
+        self.all_species = bundle['vocabularies']['species']
+        self.all_planets = bundle['vocabularies']['planets']
+        self.all_characters = bundle['vocabularies']['characters']
+        self.data_hash = bundle['data_hash']
+        self.episode_hashes = bundle.get('episode_hashes', {})
+        self.episode_cast = bundle.get('episode_cast', {})
+        self.predictions = bundle.get('predictions', {})
+        self.episode_scores = None
+    
+    @classmethod
+    def load(cls, path=BUNDLE_PATH, db_path='startrek.db'):
+        """Analyzer ready to score, restored from a model bundle (not yet connected)"""
+        analyzer = cls(db_path)
+        analyzer.load_bundle(path)
+        return analyzer
+    
+    def is_stale(self, episode_df, character_df):
+        """True if the data differs from what the loaded/saved model was trained on"""
+        return self.data_hash != training_data_hash(episode_df, character_df)
+    
+    def compute_episode_hashes(self, episode_df, character_df, actor_df=None):
+        """
+        {episode_id: content hash} over each episode's row, its character
+        appearances (name and species) and, with `actor_df`, the actors credited
+        for them, so re-mapping an actor or a species also marks the episode changed
+        """
+        episode_cols = ['season', 'episode_number', 'imdb_rating', 'imdb_votes',
+                        'description', 'air_date', 'series_code']
+        row_hashes = pd.Series(pd.util.hash_pandas_object(episode_df[episode_cols], index=False).to_numpy(),
+                               index=episode_df['episode_id'].to_numpy())
+        
+        def per_episode(df, columns):
+            # Order-independent sum of the row hashes per episode (wraps around in uint64)
+            hashes = pd.Series(pd.util.hash_pandas_object(df[columns], index=False).to_numpy(),
+                               index=df['episode_id'].to_numpy())
+            return hashes.groupby(level=0).sum().reindex(row_hashes.index, fill_value=0).to_numpy(dtype=np.uint64)
+        
+        combined = row_hashes.to_numpy(dtype=np.uint64) + per_episode(character_df, ['character_name', 'species_name'])
+        if actor_df is not None:
+            combined += per_episode(actor_df, ['actor_id', 'character_id'])
+        return {int(episode_id): f"{value:016x}" for episode_id, value in zip(row_hashes.index, combined)}
+    
+    def compute_episode_cast(self, character_df, actor_df):
+        """{episode_id: {'characters', 'species', 'actors'}} report keys of everyone appearing in each episode"""
+        cast = {}
+        for episode_id, rows in character_df.groupby('episode_id', observed=True):
+            cast[int(episode_id)] = {
+                'characters': [str(name) for name in rows['character_name'].unique()],
+                'species': [str(name) for name in rows['species_name'].dropna().unique()],
+                'actors': [],
+            }
+        for episode_id, actor_ids in actor_df.groupby('episode_id', observed=True)['actor_id']:
+            cast.setdefault(int(episode_id), {'characters': [], 'species': [], 'actors': []})
+            cast[int(episode_id)]['actors'] = [int(actor_id) for actor_id in actor_ids.unique()]
+        return cast
+    
+    def touched_entities(self, episode_ids, episode_cast):
+        """
+        Report keys (character names, species, actor ids) to re-aggregate for `episode_ids`
+        
+        Taken from both the current cast and the one saved in the bundle, so an
+        entity that lost appearances (or all of them) is recomputed or dropped.
+        """
+        touched = {'characters': set(), 'species': set(), 'actors': set()}
+        for cast in (episode_cast, self.episode_cast):
+            for episode_id in episode_ids:
+                for kind, keys in cast.get(episode_id, {}).items():
+                    touched[kind].update(keys)
+        return touched['characters'], touched['species'], touched['actors']
+    
+    def changed_episodes(self, episode_hashes):
+        """(changed or new, removed) episode ids compared to the loaded bundle"""
+        changed = [episode_id for episode_id, value in episode_hashes.items()
+                   if self.episode_hashes.get(episode_id) != value]
+        removed = [episode_id for episode_id in self.episode_hashes if episode_id not in episode_hashes]
+        return changed, removed
+    
+    def grow_vocabularies(self, episode_df, character_df):
+        """
+        Add newly seen species, planets and characters to the vocabularies
+        
+        The model's first layer and the scaler are widened to match: existing
+        columns keep their weights and statistics, new columns start at zero
+        weight (scaler mean 0, scale 1), so predictions are unchanged until
+        fine-tuning.
+        
+        Returns:
+            Number of features added
+        """
+        species, planets = set(self.all_species), set(self.all_planets)
+        for found_species, found_planets in self.get_mentions().extract_all(episode_df):
+            species.update(found_species)
+            planets.update(found_planets)
+        characters = set(self.all_characters) | set(character_df['character_name'].dropna())
+        
+        old = (self.all_species, self.all_planets, self.all_characters)
+        new = (sorted(species), sorted(planets), sorted(characters))
+        added = sum(len(n) - len(o) for o, n in zip(old, new))
+        if not added:
+            return 0
+        
+        # Old feature column -> new feature column, block by block
+        mapping = list(range(BASE_FEATURES))
+        offset = BASE_FEATURES
+        for old_vocab, new_vocab in zip(old, new):
+            positions = {term: i for i, term in enumerate(new_vocab)}
+            mapping.extend(offset + positions[term] for term in old_vocab)
+            offset += len(new_vocab)
+        mapping = np.array(mapping, dtype=np.int64)
+        
+        self.all_species, self.all_planets, self.all_characters = new
+        n_dense = self.num_dense_features()
+        
+        if isinstance(self.model, StarTrekSparseNN):
+            dense_map = mapping[mapping < n_dense]
+            char_map = mapping[mapping >= n_dense] - n_dense
+            self.model.dense_in = widen_linear(self.model.dense_in, dense_map, n_dense)
+            
+            characters_layer = nn.EmbeddingBag(len(self.all_characters), self.model.characters.embedding_dim,
+                                               mode='sum')
+            with torch.no_grad():
+                characters_layer.weight.zero_()
+                characters_layer.weight[torch.as_tensor(char_map)] = self.model.characters.weight
+            self.model.characters = characters_layer
+            self.widen_scaler(dense_map, n_dense)
+        else:
+            self.model.fc1 = widen_linear(self.model.fc1, mapping, offset)
+            self.widen_scaler(mapping, offset)
+        
+        print(f"Vocabularies grew by {added} features "
+              f"({len(self.all_species)} species, {len(self.all_planets)} planets, "
+              f"{len(self.all_characters)} characters)")
+        return added
+    
+    def widen_scaler(self, mapping, size):
+        """Move scaler statistics to their new columns; new columns pass through unscaled"""
+        for name, fill in (('mean_', 0.0), ('var_', 1.0), ('scale_', 1.0)):
+            values = np.full(size, fill, dtype=np.float64)
+            values[mapping] = getattr(self.scaler, name)
+            setattr(self.scaler, name, values)
+        self.scaler.n_features_in_ = size
+    
+    def update_scores(self, episode_df, features, changed_ids):
+        """
+        Predict only the changed (or uncached) episodes
+        
+        Every other episode keeps its prediction from the previous run, so the
+        popularity reports only move for entities in changed episodes.
+        """
+        cached = episode_df['episode_id'].map(self.predictions)
+        stale = (episode_df['episode_id'].isin(changed_ids) | cached.isna()).to_numpy()
+        
+        predicted_ratings = cached.to_numpy(dtype=np.float32)
+        if stale.any():
+            predicted_ratings[stale] = self.predict_episode_quality(features[np.flatnonzero(stale)])
+        print(f"Re-scored {int(stale.sum())} episodes, reused {int((~stale).sum())} cached predictions")
+        
+        return self.score_episodes(episode_df, None, predicted_ratings=predicted_ratings)
+    
+    def score_episodes(self, episode_df, character_df, features=None, predicted_ratings=None):
+        """
+        Predict every episode once and cache the scores for the popularity reports
+        
+        Returns:
+            Predicted ratings (0-10 scale), in episode_df order
+        """
+        if predicted_ratings is None:
+            if features is None:
+                features, _, _, _ = self.build_episode_features(
+                    episode_df, character_df, as_sparse=isinstance(self.model, StarTrekSparseNN))
+            predicted_ratings = self.predict_episode_quality(features)
+        self.predictions = dict(zip(episode_df['episode_id'].tolist(), predicted_ratings.tolist()))
+        
+        self.episode_scores = pd.DataFrame({
+            'episode_id': episode_df['episode_id'].to_numpy(),
+            'series_code': episode_df['series_code'].to_numpy(),
+            'imdb_votes': episode_df['imdb_votes'].to_numpy(),
+            'predicted_rating': predicted_ratings,
+            'position': np.arange(len(episode_df)),
+        })
+        return predicted_ratings
+    
+    def episode_stats(self, appearances, key, episode_df, character_df):
+        """
+        Aggregate the cached episode scores per entity
+        
+        Args:
+            appearances: DataFrame with `key` and episode_id columns
+            key: Entity column (e.g. character_id)
+        
+        Returns:
+            DataFrame indexed by `key`, in first-appearance order, with
+            num_episodes, nn_avg_rating, total_votes and series. Entities
+            without a rated episode are left out.
+        """
+        if self.episode_scores is None:
+            self.score_episodes(episode_df, character_df)
+        
+        # Unique (entity, episode) pairs, in episode_df order so series lists match it
+        pairs = appearances[[key, 'episode_id']].drop_duplicates()
+        pairs = pairs.merge(self.episode_scores, on='episode_id')
+        pairs = pairs.sort_values('position', kind='stable')
+        
+        stats = pairs.groupby(key, sort=False, observed=True).agg(
+            num_episodes=('episode_id', 'size'),
+            nn_avg_rating=('predicted_rating', 'mean'),
+            total_votes=('imdb_votes', 'sum'),
+        )
+        stats['series'] = (pairs.drop_duplicates([key, 'series_code'])
+                           .groupby(key, sort=False, observed=True)['series_code'].agg(', '.join))
+        
+        keys = pd.unique(appearances[key])
+        keys = keys[pd.Index(keys).isin(stats.index)]
+        return stats.loc[keys]
+    
+    def popularity_score(self, stats):
+        """Average NN prediction weighted by episode count and votes"""
+        return (stats['nn_avg_rating'] * np.log1p(stats['num_episodes'])
+                * np.log1p(stats['total_votes'])) / 100
+    
     def analyze_character_popularity(self, episode_df, character_df):
         """Use NN to determine character popularity"""
         print("\n" + "="*70)
         print("ANALYZING CHARACTER POPULARITY WITH NEURAL NETWORK")
         print("="*70)
         
-        results = []
+        stats = self.episode_stats(character_df, 'character_id', episode_df, character_df)
         
-        for char_id in character_df['character_id'].unique():
-            # Get episodes this character appears in
-            char_episodes = character_df[character_df['character_id'] == char_id]
-            char_name = char_episodes['character_name'].iloc[0]
-            species = char_episodes['species_name'].iloc[0] if pd.notna(char_episodes['species_name'].iloc[0]) else 'Unknown'
-            
-            # Get episode details
-            ep_ids = char_episodes['episode_id'].unique()
-            char_eps = episode_df[episode_df['episode_id'].isin(ep_ids)]
-            
-            if len(char_eps) == 0:
-                continue
-            
-            # Build features for these episodes
-            features, _, _, _ = self.build_episode_features(char_eps, character_df)
-            
-            # Use NN to predict quality scores
-            predicted_ratings = self.predict_episode_quality(features)
-            
-            # Calculate popularity metrics
-            num_episodes = len(char_eps)
-            avg_predicted_rating = predicted_ratings.mean()
-            total_votes = char_eps['imdb_votes'].sum()
-            
-            # Get series
-            series_list = char_eps['series_code'].unique().tolist()
-            
-            # Popularity score: average NN prediction weighted by episode count and votes
-            popularity_score = (avg_predicted_rating * np.log1p(num_episodes) * np.log1p(total_votes)) / 100
-            
-            results.append({
-                'character_name': char_name,
-                'species': species,
-                'num_episodes': num_episodes,
-                'nn_avg_rating': round(avg_predicted_rating, 2),
-                'total_votes': int(total_votes),
-                'series': ', '.join(series_list),
-                'popularity_score': round(popularity_score, 2)
-            })
-        
-        results_df = pd.DataFrame(results)
+        # Name and species come from each character's first appearance row
+        first_rows = character_df.drop_duplicates('character_id').set_index('character_id').loc[stats.index]
+        
+        results_df = pd.DataFrame({
+            'character_name': first_rows['character_name'].to_numpy(),
+            'species': first_rows['species_name'].astype(object).fillna('Unknown').to_numpy(),
+            'num_episodes': stats['num_episodes'].to_numpy(),
+            'nn_avg_rating': stats['nn_avg_rating'].round(2).to_numpy(),
+            'total_votes': stats['total_votes'].astype(int).to_numpy(),
+            'series': stats['series'].to_numpy(),
+            'popularity_score': self.popularity_score(stats).round(2).to_numpy(),
+        })
         results_df = results_df.sort_values('popularity_score', ascending=False)
         
         print(f"Analyzed {len(results_df)} characters")
@@ -359,43 +712,18 @@ class StarTrekAnalyzer:
         print("ANALYZING SPECIES POPULARITY WITH NEURAL NETWORK")
         print("="*70)
         
-        results = []
-        
-        for species_name in character_df['species_name'].dropna().unique():
-            # Get all characters of this species
-            species_chars = character_df[character_df['species_name'] == species_name]
-            
-            # Get all episodes featuring this species
-            ep_ids = species_chars['episode_id'].unique()
-            species_eps = episode_df[episode_df['episode_id'].isin(ep_ids)]
-            
-            if len(species_eps) == 0:
-                continue
-            
-            # Build features
-            features, _, _, _ = self.build_episode_features(species_eps, character_df)
-            
-            # NN predictions
-            predicted_ratings = self.predict_episode_quality(features)
-            
-            # Metrics
-            num_characters = species_chars['character_id'].nunique()
-            num_episodes = len(species_eps)
-            avg_predicted_rating = predicted_ratings.mean()
-            total_votes = species_eps['imdb_votes'].sum()
-            
-            popularity_score = (avg_predicted_rating * np.log1p(num_episodes) * np.log1p(total_votes)) / 100
-            
-            results.append({
-                'species': species_name,
-                'num_characters': num_characters,
-                'num_episodes': num_episodes,
-                'nn_avg_rating': round(avg_predicted_rating, 2),
-                'total_votes': int(total_votes),
-                'popularity_score': round(popularity_score, 2)
-            })
-        
-        results_df = pd.DataFrame(results)
+        species_df = character_df.dropna(subset=['species_name'])
+        stats = self.episode_stats(species_df, 'species_name', episode_df, character_df)
+        num_characters = species_df.groupby('species_name', observed=True)['character_id'].nunique()
+        
+        results_df = pd.DataFrame({
+            'species': stats.index.to_numpy(),
+            'num_characters': num_characters.loc[stats.index].to_numpy(),
+            'num_episodes': stats['num_episodes'].to_numpy(),
+            'nn_avg_rating': stats['nn_avg_rating'].round(2).to_numpy(),
+            'total_votes': stats['total_votes'].astype(int).to_numpy(),
+            'popularity_score': self.popularity_score(stats).round(2).to_numpy(),
+        })
         results_df = results_df.sort_values('popularity_score', ascending=False)
         
         print(f"Analyzed {len(results_df)} species")
@@ -408,53 +736,29 @@ class StarTrekAnalyzer:
         print("ANALYZING ACTOR POPULARITY WITH NEURAL NETWORK")
         print("="*70)
         
-        results = []
-        
-        for actor_id in actor_df['actor_id'].unique():
-            # Get episodes this actor appears in
-            actor_episodes = actor_df[actor_df['actor_id'] == actor_id]
-            actor_name = actor_episodes['actor_name'].iloc[0]
-            
-            # Get their characters (sorted by UNIQUE episode count per character)
-            char_counts = actor_episodes.groupby('character_name')['episode_id'].nunique().sort_values(ascending=False)
-            main_characters = ', '.join(char_counts.head(3).index.tolist())
-            
-            # Get episode details - use UNIQUE episodes only
-            ep_ids = actor_episodes['episode_id'].unique()
-            actor_eps = episode_df[episode_df['episode_id'].isin(ep_ids)]
-            
-            if len(actor_eps) == 0:
-                continue
-            
-            # Build features
-            features, _, _, _ = self.build_episode_features(actor_eps, character_df)
-            
-            # NN predictions
-            predicted_ratings = self.predict_episode_quality(features)
-            
-            # Metrics
-            num_episodes = len(actor_eps)
-            avg_predicted_rating = predicted_ratings.mean()
-            total_votes = actor_eps['imdb_votes'].sum()
-            
-            # Get series
-            series_list = actor_eps['series_code'].unique().tolist()
-            
-            popularity_score = (avg_predicted_rating * np.log1p(num_episodes) * np.log1p(total_votes)) / 100
-            
-            results.append({
-                'Actor ID': actor_id,
-                'Actor Name': actor_name,
-                'Episode Count': num_episodes,
-                'Characters Played': char_counts.shape[0],
-                'Notable Characters': main_characters,
-                'Avg Rating (Weighted)': round(avg_predicted_rating, 2),
-                'Total IMDB Votes': int(total_votes),
-                'Series': ', '.join(series_list),
-                'Popularity Score': round(popularity_score, 2)
-            })
-        
-        results_df = pd.DataFrame(results)
+        stats = self.episode_stats(actor_df, 'actor_id', episode_df, character_df)
+        first_rows = actor_df.drop_duplicates('actor_id').set_index('actor_id').loc[stats.index]
+        
+        # Characters per actor by UNIQUE episode count (ties stay in name order)
+        char_counts = (actor_df.groupby(['actor_id', 'character_name'], observed=True)['episode_id']
+                       .nunique().reset_index(name='episodes'))
+        char_counts = char_counts.sort_values(['actor_id', 'episodes'], ascending=[True, False],
+                                              kind='stable')
+        characters_played = char_counts.groupby('actor_id').size()
+        main_characters = (char_counts.groupby('actor_id', sort=False).head(3)
+                           .groupby('actor_id')['character_name'].agg(', '.join))
+        
+        results_df = pd.DataFrame({
+            'Actor ID': stats.index.to_numpy(),
+            'Actor Name': first_rows['actor_name'].to_numpy(),
+            'Episode Count': stats['num_episodes'].to_numpy(),
+            'Characters Played': characters_played.loc[stats.index].to_numpy(),
+            'Notable Characters': main_characters.loc[stats.index].to_numpy(),
+            'Avg Rating (Weighted)': stats['nn_avg_rating'].round(2).to_numpy(),
+            'Total IMDB Votes': stats['total_votes'].astype(int).to_numpy(),
+            'Series': stats['series'].to_numpy(),
+            'Popularity Score': self.popularity_score(stats).round(2).to_numpy(),
+        })
         results_df = results_df.sort_values('Popularity Score', ascending=False)
         
         print(f"Analyzed {len(results_df)} actors")
@@ -480,23 +784,67 @@ def main():
     print(f"Loaded {len(character_df)} character appearances")
     print(f"Loaded {len(actor_df)} actor performances")
     
-    # Build vocabularies for encoding
-    analyzer.build_vocabularies(episode_df, character_df)
-    
-    # Build features and train model
-    features, targets, weights, episode_ids = analyzer.build_episode_features(episode_df, character_df)
-    losses = analyzer.train_model(features, targets, weights, epochs=1000, learning_rate=0.001)
-    
-    # Save model
-    torch.save(analyzer.model.state_dict(), 'startrek_nn_model.pth')
-    print("\n✓ Model saved to startrek_nn_model.pth")
+    # Reuse the saved bundle unless the training data changed (or --retrain);
+    # --incremental fine-tunes it on the changed episodes instead of retraining
+    data_hash = training_data_hash(episode_df, character_df)
+    episode_hashes = analyzer.compute_episode_hashes(episode_df, character_df, actor_df)
+    episode_cast = analyzer.compute_episode_cast(character_df, actor_df)
+    use_sparse = '--sparse' in sys.argv
+    mode = 'train'
+    if '--retrain' not in sys.argv and os.path.exists(BUNDLE_PATH):
+        analyzer.load_bundle(BUNDLE_PATH)
+        if isinstance(analyzer.model, StarTrekSparseNN) != use_sparse:
+            print(f"\nModel bundle {BUNDLE_PATH} holds the other model variant, retraining")
+        elif '--incremental' in sys.argv and analyzer.episode_hashes:
+            print(f"\n✓ Loaded model bundle {BUNDLE_PATH} (incremental update)")
+            mode = 'incremental'
+        elif analyzer.data_hash != data_hash:
+            print(f"\nModel bundle {BUNDLE_PATH} is stale (training data changed), retraining")
+        else:
+            print(f"\n✓ Loaded model bundle {BUNDLE_PATH} (training data unchanged, skipping training)")
+            mode = 'loaded'
+    
+    changed, removed = [], []
+    touched_chars, touched_species, touched_actors = set(), set(), set()
+    merge_reports = False
+    if mode == 'train':
+        # Build vocabularies for encoding
+        analyzer.build_vocabularies(episode_df, character_df)
+    elif mode == 'incremental':
+        changed, removed = analyzer.changed_episodes(episode_hashes)
+        print(f"{len(changed)} new or changed episodes, {len(removed)} removed since the last run")
+        touched_chars, touched_species, touched_actors = analyzer.touched_entities(
+            set(changed) | set(removed), episode_cast)
+        # Bundles from before version 3 have no cast to find entities that lost appearances
+        merge_reports = bool(analyzer.episode_cast)
+        analyzer.grow_vocabularies(episode_df, character_df)
+    
+    # Build features (--sparse: EmbeddingBag model over sparse character features)
+    features, targets, weights, episode_ids = analyzer.build_episode_features(
+        episode_df, character_df, as_sparse=use_sparse)
+    
+    if mode == 'train':
+        losses = analyzer.train_model(features, targets, weights, epochs=1000, learning_rate=0.001)
+    elif mode == 'incremental' and (changed or removed):
+        losses = analyzer.fine_tune(features, targets, weights)
+    
+    if mode != 'loaded':
+        # Save model
+        torch.save(analyzer.model.state_dict(), 'startrek_nn_model.pth')
+        print("\n✓ Model saved to startrek_nn_model.pth")
     
     # Predict ratings for all episodes and save to CSV
     print("\n" + "="*70)
     print("PREDICTING EPISODE RATINGS")
     print("="*70)
     
-    predicted_ratings = analyzer.predict_episode_quality(features)
+    if mode == 'incremental':
+        predicted_ratings = analyzer.update_scores(episode_df, features, changed)
+    else:
+        predicted_ratings = analyzer.score_episodes(episode_df, character_df, features)
+    
+    analyzer.save(BUNDLE_PATH, data_hash, episode_hashes, episode_cast)
+    print(f"✓ Model bundle saved to {BUNDLE_PATH}")
     
     episode_predictions = pd.DataFrame({
         'Episode ID': episode_ids,
@@ -519,11 +867,8 @@ def main():
     print("ANALYZING CHARACTER/SPECIES PATTERNS FROM NN WEIGHTS")
     print("="*70)
     
-    # Get first layer weights (these show feature importance)
-    first_layer_weights = analyzer.model.fc1.weight.data.numpy()  # Shape: (128, num_features)
-    
-    # Average across hidden neurons to get overall feature importance
-    feature_importance = np.abs(first_layer_weights).mean(axis=0)
+    # First layer weights averaged across hidden neurons show overall feature importance
+    feature_importance = analyzer.feature_importance()
     
     # Feature indices: 
     # 0-6: basic features (chars, season, episode, date, series)
@@ -532,7 +877,7 @@ def main():
     # (7+21+13)-end: characters one-hot
     
     pattern_results = []
-    base_features = 7
+    base_features = BASE_FEATURES
     species_start = base_features
     species_end = species_start + len(analyzer.all_species)
     planets_start = species_end
@@ -575,10 +920,29 @@ def main():
     print(f"  Extracted NN weights for {len(analyzer.all_species)} species and top 50 characters")
     print(f"  Higher weights = stronger influence on episode quality prediction")
     
-    # Use trained NN to analyze popularity
-    char_popularity = analyzer.analyze_character_popularity(episode_df, character_df)
-    species_popularity = analyzer.analyze_species_popularity(episode_df, character_df)
-    actor_popularity = analyzer.analyze_actor_popularity(episode_df, actor_df, character_df)
+    # Use trained NN to analyze popularity (from the cached episode scores)
+    if merge_reports and all(os.path.exists(path) for path in POPULARITY_REPORTS):
+        # Only re-aggregate entities that appear (or appeared) in changed or removed
+        # episodes; touched entities without appearances left drop out of the reports
+        char_popularity = merge_report(
+            'nn_character_popularity.csv',
+            analyzer.analyze_character_popularity(
+                episode_df, character_df[character_df['character_name'].isin(touched_chars)]),
+            'character_name', touched_chars, 'popularity_score')
+        species_popularity = merge_report(
+            'nn_species_popularity.csv',
+            analyzer.analyze_species_popularity(
+                episode_df, character_df[character_df['species_name'].isin(touched_species)]),
+            'species', touched_species, 'popularity_score')
+        actor_popularity = merge_report(
+            'nn_actor_popularity.csv',
+            analyzer.analyze_actor_popularity(
+                episode_df, actor_df[actor_df['actor_id'].isin(touched_actors)], character_df),
+            'Actor ID', touched_actors, 'Popularity Score')
+    else:
+        char_popularity = analyzer.analyze_character_popularity(episode_df, character_df)
+        species_popularity = analyzer.analyze_species_popularity(episode_df, character_df)
+        actor_popularity = analyzer.analyze_actor_popularity(episode_df, actor_df, character_df)
     
     # Display results
     print("\n" + "="*70)
@@ -1,8 +1,8 @@
 """
 Test what's on a director's IMDB page to see episode information
 """
-import requests
 from bs4 import BeautifulSoup
+from http_cache import cached_get
 
 # Test with a known TOS director
 person_url = "https://www.imdb.com/name/nm0515237/"  # David Livingston (DS9 director)
@@ -12,7 +12,7 @@ headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 }
 
-response = requests.get(person_url, headers=headers, timeout=15)
+response = cached_get(person_url, headers=headers, timeout=15)
 soup = BeautifulSoup(response.content, 'html.parser')
 
 print(f"Looking for DS9 episodes on {person_url}\n")
@@ -2,8 +2,8 @@
 Test script to check STAPI responses and see what data is available
 """
 
-import requests
 import json
+from http_cache import cached_get
 
 BASE_URL = "http://stapi.co/api/v1/rest"
 
@@ -23,7 +23,7 @@ def test_endpoint(endpoint, search_term=None):
         params['name'] = search_term
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = cached_get(url, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
         
@@ -63,7 +63,7 @@ def test_specific_character(name):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = cached_get(url, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
         
@@ -91,7 +91,7 @@ def test_episode_details():
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = cached_get(url, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
         
@@ -0,0 +1,236 @@
+"""
+Persisted STAPI UID index
+Maps (entity type, name) -> STAPI uid in the database so scripts can resolve
+names without re-crawling the /search endpoints every run.
+
+Usage:
+    python uid_index.py                     # Build missing indexes
+    python uid_index.py --refresh           # Re-pull pages that changed
+"""
+
+import hashlib
+import json
+import sys
+
+from fetch_engine import FetchEngine
+from db_connection import connect
+
+# entity type -> (response list key, name field)
+ENTITY_TYPES = {
+    'character': ('characters', 'name'),
+    'episode': ('episodes', 'title'),
+    'performer': ('performers', 'name'),
+    'species': ('species', 'name'),
+    'spacecraft': ('spacecraft', 'name'),
+    'series': ('series', 'title'),
+    'organization': ('organizations', 'name'),
+}
+
+PAGE_SIZE = 100
+
+
+class UIDIndex:
+    """Name -> uid index for STAPI entities, stored in STAPI_UID_Index"""
+
+    def __init__(self, conn, client=None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.client = client or FetchEngine()
+        self.create_tables()
+
+    def create_tables(self):
+        """Create the index tables if they don't exist yet"""
+        self.cursor.executescript("""
+            CREATE TABLE IF NOT EXISTS STAPI_UID_Index (
+                entity_type VARCHAR(20) NOT NULL,
+                uid VARCHAR(20) NOT NULL,
+                name VARCHAR(200) NOT NULL,
+                page_number INTEGER NOT NULL,
+                PRIMARY KEY (entity_type, uid)
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_uid_index_name
+                ON STAPI_UID_Index(entity_type, name);
+
+            CREATE TABLE IF NOT EXISTS STAPI_UID_Index_Pages (
+                entity_type VARCHAR(20) NOT NULL,
+                page_number INTEGER NOT NULL,
+                content_hash VARCHAR(64) NOT NULL,
+                total_elements INTEGER,
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (entity_type, page_number)
+            );
+        """)
+        self.conn.commit()
+
+    def fetch_page(self, entity_type, page_number):
+        """Fetch one search page and return (entries, page_info)"""
+        list_key, name_field = ENTITY_TYPES[entity_type]
+        data = self.client.get_json(f"{entity_type}/search",
+                                    params={'pageNumber': page_number, 'pageSize': PAGE_SIZE})
+        if data is None:
+            return None, {}
+
+        entries = [(item['uid'], item[name_field])
+                   for item in data.get(list_key, [])
+                   if item.get('uid') and item.get(name_field)]
+        return entries, data.get('page', {})
+
+    def store_page(self, entity_type, page_number, entries, total_elements):
+        """Replace one page of the index if its contents changed; return True if rewritten"""
+        content_hash = hashlib.sha256(json.dumps(sorted(entries)).encode('utf-8')).hexdigest()
+
+        self.cursor.execute("""
+            SELECT content_hash FROM STAPI_UID_Index_Pages
+            WHERE entity_type = ? AND page_number = ?
+        """, (entity_type, page_number))
+        result = self.cursor.fetchone()
+
+        self.cursor.execute("""
+            INSERT OR REPLACE INTO STAPI_UID_Index_Pages
+            (entity_type, page_number, content_hash, total_elements, fetched_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (entity_type, page_number, content_hash, total_elements))
+
+        if result and result[0] == content_hash:
+            return False
+
+        self.cursor.execute("""
+            DELETE FROM STAPI_UID_Index WHERE entity_type = ? AND page_number = ?
+        """, (entity_type, page_number))
+        self.cursor.executemany("""
+            INSERT OR REPLACE INTO STAPI_UID_Index (entity_type, uid, name, page_number)
+            VALUES (?, ?, ?, ?)
+        """, [(entity_type, uid, name, page_number) for uid, name in entries])
+        return True
+
+    def is_built(self, entity_type):
+        self.cursor.execute("SELECT COUNT(*) FROM STAPI_UID_Index_Pages WHERE entity_type = ?", (entity_type,))
+        return self.cursor.fetchone()[0] > 0
+
+    def build(self, entity_type, refresh=False, max_age_days=7):
+        """
+        Build (or refresh) the index for one entity type
+
+        Page 0 tells us how many pages there are; the rest are fetched
+        concurrently. On refresh, pages are only re-pulled if the total
+        element count changed or they are older than max_age_days, and
+        only pages whose contents changed are rewritten. Refreshing only
+        sees new data with a client that bypasses the response cache
+        (FetchEngine(use_cache=False)), as main() uses for --refresh.
+
+        Returns:
+            Number of uids indexed for this entity type
+        """
+        if self.is_built(entity_type) and not refresh:
+            return self.count(entity_type)
+
+        print(f"\nIndexing STAPI {entity_type} UIDs...")
+
+        self.cursor.execute("""
+            SELECT MAX(total_elements) FROM STAPI_UID_Index_Pages WHERE entity_type = ?
+        """, (entity_type,))
+        previous_total = self.cursor.fetchone()[0]
+
+        entries, page_info = self.fetch_page(entity_type, 0)
+        if entries is None:
+            print(f"  Could not fetch first {entity_type} page")
+            return self.count(entity_type)
+
+        total_pages = page_info.get('totalPages', 1)
+        total_elements = page_info.get('totalElements')
+        changed = int(self.store_page(entity_type, 0, entries, total_elements))
+
+        pages = list(range(1, total_pages))
+        if refresh and previous_total == total_elements:
+            self.cursor.execute("""
+                SELECT page_number FROM STAPI_UID_Index_Pages
+                WHERE entity_type = ? AND fetched_at >= datetime('now', ?)
+            """, (entity_type, f'-{max_age_days} days'))
+            recent = {row[0] for row in self.cursor.fetchall()}
+            pages = [page for page in pages if page not in recent]
+
+        fetched = 1
+        for page_number, (page_entries, _) in self.client.imap(
+                lambda page: self.fetch_page(entity_type, page), pages):
+            if page_entries is None:
+                continue
+            changed += int(self.store_page(entity_type, page_number, page_entries, total_elements))
+            fetched += 1
+            if fetched % 20 == 0:
+                print(f"  {fetched}/{len(pages) + 1} pages fetched")
+                self.conn.commit()
+
+        # The listing may have shrunk since the last build
+        self.cursor.execute("""
+            DELETE FROM STAPI_UID_Index WHERE entity_type = ? AND page_number >= ?
+        """, (entity_type, total_pages))
+        self.cursor.execute("""
+            DELETE FROM STAPI_UID_Index_Pages WHERE entity_type = ? AND page_number >= ?
+        """, (entity_type, total_pages))
+        self.conn.commit()
+
+        count = self.count(entity_type)
+        print(f"  Fetched {fetched} of {total_pages} pages, {changed} changed, {count} {entity_type} UIDs indexed")
+        return count
+
+    def count(self, entity_type):
+        self.cursor.execute("SELECT COUNT(*) FROM STAPI_UID_Index WHERE entity_type = ?", (entity_type,))
+        return self.cursor.fetchone()[0]
+
+    def lookup(self, entity_type, name):
+        """Return the uid for a name, or None"""
+        self.cursor.execute("""
+            SELECT uid FROM STAPI_UID_Index
+            WHERE entity_type = ? AND name = ?
+            ORDER BY page_number DESC
+            LIMIT 1
+        """, (entity_type, name))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+
+    def name_map(self, entity_type, build=True):
+        """
+        Return a {name: uid} dict for an entity type, building the index first if needed
+
+        When several entities share a name, the one listed last wins, matching the
+        old per-script caches.
+        """
+        if build:
+            self.build(entity_type)
+
+        self.cursor.execute("""
+            SELECT name, uid FROM STAPI_UID_Index
+            WHERE entity_type = ?
+            ORDER BY page_number
+        """, (entity_type,))
+        return dict(self.cursor.fetchall())
+
+
+def main():
+    refresh = '--refresh' in sys.argv
+
+    conn = connect()
+    # A refresh has to reach STAPI: the shared response cache would serve
+    # page 0 and the old pages for up to 30 days and find no changes
+    index = UIDIndex(conn, client=FetchEngine(use_cache=False) if refresh else None)
+
+    print("="*70)
+    print("BUILDING STAPI UID INDEX" + (" (REFRESH)" if refresh else ""))
+    print("="*70)
+
+    try:
+        for entity_type in ENTITY_TYPES:
+            index.build(entity_type, refresh=refresh)
+
+        print("\n" + "="*70)
+        for entity_type in ENTITY_TYPES:
+            print(f"{entity_type:15} {index.count(entity_type):6} UIDs")
+        print("="*70)
+    finally:
+        index.client.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
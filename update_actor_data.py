@@ -2,9 +2,9 @@
 Update actor records with birth date and nationality from STAPI
 """
 
-import sqlite3
-import requests
 import time
+from http_cache import cached_get
+from db_connection import connect
 
 BASE_URL = "http://stapi.co/api/v1/rest"
 
@@ -17,7 +17,7 @@ def fetch_performers(page_number=0, page_size=100):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = cached_get(url, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
         return data.get('performers', []), data.get('page', {})
@@ -25,7 +25,7 @@ def fetch_performers(page_number=0, page_size=100):
         print(f"Error fetching page {page_number}: {e}")
         return [], {}
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
@@ -47,37 +47,22 @@ while True:
     print(f"  Processing {len(performers)} performers...")
     
     for performer in performers:
-        name = performer.get('name', '')
-        if not name:
+        uid = performer.get('uid')
+        if not uid:
             continue
         
-        # Split name
-        name_parts = name.split(maxsplit=1)
-        first_name = name_parts[0] if name_parts else ''
-        last_name = name_parts[1] if len(name_parts) > 1 else ''
-        
         # Get STAPI data
         date_of_birth = performer.get('dateOfBirth')
         place_of_birth = performer.get('placeOfBirth')
         
-        # Find actor in database
+        # Update the actor with this STAPI uid, if we have one
         cursor.execute("""
-            SELECT actor_id FROM Actors
-            WHERE first_name = ? AND last_name = ?
-        """, (first_name, last_name))
-        
-        result = cursor.fetchone()
+            UPDATE Actors
+            SET birth_date = ?, nationality = ?
+            WHERE stapi_uid = ?
+        """, (date_of_birth, place_of_birth, uid))
         
-        if result:
-            actor_id = result[0]
-            
-            # Update with STAPI data
-            cursor.execute("""
-                UPDATE Actors
-                SET birth_date = ?, nationality = ?
-                WHERE actor_id = ?
-            """, (date_of_birth, place_of_birth, actor_id))
-            
+        if cursor.rowcount > 0:
             if date_of_birth or place_of_birth:
                 updated_count += 1
         else:
@@ -103,7 +88,7 @@ print(f"⚠ {not_found_count} performers not found in database")
 print("="*70)
 
 # Show sample
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 cursor.execute("""
     SELECT first_name, last_name, birth_date, nationality 
@@ -2,9 +2,9 @@
 Update character records with more complete data from STAPI
 """
 
-import sqlite3
-import requests
 import time
+from http_cache import cached_get
+from db_connection import connect
 
 BASE_URL = "http://stapi.co/api/v1/rest"
 
@@ -17,7 +17,7 @@ def fetch_characters(page_number=0, page_size=100):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = cached_get(url, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
         return data.get('characters', []), data.get('page', {})
@@ -25,7 +25,7 @@ def fetch_characters(page_number=0, page_size=100):
         print(f"Error fetching page {page_number}: {e}")
         return [], {}
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
@@ -50,19 +50,10 @@ while True:
     print(f"  Processing {len(characters)} characters...")
     
     for character in characters:
-        name = character.get('name', '')
-        if not name:
+        uid = character.get('uid')
+        if not uid:
             continue
         
-        # Find character in database
-        cursor.execute("SELECT character_id FROM Characters WHERE name = ?", (name,))
-        result = cursor.fetchone()
-        
-        if not result:
-            continue
-        
-        character_id = result[0]
-        
         # Get STAPI data
         gender = character.get('gender')
         birth_year = character.get('yearOfBirth')
@@ -85,8 +76,12 @@ while True:
                 species_id = COALESCE(?, species_id),
                 birth_year = COALESCE(?, birth_year),
                 death_year = COALESCE(?, death_year)
-            WHERE character_id = ?
-        """, (gender, species_id, birth_year, death_year, character_id))
+            WHERE stapi_uid = ?
+        """, (gender, species_id, birth_year, death_year, uid))
+        
+        # Characters we don't have are left alone
+        if cursor.rowcount == 0:
+            continue
         
         if gender or species_id or birth_year or death_year:
             updated_count += 1
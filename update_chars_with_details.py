@@ -1,121 +1,27 @@
 """
 Fetch ALL characters from STAPI with full details and update database
-Uses pagination to get every character, then fetches full details for each
+Uses the stapi_uid stored on each character to fetch full details once each
 """
 
-import sqlite3
-import requests
-import time
 
-BASE_URL = "http://stapi.co/api/v1/rest"
+from character_details import CharacterDetailStage, AttributeUpdater
+from db_connection import connect
 
-conn = sqlite3.connect('startrek.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("="*70)
 print("UPDATING CHARACTERS WITH FULL STAPI DATA")
 print("="*70)
 
-# Get species mapping
-cursor.execute("SELECT species_id, name FROM Species")
-species_map = {name.lower(): sid for sid, name in cursor.fetchall()}
+# Fetch full details once per character and apply them
+cursor.execute("SELECT character_id, stapi_uid FROM Characters")
+db_characters = cursor.fetchall()
 
-updated_count = 0
-page = 0
-total_chars = 0
-
-while True:
-    # Fetch character search page
-    search_url = f"{BASE_URL}/character/search"
-    params = {'pageNumber': page, 'pageSize': 50}
-    
-    print(f"\nFetching page {page}...")
-    
-    try:
-        r = requests.get(search_url, params=params, timeout=30)
-        data = r.json()
-        characters = data.get('characters', [])
-        page_info = data.get('page', {})
-        
-        if not characters:
-            break
-        
-        print(f"  Processing {len(characters)} characters...")
-        
-        for char in characters:
-            uid = char.get('uid')
-            name = char.get('name')
-            
-            if not uid or not name:
-                continue
-            
-            # Fetch full character details
-            detail_url = f"{BASE_URL}/character?uid={uid}"
-            try:
-                r2 = requests.get(detail_url, timeout=30)
-                detail = r2.json().get('character', {})
-                
-                # Find character in database by name
-                cursor.execute("SELECT character_id FROM Characters WHERE name = ?", (name,))
-                result = cursor.fetchone()
-                
-                if not result:
-                    continue
-                
-                character_id = result[0]
-                
-                # Extract data from STAPI
-                gender = detail.get('gender')
-                birth_year = detail.get('yearOfBirth')
-                death_year = detail.get('yearOfDeath')
-                
-                # Get species (it's an array)
-                species_id = None
-                char_species = detail.get('characterSpecies', [])
-                if char_species:
-                    species_name = char_species[0].get('name', '').lower()
-                    species_id = species_map.get(species_name)
-                
-                # Get occupation (it's an array)
-                occupation = None
-                occupations = detail.get('occupations', [])
-                if occupations:
-                    occupation = occupations[0].get('name')
-                
-                # Update database
-                cursor.execute("""
-                    UPDATE Characters
-                    SET gender = COALESCE(?, gender),
-                        species_id = COALESCE(?, species_id),
-                        birth_year = COALESCE(?, birth_year),
-                        death_year = COALESCE(?, death_year),
-                        occupation = COALESCE(?, occupation)
-                    WHERE character_id = ?
-                """, (gender, species_id, birth_year, death_year, occupation, character_id))
-                
-                if gender or species_id or birth_year or death_year or occupation:
-                    updated_count += 1
-                
-                total_chars += 1
-                
-                time.sleep(0.1)  # Rate limit
-                
-            except Exception as e:
-                print(f"    Error fetching details for {name}: {e}")
-        
-        # Check if there are more pages
-        total_pages = page_info.get('totalPages', 0)
-        if page >= total_pages - 1:
-            break
-        
-        page += 1
-        time.sleep(0.5)
-        
-    except Exception as e:
-        print(f"  Error fetching page {page}: {e}")
-        break
-
-conn.commit()
+stage = CharacterDetailStage(conn, consumers=[AttributeUpdater])
+counts = stage.run(db_characters)
+updated_count = counts['AttributeUpdater']
+total_chars = sum(1 for _, uid in db_characters if uid)
 
 print("\n" + "="*70)
 print(f"Processed {total_chars} characters")